@@ -0,0 +1,83 @@
+"""Concurrent chats on one event loop against a fake LLM.
+
+Runs ``--chats`` tool-calling conversations at once through ``ToolExecutor``
+and reports wall time and chats/s, once with the async client and once with a
+client that blocks the loop (the previous behaviour), then streams the same
+chats and reports time-to-first-token.
+
+    python -m benchmarks.concurrent_chats --chats 200 --latency 0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from src.ai.executor import ToolExecutor
+from src.settings import settings
+
+from .fake_llm import FakeAsyncLLM
+
+
+async def _stream_one(executor: ToolExecutor) -> float:
+    """Consume one streamed chat; returns time to first content token."""
+    started = time.perf_counter()
+    first_token = 0.0
+    async for event in executor.execute_with_tools_streaming(
+        messages=[{"role": "user", "content": "What is 25 multiplied by 4?"}]
+    ):
+        if not first_token and isinstance(event, dict):
+            first_token = time.perf_counter() - started
+    return first_token
+
+
+async def _run_streaming(chats: int, latency: float, token_delay: float) -> tuple[float, float]:
+    executor = ToolExecutor(client=FakeAsyncLLM(latency, token_delay=token_delay))  # type: ignore[arg-type]
+    started = time.perf_counter()
+    ttfts = await asyncio.gather(*(_stream_one(executor) for _ in range(chats)))
+    return time.perf_counter() - started, sum(ttfts) / len(ttfts)
+
+
+async def _run(chats: int, latency: float, blocking: bool) -> float:
+    executor = ToolExecutor(client=FakeAsyncLLM(latency, blocking=blocking))  # type: ignore[arg-type]
+    messages = [{"role": "user", "content": "What is 25 multiplied by 4?"}]
+    started = time.perf_counter()
+    await asyncio.gather(*(executor.execute_with_tools(messages=messages) for _ in range(chats)))
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per fake LLM call.")
+    parser.add_argument(
+        "--blocking-chats", type=int, default=10, help="Chats for the blocking baseline."
+    )
+    parser.add_argument(
+        "--token-delay", type=float, default=0.01, help="Seconds per streamed word."
+    )
+    args = parser.parse_args()
+
+    # Every chat is identical and simple; measure the tool loop, not the
+    # response cache, the fast path or the LLM concurrency cap
+    settings.ai_response_cache_enabled = False
+    settings.ai_fast_path_enabled = False
+    settings.ai_scheduler_enabled = False
+
+    for label, chats, blocking in (
+        ("blocking", args.blocking_chats, True),
+        ("async", args.chats, False),
+    ):
+        elapsed = asyncio.run(_run(chats, args.latency, blocking))
+        print(f"{label:>8}: {chats:>5} chats in {elapsed:6.2f}s -> {chats / elapsed:8.1f} chats/s")
+
+    elapsed, ttft = asyncio.run(_run_streaming(args.chats, args.latency, args.token_delay))
+    print(
+        f"{'stream':>8}: {args.chats:>5} chats in {elapsed:6.2f}s "
+        f"-> {args.chats / elapsed:8.1f} chats/s, mean time-to-first-token {ttft * 1000:.0f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""End-to-end chat scenarios over HTTP against the offline fake LLM.
+
+Serves the AI router with uvicorn and points the real ``AsyncCerebrasClient``
+at ``fake_llm_server``, both on background threads, then runs each scenario
+``--chats`` times through ``POST /ai/chat/auto`` (turn latency) and
+``POST /ai/chat/auto/stream`` (time to first token, tokens/s). The response
+cache, fast path and rate limits are off so every chat reaches the model.
+
+    python -m benchmarks.e2e_chat --chats 50 --concurrency 10
+    python -m benchmarks.e2e_chat --replay transcripts/ --replay-speed 1
+
+Both servers share this process (and its GIL); pass ``--llm-url`` to use a
+fake server, or a real endpoint, running elsewhere.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from src.ai import client as llm_client
+from src.ai.usage import USAGE_KIND
+from src.history import HISTORY_KIND
+from src.routers.ai_router import router as ai_router
+from src.settings import settings
+from src.write_behind import get_write_behind_queue
+
+from .fake_llm_server import SCENARIOS, FakeLLMServer, serve_in_background
+
+
+PROMPTS = {
+    "plain": "What is Kubo and what can you do?",
+    "math": "What is 25 multiplied by 4?",
+    "weather": "What's the weather like in Paris?",
+    "multi": "What's the weather in Paris, and what is 25 times 4?",
+}
+
+
+def _pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000 if values else 0.0
+
+
+def _backend_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(ai_router)
+    # Anonymous chats save no history; discard the usage rows
+    queue = get_write_behind_queue()
+    queue.register(HISTORY_KIND, lambda db_manager, rows: len(rows))
+    queue.register(USAGE_KIND, lambda db_manager, rows: len(rows))
+    return app
+
+
+async def _turn(client: httpx.AsyncClient, prompt: str) -> float:
+    started = time.perf_counter()
+    response = await client.post("/ai/chat/auto", json={"message": prompt})
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def _stream(client: httpx.AsyncClient, prompt: str) -> tuple[float, float]:
+    """Time to first content token and content words per second after it."""
+    started = time.perf_counter()
+    first = 0.0
+    words = 0
+    async with client.stream("POST", "/ai/chat/auto/stream", json={"message": prompt}) as response:
+        response.raise_for_status()
+        event = "message"
+        async for line in response.aiter_lines():
+            if line.startswith("event:"):
+                event = line[6:].strip()
+                if event in ("finish", "error"):
+                    break
+            elif line.startswith("data:") and event == "message":
+                content = json.loads(line[5:])
+                if content:
+                    first = first or time.perf_counter() - started
+                    words += len(content.split())
+            elif not line:
+                event = "message"
+    elapsed = time.perf_counter() - started
+    generating = elapsed - first
+    return first, (words / generating if generating > 0 else 0.0)
+
+
+async def _scenario(
+    base_url: str, prompt: str, chats: int, concurrency: int
+) -> dict[str, list[float]]:
+    gate = asyncio.Semaphore(concurrency)
+    results: dict[str, list[float]] = {"turn": [], "ttft": [], "tps": []}
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+
+        async def one() -> None:
+            async with gate:
+                results["turn"].append(await _turn(client, prompt))
+                ttft, tps = await _stream(client, prompt)
+                results["ttft"].append(ttft)
+                results["tps"].append(tps)
+
+        await asyncio.gather(*(one() for _ in range(chats)))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument(
+        "--chats",
+        type=int,
+        default=50,
+        help="Chats per scenario (each is one turn and one stream).",
+    )
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument(
+        "--scenarios", nargs="+", default=[scenario.name for scenario in SCENARIOS], choices=PROMPTS
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="Fake model seconds before the first token."
+    )
+    parser.add_argument(
+        "--token-delay", type=float, default=0.005, help="Fake model seconds per word."
+    )
+    parser.add_argument(
+        "--chunk-tokens", type=int, default=1, help="Fake model words per streamed chunk."
+    )
+    parser.add_argument(
+        "--replay", metavar="DIR", help="Replay transcripts recorded by fake_llm_server --record."
+    )
+    parser.add_argument("--replay-speed", type=float, default=1.0)
+    parser.add_argument(
+        "--llm-url", help="Use this LLM endpoint instead of starting a fake server."
+    )
+    args = parser.parse_args()
+
+    # Every chat must reach the model, and all come from one client
+    settings.ai_response_cache_enabled = False
+    settings.ai_fast_path_enabled = False
+    settings.rate_limit_enabled = False
+
+    fake = FakeLLMServer(
+        latency=args.latency,
+        token_delay=args.token_delay,
+        chunk_tokens=args.chunk_tokens,
+        replay_dir=args.replay,
+        replay_speed=args.replay_speed,
+    )
+    with serve_in_background(fake.create_app()) as fake_url:
+        settings.cerebras_base_url = args.llm_url or fake_url
+        settings.cerebras_api_key = settings.cerebras_api_key or "offline"
+        llm_client._async_client_instance = None
+        with serve_in_background(_backend_app()) as backend_url:
+            print(
+                f"{'scenario':>8} {'chats':>6} {'turn p50':>9} {'turn p95':>9} "
+                f"{'ttft p50':>9} {'ttft p95':>9} {'words/s':>8}"
+            )
+            for name in args.scenarios:
+                results = asyncio.run(
+                    _scenario(backend_url, PROMPTS[name], args.chats, args.concurrency)
+                )
+                tps = results["tps"]
+                print(
+                    f"{name:>8} {args.chats:>6} "
+                    f"{_pct(results['turn'], 0.5):>7.0f}ms {_pct(results['turn'], 0.95):>7.0f}ms "
+                    f"{_pct(results['ttft'], 0.5):>7.0f}ms {_pct(results['ttft'], 0.95):>7.0f}ms "
+                    f"{sum(tps) / len(tps) if tps else 0.0:>8.0f}"
+                )
+    if not args.llm_url:
+        print(f"fake LLM requests: {fake.requests}")
+
+
+if __name__ == "__main__":
+    main()
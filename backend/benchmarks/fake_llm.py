@@ -0,0 +1,84 @@
+"""In-process stand-in for ``AsyncCerebrasClient`` used by the benchmarks.
+
+Each completion sleeps for ``latency`` seconds (yielding the event loop, like a
+real network call); streamed answers then emit one word every ``token_delay``.
+The first turn of a chat asks for one ``calculate`` tool call and the second
+turn answers, which exercises the full tool loop without
+touching the network or the database.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from typing import Any, AsyncIterator
+
+
+class FakeAsyncLLM:
+    def __init__(
+        self, latency: float = 0.5, *, token_delay: float = 0.0, blocking: bool = False
+    ) -> None:
+        self.latency = latency
+        self.token_delay = token_delay
+        # blocking=True mimics the old sync SDK call made inside an async handler
+        self.blocking = blocking
+        self.calls = 0
+        self._ids = itertools.count()
+
+    async def _wait(self) -> None:
+        self.calls += 1
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+
+    def _next_message(self, messages: list[dict[str, Any]]) -> dict[str, Any]:
+        if not any(message.get("role") == "tool" for message in messages):
+            return {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": f"call_{next(self._ids)}",
+                    "type": "function",
+                    "function": {"name": "calculate", "arguments": '{"expression": "25*4"}'},
+                }],
+            }
+        return {"role": "assistant", "content": "25 multiplied by 4 is 100."}
+
+    async def _stream(self, message: dict[str, Any]) -> AsyncIterator[Any]:
+        for index, call in enumerate(message.get("tool_calls") or []):
+            arguments = call["function"]["arguments"]
+            half = len(arguments) // 2
+            yield {"choices": [{"index": 0, "delta": {"tool_calls": [{
+                "index": index, "id": call["id"], "type": "function",
+                "function": {"name": call["function"]["name"], "arguments": arguments[:half]},
+            }]}}]}
+            yield {"choices": [{"index": 0, "delta": {"tool_calls": [{
+                "index": index, "function": {"arguments": arguments[half:]},
+            }]}}]}
+        for token in (message.get("content") or "").split():
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield {"choices": [{"index": 0, "delta": {"content": token + " "}}]}
+        finish = "tool_calls" if message.get("tool_calls") else "stop"
+        yield {"choices": [{"index": 0, "delta": {}, "finish_reason": finish}]}
+
+    async def chat_completion(
+        self,
+        *,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        stream: bool = False,
+        model: str | None = None,
+        timeout: float | None = None,
+    ) -> Any:
+        await self._wait()
+        message = self._next_message(messages)
+        if stream:
+            return self._stream(message)
+        return {"choices": [{"index": 0, "message": message, "finish_reason": "stop"}]}
+
+    async def chat_completion_stream(self, *, messages: list[dict[str, Any]]) -> AsyncIterator[Any]:
+        async for chunk in await self.chat_completion(messages=messages, stream=True):
+            yield chunk
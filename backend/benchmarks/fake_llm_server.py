@@ -0,0 +1,358 @@
+"""Offline Cerebras/OpenAI-compatible chat completions server.
+
+Point the backend at it with ``CEREBRAS_BASE_URL`` (any ``CEREBRAS_API_KEY``
+works) to exercise the executor, tools and SSE path without network access.
+
+Three modes:
+
+* scripted (default): the first user message picks a scenario (or send an
+  ``X-Fake-Scenario`` header). Each scenario is a fixed sequence of tool-call
+  turns and a final answer. Answers arrive after ``--latency`` seconds, then
+  one chunk of ``--chunk-tokens`` words every ``--token-delay`` seconds per word.
+* ``--record DIR --upstream URL``: proxy to a real endpoint, forwarding the
+  caller's ``Authorization`` header, and save each exchange with its chunk
+  timings to ``DIR/<request hash>.json``.
+* ``--replay DIR``: answer recorded requests from those files, with the
+  original timings scaled by ``--replay-speed`` (0 = as fast as possible).
+  An unrecorded request gets a 404.
+
+    python -m benchmarks.fake_llm_server --port 8100 --latency 0.2 --token-delay 0.01
+    CEREBRAS_BASE_URL=http://127.0.0.1:8100 uvicorn main:app
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """Turns the fake model plays, in order: tool-call batches, then an answer."""
+
+    name: str
+    trigger: str  # regex searched in the first user message
+    steps: tuple[Any, ...]  # each a tuple of (tool name, arguments) calls, or the answer text
+
+
+SCENARIOS: tuple[Scenario, ...] = (
+    Scenario(
+        "multi",
+        r"weather.*\d|\d.*weather",
+        (
+            (("get_weather", {"location": "Paris"}), ("calculate", {"expression": "25*4"})),
+            "It is 22°C and sunny in Paris, and 25 multiplied by 4 is 100.",
+        ),
+    ),
+    Scenario(
+        "weather",
+        r"weather",
+        (
+            (("get_weather", {"location": "Paris"}),),
+            "It is 22°C and sunny in Paris with 65% humidity.",
+        ),
+    ),
+    Scenario(
+        "math",
+        r"\d",
+        ((("calculate", {"expression": "25*4"}),), "25 multiplied by 4 is 100."),
+    ),
+    Scenario(
+        "plain",
+        r"",
+        (
+            "Kubo rents quiet, bookable pods by the hour. Tell me when and for how many "
+            "people, and I will list the pods that are free, compare their prices and "
+            "book the one you like. You can also ask me to show, move or cancel your "
+            "existing bookings at any time.",
+        ),
+    ),
+)
+SCENARIOS_BY_NAME = {scenario.name: scenario for scenario in SCENARIOS}
+
+
+def request_key(body: dict[str, Any]) -> str:
+    """Stable hash of everything in a request that determines the answer."""
+    relevant = {key: body.get(key) for key in ("model", "messages", "tools", "stream")}
+    canonical = json.dumps(relevant, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeLLMServer:
+    """Scripted, recording or replaying ``/v1/chat/completions``."""
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0.2,
+        token_delay: float = 0.01,
+        chunk_tokens: int = 1,
+        record_dir: str | None = None,
+        upstream: str | None = None,
+        replay_dir: str | None = None,
+        replay_speed: float = 1.0,
+    ) -> None:
+        if record_dir and not upstream:
+            raise ValueError("--record needs --upstream")
+        self.latency = latency
+        self.token_delay = token_delay
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.record_dir = Path(record_dir) if record_dir else None
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.replay_dir = Path(replay_dir) if replay_dir else None
+        self.replay_speed = replay_speed
+        self.requests = 0
+        self._ids = itertools.count()
+
+    def create_app(self) -> FastAPI:
+        app = FastAPI(title="Fake LLM")
+
+        @app.get("/v1/tcp_warming")
+        async def tcp_warming() -> PlainTextResponse:
+            return PlainTextResponse("ok")
+
+        @app.post("/v1/chat/completions")
+        async def chat_completions(request: Request) -> Any:
+            self.requests += 1
+            body = await request.json()
+            if self.record_dir is not None:
+                authorization = request.headers.get("authorization")
+                return await self._record(self.record_dir, body, authorization)
+            if self.replay_dir is not None:
+                return await self._replay(self.replay_dir, body)
+            scenario = SCENARIOS_BY_NAME.get(request.headers.get("x-fake-scenario", ""))
+            scenario = scenario or self.pick(body["messages"])
+            return await self._scripted(body, scenario)
+
+        return app
+
+    # -- Scripted ------------------------------------------------------------
+
+    @staticmethod
+    def pick(messages: list[dict[str, Any]]) -> Scenario:
+        first_user = next((m.get("content") or "" for m in messages if m.get("role") == "user"), "")
+        return next(s for s in SCENARIOS if re.search(s.trigger, first_user, re.IGNORECASE))
+
+    @staticmethod
+    def _step(scenario: Scenario, messages: list[dict[str, Any]]) -> Any:
+        """The scenario step for this turn: one per assistant turn since the last user message."""
+        last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1)
+        turn = sum(1 for m in messages[last_user + 1:] if m.get("role") == "assistant")
+        return scenario.steps[min(turn, len(scenario.steps) - 1)]
+
+    async def _scripted(self, body: dict[str, Any], scenario: Scenario) -> Any:
+        step = self._step(scenario, body["messages"])
+        completion_id = f"chatcmpl-fake-{next(self._ids)}"
+        model = body.get("model", "fake")
+        prompt_tokens = _tokens(json.dumps(body["messages"]) + json.dumps(body.get("tools") or []))
+
+        if isinstance(step, str):
+            message: dict[str, Any] = {"role": "assistant", "content": step}
+            words = step.split(" ")
+            completion_tokens = len(words)
+        else:
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{next(self._ids)}",
+                        "type": "function",
+                        "function": {"name": name, "arguments": json.dumps(arguments)},
+                    }
+                    for name, arguments in step
+                ],
+            }
+            words = []
+            completion_tokens = sum(
+                _tokens(call["function"]["arguments"]) for call in message["tool_calls"]
+            )
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        finish = "tool_calls" if message.get("tool_calls") else "stop"
+
+        if not body.get("stream"):
+            await asyncio.sleep(self.latency + self.token_delay * len(words))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+                "usage": usage,
+            }
+
+        async def chunks() -> AsyncIterator[dict[str, Any]]:
+            await asyncio.sleep(self.latency)
+            for index, call in enumerate(message.get("tool_calls") or []):
+                delta = {"role": "assistant", "tool_calls": [{"index": index, **call}]}
+                yield {"index": 0, "delta": delta}
+            for start in range(0, len(words), self.chunk_tokens):
+                group = words[start:start + self.chunk_tokens]
+                if start:
+                    await asyncio.sleep(self.token_delay * len(group))
+                text = " ".join(group) + (" " if start + self.chunk_tokens < len(words) else "")
+                yield {"index": 0, "delta": {"role": "assistant", "content": text}}
+            yield {"index": 0, "delta": {}, "finish_reason": finish}
+
+        async def sse() -> AsyncIterator[str]:
+            async for choice in chunks():
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [choice],
+                }
+                if choice.get("finish_reason"):
+                    chunk["usage"] = usage
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(sse(), media_type="text/event-stream")
+
+    # -- Record / replay ------------------------------------------------------
+
+    async def _record(
+        self, record_dir: Path, body: dict[str, Any], authorization: str | None
+    ) -> Any:
+        headers = {"authorization": authorization} if authorization else {}
+        path = record_dir / f"{request_key(body)}.json"
+        record_dir.mkdir(parents=True, exist_ok=True)
+        url = f"{self.upstream}/v1/chat/completions"
+        started = time.perf_counter()
+
+        if not body.get("stream"):
+            async with httpx.AsyncClient(timeout=120) as client:
+                response = await client.post(url, json=body, headers=headers)
+            if response.status_code == 200:
+                transcript = {
+                    "request": body,
+                    "latency": time.perf_counter() - started,
+                    "response": response.json(),
+                }
+                path.write_text(json.dumps(transcript, indent=1))
+            return JSONResponse(response.json(), status_code=response.status_code)
+
+        async def relay() -> AsyncIterator[str]:
+            chunks: list[dict[str, Any]] = []
+            async with httpx.AsyncClient(timeout=120) as client:
+                async with client.stream("POST", url, json=body, headers=headers) as response:
+                    async for line in response.aiter_lines():
+                        if line.startswith("data:"):
+                            elapsed = time.perf_counter() - started
+                            chunks.append({"t": elapsed, "data": line[5:].strip()})
+                            yield f"{line}\n\n"
+                    ok = response.status_code == 200
+            if ok:
+                path.write_text(json.dumps({"request": body, "chunks": chunks}, indent=1))
+
+        return StreamingResponse(relay(), media_type="text/event-stream")
+
+    async def _replay(self, replay_dir: Path, body: dict[str, Any]) -> Any:
+        path = replay_dir / f"{request_key(body)}.json"
+        if not path.exists():
+            return JSONResponse(
+                {
+                    "error": {
+                        "message": f"No recorded transcript {path.name}",
+                        "type": "not_found_error",
+                    }
+                },
+                status_code=404,
+            )
+        transcript = json.loads(path.read_text())
+
+        if not body.get("stream"):
+            await asyncio.sleep(transcript.get("latency", 0.0) * self.replay_speed)
+            return transcript["response"]
+
+        async def sse() -> AsyncIterator[str]:
+            started = time.perf_counter()
+            for chunk in transcript["chunks"]:
+                wait = chunk["t"] * self.replay_speed - (time.perf_counter() - started)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                yield f"data: {chunk['data']}\n\n"
+
+        return StreamingResponse(sse(), media_type="text/event-stream")
+
+
+@contextmanager
+def serve_in_background(app: FastAPI, host: str = "127.0.0.1", port: int = 0) -> Iterator[str]:
+    """Run ``app`` with uvicorn on a thread; yields its base URL."""
+    config = uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    bound = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://{host}:{bound}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="Seconds before the first token."
+    )
+    parser.add_argument(
+        "--token-delay", type=float, default=0.01, help="Seconds per streamed word."
+    )
+    parser.add_argument("--chunk-tokens", type=int, default=1, help="Words per streamed chunk.")
+    parser.add_argument(
+        "--record", metavar="DIR", help="Proxy to --upstream and save transcripts here."
+    )
+    parser.add_argument(
+        "--upstream", help="Real endpoint to record from, e.g. https://api.cerebras.ai"
+    )
+    parser.add_argument(
+        "--replay", metavar="DIR", help="Answer from transcripts saved with --record."
+    )
+    parser.add_argument(
+        "--replay-speed", type=float, default=1.0, help="Scale recorded timings (0 = no waits)."
+    )
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        latency=args.latency,
+        token_delay=args.token_delay,
+        chunk_tokens=args.chunk_tokens,
+        record_dir=args.record,
+        upstream=args.upstream,
+        replay_dir=args.replay,
+        replay_speed=args.replay_speed,
+    )
+    uvicorn.run(server.create_app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
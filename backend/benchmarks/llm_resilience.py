@@ -0,0 +1,136 @@
+"""Tail latency and failure handling of ``AsyncCerebrasClient``.
+
+Swaps the SDK transport for an in-process fake upstream with a heavy latency
+tail and a configurable error rate, then runs the same load with hedging off
+and on and reports latency percentiles, retries, hedges and failures. A last
+phase takes the upstream down to show the circuit breaker failing fast.
+
+    python -m benchmarks.llm_resilience --calls 400 --slow-rate 0.05 --error-rate 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import httpx
+from cerebras.cloud.sdk import InternalServerError
+
+from src.ai.client import AsyncCerebrasClient, CerebrasClientError, CircuitOpenError
+from src.metrics import get_metrics
+from src.settings import settings
+
+
+class FakeUpstream:
+    """Mimics ``AsyncCerebras.chat.completions`` with injected latency and errors."""
+
+    def __init__(
+        self, latency: float, slow_latency: float, slow_rate: float, error_rate: float
+    ) -> None:
+        self.latency = latency
+        self.slow_latency = slow_latency
+        self.slow_rate = slow_rate
+        self.error_rate = error_rate
+        self.down = False
+        self.requests = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **params: Any) -> Any:
+        self.requests += 1
+        slow = random.random() < self.slow_rate
+        await asyncio.sleep(self.slow_latency if slow else self.latency * random.uniform(0.8, 1.2))
+        if self.down or random.random() < self.error_rate:
+            request = httpx.Request("POST", "http://fake/v1/chat/completions")
+            response = httpx.Response(500, request=request)
+            raise InternalServerError("upstream error", response=response, body=None)
+        return {"choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}}]}
+
+
+async def _phase(
+    client: AsyncCerebrasClient, calls: int, concurrency: int
+) -> tuple[list[float], int]:
+    latencies: list[float] = []
+    failures = 0
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        nonlocal failures
+        async with slots:
+            started = time.perf_counter()
+            try:
+                await client.chat_completion(messages=[{"role": "user", "content": "hi"}])
+                latencies.append(time.perf_counter() - started)
+            except CerebrasClientError:
+                failures += 1
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return sorted(latencies), failures
+
+
+def _pct(values: list[float], q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000 if values else 0.0
+
+
+async def _run(args: argparse.Namespace) -> None:
+    settings.ai_llm_retry_base_seconds = 0.01
+    settings.ai_llm_hedge_min_seconds = 0.0
+    metrics = get_metrics()
+    print(
+        f"{'hedging':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+        f"{'failed':>7} {'retries':>8} {'hedges':>7} {'upstream':>9}"
+    )
+    for hedge in (False, True):
+        settings.ai_llm_hedge_enabled = hedge
+        upstream = FakeUpstream(args.latency, args.slow_latency, args.slow_rate, args.error_rate)
+        client = AsyncCerebrasClient("fake", model="llama3.1-8b")
+        client._client = upstream  # type: ignore[assignment]
+        # Warm up the latency percentiles the hedge delay is derived from
+        await _phase(client, 50, args.concurrency)
+        retries, hedges = metrics.counter("llm.retries"), metrics.counter("llm.hedges")
+        upstream.requests = 0
+        latencies, failures = await _phase(client, args.calls, args.concurrency)
+        print(
+            f"{'on' if hedge else 'off':>8} {_pct(latencies, 0.5):8.0f} "
+            f"{_pct(latencies, 0.95):8.0f} {_pct(latencies, 0.99):8.0f} {failures:7d} "
+            f"{metrics.counter('llm.retries') - retries:8.0f} "
+            f"{metrics.counter('llm.hedges') - hedges:7.0f} {upstream.requests:9d}"
+        )
+
+    # Upstream outage: after the breaker opens, calls fail without touching upstream
+    upstream.down = True
+    upstream.requests = 0
+    started = time.perf_counter()
+    rejected = 0
+    for _ in range(20):
+        try:
+            await client.chat_completion(messages=[{"role": "user", "content": "hi"}])
+        except CircuitOpenError:
+            rejected += 1
+        except CerebrasClientError:
+            pass
+    print(
+        f"outage: 20 calls in {time.perf_counter() - started:.2f}s, "
+        f"{rejected} rejected by the open circuit, "
+        f"{upstream.requests} reached upstream"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Typical upstream latency in seconds."
+    )
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="Latency of tail requests.")
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
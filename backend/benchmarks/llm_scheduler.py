@@ -0,0 +1,102 @@
+"""Fairness and priority of the LLM scheduler under overload.
+
+One heavy client floods the worker with batch calls while light clients send
+a few interactive and batch calls each. Compares the light clients' queueing
+delay under the scheduler with a plain FIFO semaphore of the same capacity,
+and reports how many calls were rejected early for missing their deadline.
+
+    python -m benchmarks.llm_scheduler --capacity 4 --heavy-calls 200 --light-clients 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from src.ai.client import DeadlineExceededError
+from src.ai.scheduler import BATCH, INTERACTIVE, LLMScheduler, SchedulerOverloadedError
+
+
+async def _call(
+    limiter: LLMScheduler | asyncio.Semaphore,
+    client: str,
+    priority: str,
+    service: float,
+    deadline: float,
+    waits: dict[str, list[float]],
+    outcome: dict[str, int],
+) -> None:
+    started = time.monotonic()
+    try:
+        if isinstance(limiter, asyncio.Semaphore):
+            async with limiter:
+                waits[f"{client[:5]}/{priority}"].append(time.monotonic() - started)
+                await asyncio.sleep(service)
+        else:
+            async with limiter.slot(client=client, priority=priority, cost=1000, deadline=deadline):
+                waits[f"{client[:5]}/{priority}"].append(time.monotonic() - started)
+                await asyncio.sleep(service)
+        outcome["served"] += 1
+    except SchedulerOverloadedError:
+        outcome["rejected"] += 1
+    except DeadlineExceededError:
+        outcome["timed_out"] += 1
+
+
+async def _run(args: argparse.Namespace, use_scheduler: bool) -> None:
+    limiter: LLMScheduler | asyncio.Semaphore
+    if use_scheduler:
+        limiter = LLMScheduler(capacity=args.capacity)
+    else:
+        limiter = asyncio.Semaphore(args.capacity)
+    keys = ("heavy/batch", "light/batch", "light/interactive")
+    waits: dict[str, list[float]] = {key: [] for key in keys}
+    outcome = {"served": 0, "rejected": 0, "timed_out": 0}
+    # Let the scheduler learn the service time its wait predictions rely on
+    warmup = time.monotonic() + 60
+    warmup_waits: dict[str, list[float]] = {"warmu/batch": []}
+    await asyncio.gather(
+        *(
+            _call(limiter, "warmup", BATCH, args.service, warmup, warmup_waits, dict(outcome))
+            for _ in range(args.capacity * 2)
+        )
+    )
+    deadline = time.monotonic() + args.deadline
+    calls = [
+        _call(limiter, "heavy", BATCH, args.service, deadline, waits, outcome)
+        for _ in range(args.heavy_calls)
+    ]
+    for index in range(args.light_clients):
+        for priority in (INTERACTIVE, BATCH):
+            client = f"light-{index}"
+            calls.append(_call(limiter, client, priority, args.service, deadline, waits, outcome))
+    await asyncio.gather(*calls)
+
+    print("scheduler" if use_scheduler else "fifo semaphore")
+    for key, values in waits.items():
+        if values:
+            values.sort()
+            p95 = values[min(len(values) - 1, int(0.95 * len(values)))]
+            mean = sum(values) / len(values)
+            print(f"  {key:<18} mean wait {mean * 1000:7.0f} ms   p95 {p95 * 1000:7.0f} ms")
+    print(
+        f"  served {outcome['served']}, rejected early {outcome['rejected']}, "
+        f"timed out {outcome['timed_out']}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--capacity", type=int, default=4)
+    parser.add_argument("--heavy-calls", type=int, default=200)
+    parser.add_argument("--light-clients", type=int, default=20)
+    parser.add_argument("--service", type=float, default=0.02, help="Seconds per LLM call.")
+    parser.add_argument("--deadline", type=float, default=30.0, help="Request deadline in seconds.")
+    args = parser.parse_args()
+    asyncio.run(_run(args, use_scheduler=False))
+    asyncio.run(_run(args, use_scheduler=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Login throughput for the off-loop password hashing path.
+
+Measures how many ``verify_password_async`` calls per second one event loop
+sustains for a range of worker counts and bcrypt costs, and reports the
+per-core figure alongside a ping task that shows the loop stays responsive.
+
+    python -m benchmarks.password_hashing --rounds 10 12 --workers 1 2 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+from src import security
+from src.settings import settings
+
+
+async def _ping_latency(stop: asyncio.Event) -> float:
+    """Worst observed delay of a 5 ms sleep while hashing runs."""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.005)
+        worst = max(worst, time.perf_counter() - started - 0.005)
+    return worst
+
+
+async def _run(rounds: int, workers: int, logins: int) -> tuple[float, float]:
+    settings.password_hash_rounds = rounds
+    settings.password_hash_workers = workers
+    security.shutdown_hash_executor()
+
+    stored = security.hash_password("correct horse battery staple", rounds=rounds)
+    stop = asyncio.Event()
+    ping = asyncio.create_task(_ping_latency(stop))
+
+    started = time.perf_counter()
+    password = "correct horse battery staple"
+    await asyncio.gather(*(security.verify_password_async(password, stored) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    worst_stall = await ping
+    security.shutdown_hash_executor()
+    return logins / elapsed, worst_stall
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument("--logins", type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"{'rounds':>6} {'workers':>7} {'logins/s':>10} {'per core':>9} {'loop stall ms':>14}")
+    for rounds in args.rounds:
+        for workers in args.workers:
+            rate, stall = asyncio.run(_run(rounds, workers, args.logins))
+            per_core = rate / min(workers, os.cpu_count() or 1)
+            print(f"{rounds:>6} {workers:>7} {rate:>10.1f} {per_core:>9.1f} {stall * 1000:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Bytes on the wire and CPU per streamed token: legacy vs compact SSE.
+
+The legacy encoder is what ``/ai/chat/auto/stream`` used to do: one frame
+per SDK chunk, ``model_dump()`` plus ``json.dumps`` of the whole chunk. The
+compact encoder is ``src.ai.sse.encode_stream``: content deltas only,
+coalesced over ``AI_SSE_COALESCE_MS``, encoded with ``orjson`` (and, as
+``compact/json``, with the stdlib encoder). Tokens
+come from real SDK chunk objects, either all at once or paced like a fast
+model (``--token-delay``).
+
+    python -m benchmarks.sse_encoding --tokens 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Callable
+
+from cerebras.cloud.sdk.types.chat.chat_completion import ChatChunkResponse
+
+from src.ai import sse
+
+
+WORDS = "The pod on level three is free from nine until noon, and booking it takes one call".split()
+
+
+def _chunks(count: int) -> list[ChatChunkResponse]:
+    """SDK chunks shaped like the API's, the last one with usage and finish_reason."""
+    chunks = []
+    for index in range(count):
+        last = index == count - 1
+        payload: dict[str, Any] = {
+            "id": "chatcmpl-3f1c9a52-8d4e-4b0a-9a1e-6c2f0f8d7b11",
+            "object": "chat.completion.chunk",
+            "created": 1760000000,
+            "model": "llama3.1-8b",
+            "system_fingerprint": "fp_70185065a4",
+            "choices": [
+                {
+                    "index": 0,
+                    "delta": {"content": WORDS[index % len(WORDS)] + " "},
+                    "finish_reason": "stop" if last else None,
+                }
+            ],
+        }
+        if last:
+            payload["usage"] = {
+                "prompt_tokens": 250,
+                "completion_tokens": count,
+                "total_tokens": 250 + count,
+            }
+            payload["time_info"] = {
+                "queue_time": 0.0001,
+                "prompt_time": 0.002,
+                "completion_time": 0.4,
+                "total_time": 0.41,
+            }
+        chunks.append(ChatChunkResponse.model_validate(payload))
+    return chunks
+
+
+async def _source(chunks: list[Any], delay: float) -> AsyncIterator[Any]:
+    for chunk in chunks:
+        if delay:
+            await asyncio.sleep(delay)
+        yield chunk
+
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """Compact stdlib encoding, for comparison with ``orjson``."""
+    return _encoder.encode(obj).encode("utf-8")
+
+
+async def _legacy(events: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    async for chunk in events:
+        yield f"data: {json.dumps(chunk.model_dump())}\n\n".encode()
+    yield b"data: [DONE]\n\n"
+
+
+async def _drain(events: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    async for _ in events:
+        pass
+    yield b""
+
+
+async def _measure(
+    encoder: Callable[[AsyncIterator[Any]], AsyncIterator[bytes]], chunks: list[Any], delay: float
+) -> tuple[int, int, float]:
+    frames = 0
+    size = 0
+    started = time.process_time()
+    async for frame in encoder(_source(chunks, delay)):
+        frames += 1
+        size += len(frame)
+    return frames, size, time.process_time() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument(
+        "--token-delay", type=float, default=0.002, help="Seconds between paced tokens."
+    )
+    parser.add_argument(
+        "--coalesce-ms", type=float, default=None, help="Override AI_SSE_COALESCE_MS."
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per row; CPU is the best run.")
+    args = parser.parse_args()
+
+    chunks = _chunks(args.tokens)
+    compact = lambda events: sse.encode_stream(events, coalesce_ms=args.coalesce_ms)  # noqa: E731
+    encoders: list[tuple[str, Callable[[AsyncIterator[Any]], AsyncIterator[bytes]]]] = [
+        ("legacy", _legacy),
+        ("compact", compact),
+        ("compact/json", compact),
+    ]
+    fast_dumps = sse.dumps
+
+    print(f"{'encoder':>13} {'pacing':>7} {'frames':>7} {'bytes/token':>12} {'cpu us/token':>13}")
+    for pacing, delay in (("burst", 0.0), ("paced", args.token_delay)):
+        baseline = min(asyncio.run(_measure(_drain, chunks, delay))[2] for _ in range(args.repeat))
+        for name, encoder in encoders:
+            sse.dumps = _json_dumps if name == "compact/json" else fast_dumps
+            runs = [asyncio.run(_measure(encoder, chunks, delay)) for _ in range(args.repeat)]
+            frames, size, _ = runs[0]
+            cpu = min(run[2] for run in runs)
+            print(
+                f"{name:>13} {pacing:>7} {frames:>7} {size / args.tokens:>12.1f} "
+                f"{max(0.0, cpu - baseline) / args.tokens * 1e6:>13.1f}"
+            )
+    sse.dumps = fast_dumps
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Accuracy and prompt size of per-turn tool selection.
+
+Runs the keyword classifier over a labelled set of queries. A query counts
+as correct when every tool it needs is offered. Reports recall, how many tools
+are offered on average, and the prompt tokens (system prompt plus schemas)
+compared with sending everything.
+
+    python -m benchmarks.tool_selection [--verbose]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+
+from src.ai.context import estimate_tokens
+from src.ai.prompts import SYSTEM_PROMPT
+from src.ai.selection import get_tool_selector
+from src.ai.tools import get_tool_registry
+
+# (query, tools the model needs to answer it)
+LABELLED_QUERIES: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("What is 25*4?", ("calculate",)),
+    ("Calculate 1500 divided by 12", ("calculate",)),
+    ("Add 5 and 3", ("calculate",)),
+    ("what's 18% of 240", ("calculate",)),
+    ("What's the weather in London?", ("get_weather",)),
+    ("Is it raining in Tokyo?", ("get_weather",)),
+    ("Temperature in Paris in fahrenheit", ("get_weather",)),
+    ("What pods are available?", ("list_available_pods",)),
+    ("Show me all pods", ("list_available_pods",)),
+    ("Which spaces fit 6 people?", ("list_available_pods",)),
+    ("Is anything free tomorrow afternoon?", ("list_available_pods",)),
+    ("Tell me about pod 3", ("get_pod_details",)),
+    ("How much does pod 2 cost?", ("get_pod_details",)),
+    ("What's the capacity of pod 1?", ("get_pod_details",)),
+    ("Show my bookings", ("list_user_bookings",)),
+    ("List all reservations", ("list_user_bookings",)),
+    ("Show me booking 12", ("get_booking_details",)),
+    ("What's the status of booking 10?", ("get_booking_details",)),
+    ("Book pod 1 for tomorrow 2-4pm", ("create_booking",)),
+    ("I want to reserve a pod on Friday", ("create_booking", "list_available_pods")),
+    (
+        "Book the cheapest pod for 2 hours and tell me the total",
+        ("create_booking", "list_available_pods", "calculate"),
+    ),
+    ("Cancel booking 5", ("cancel_booking",)),
+    ("Delete my reservation 7", ("cancel_booking",)),
+    ("Move booking 3 to next Monday", ("update_booking",)),
+    ("Confirm booking 8", ("update_booking",)),
+    ("Reschedule my booking to 3pm", ("update_booking", "list_user_bookings")),
+    ("Hi, what can you do?", ()),
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument(
+        "--verbose", action="store_true", help="print every query and the tools offered"
+    )
+    args = parser.parse_args()
+
+    registry = get_tool_registry()
+    selector = get_tool_selector()
+    schemas = json.dumps(registry.get_all_schemas())
+    full_tokens = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(schemas)
+
+    correct = 0
+    offered_total = 0
+    tokens_total = 0
+    for query, needed in LABELLED_QUERIES:
+        tools, prompt = selector.select([{"role": "user", "content": query}])
+        offered = {tool["function"]["name"] for tool in tools}
+        ok = set(needed) <= offered
+        correct += ok
+        offered_total += len(offered)
+        tokens_total += estimate_tokens(prompt) + estimate_tokens(json.dumps(tools))
+        if args.verbose or not ok:
+            marker = "ok  " if ok else "MISS"
+            print(f"{marker} {query!r}: offered {sorted(offered)}")
+
+    count = len(LABELLED_QUERIES)
+    print(f"queries:             {count}")
+    print(f"recall:              {correct / count:.1%}")
+    print(f"tools offered (avg): {offered_total / count:.1f} of {len(registry.get_all_schemas())}")
+    print(f"prompt tokens (avg): {tokens_total / count:.0f} vs {full_tokens} with every tool")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""How many ``/ai/ws`` sockets one worker holds, and how chats fare among them.
+
+Starts one uvicorn worker serving the AI router in a subprocess (response
+cache, fast path and rate limits off) against ``fake_llm_server`` on a
+background thread. Then it opens WebSockets in steps and keeps them open.
+At each step it reports the worker's resident memory, and runs ``--active``
+chats at once on sockets picked from the open ones (time to first delta,
+turn latency). It stops at the first step where sockets can't be opened.
+
+    python -m benchmarks.ws_connections --steps 500 1000 2000 4000 8000 --active 16
+
+The worker is its own process, so its memory excludes the clients. Memory
+is read from ``/proc``, so this runs on Linux only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from fastapi import FastAPI
+from websockets.asyncio.client import ClientConnection, connect
+
+from src.ai.usage import USAGE_KIND
+from src.history import HISTORY_KIND
+from src.routers.ai_router import router as ai_router
+from src.write_behind import get_write_behind_queue
+
+from .fake_llm_server import FakeLLMServer, serve_in_background
+
+
+PROMPT = "What is Kubo and what can you do?"
+
+
+def create_app() -> FastAPI:
+    """The worker's app: the AI router without a database (``uvicorn --factory``)."""
+    app = FastAPI()
+    app.include_router(ai_router)
+    # Anonymous chats save no history; discard the usage rows
+    queue = get_write_behind_queue()
+    queue.register(HISTORY_KIND, lambda db_manager, rows: len(rows))
+    queue.register(USAGE_KIND, lambda db_manager, rows: len(rows))
+    return app
+
+
+def _pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000 if values else 0.0
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status", encoding="ascii") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+@contextmanager
+def _worker(llm_url: str, port: int) -> Iterator[subprocess.Popen[bytes]]:
+    env = {
+        **os.environ,
+        "CEREBRAS_BASE_URL": llm_url,
+        "CEREBRAS_API_KEY": os.environ.get("CEREBRAS_API_KEY") or "offline",
+        "AI_RESPONSE_CACHE_ENABLED": "false",
+        "AI_FAST_PATH_ENABLED": "false",
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    command = [
+        sys.executable, "-m", "uvicorn", "benchmarks.ws_connections:create_app", "--factory",
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--backlog", "4096",
+    ]
+    process = subprocess.Popen(command, env=env)
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("The worker didn't start") from None
+                time.sleep(0.05)
+        yield process
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def _chat(websocket: ClientConnection, turn_id: str) -> tuple[float, float]:
+    """Time to the first delta and to the finish message."""
+    started = time.perf_counter()
+    await websocket.send(json.dumps({"type": "chat", "id": turn_id, "message": PROMPT}))
+    first = None
+    async for raw in websocket:
+        frame = json.loads(raw)
+        if frame["type"] == "delta" and first is None:
+            first = time.perf_counter() - started
+        elif frame["type"] == "error":
+            raise RuntimeError(frame["detail"])
+        elif frame["type"] == "finish":
+            elapsed = time.perf_counter() - started
+            return first if first is not None else elapsed, elapsed
+    raise RuntimeError("Socket closed mid-chat")
+
+
+async def _run(url: str, pid: int, steps: list[int], active: int, batch: int) -> None:
+    sockets: list[ClientConnection] = []
+    baseline = _rss_mb(pid)
+    print(f"worker rss before sockets: {baseline:.1f} MB")
+    print(
+        f"{'sockets':>8} {'open s':>7} {'rss MB':>7} {'KB/socket':>10} "
+        f"{'chats':>6} {'ttft p50':>9} {'ttft p95':>9} {'turn p95':>9} {'errors':>7}"
+    )
+    try:
+        for step, target in enumerate(steps):
+            started = time.perf_counter()
+            failure: BaseException | None = None
+            while len(sockets) < target and failure is None:
+                wanted = min(batch, target - len(sockets))
+                results = await asyncio.gather(
+                    *(connect(url, ping_interval=None, open_timeout=30) for _ in range(wanted)),
+                    return_exceptions=True,
+                )
+                for result in results:
+                    if isinstance(result, BaseException):
+                        failure = failure or result
+                    else:
+                        sockets.append(result)
+            opened = time.perf_counter() - started
+            await asyncio.sleep(0.5)
+            rss = _rss_mb(pid)
+
+            picked = random.sample(sockets, min(active, len(sockets)))
+            results = await asyncio.gather(
+                *(_chat(websocket, f"s{step}") for websocket in picked), return_exceptions=True
+            )
+            timings = [result for result in results if not isinstance(result, BaseException)]
+            first_tokens = [t[0] for t in timings]
+            print(
+                f"{len(sockets):>8} {opened:>7.2f} {rss:>7.1f} "
+                f"{(rss - baseline) * 1024 / max(1, len(sockets)):>10.1f} {len(picked):>6} "
+                f"{_pct(first_tokens, 0.5):>7.0f}ms {_pct(first_tokens, 0.95):>7.0f}ms "
+                f"{_pct([t[1] for t in timings], 0.95):>7.0f}ms {len(results) - len(timings):>7}",
+                flush=True,
+            )
+            if failure is not None:
+                print(f"stopped: opening socket {len(sockets) + 1} failed: {failure!r}")
+                break
+    finally:
+        await asyncio.gather(*(websocket.close() for websocket in sockets), return_exceptions=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument(
+        "--steps",
+        type=int,
+        nargs="+",
+        default=[500, 1000, 2000, 4000, 8000],
+        help="Open sockets per step.",
+    )
+    parser.add_argument("--active", type=int, default=16, help="Chats run at once at each step.")
+    parser.add_argument("--batch", type=int, default=200, help="Sockets opened concurrently.")
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="Fake model seconds before the first token."
+    )
+    parser.add_argument(
+        "--token-delay", type=float, default=0.005, help="Fake model seconds per word."
+    )
+    args = parser.parse_args()
+
+    fake = FakeLLMServer(latency=args.latency, token_delay=args.token_delay)
+    with serve_in_background(fake.create_app()) as llm_url:
+        port = _free_port()
+        with _worker(llm_url, port) as worker:
+            url = f"ws://127.0.0.1:{port}/ai/ws"
+            asyncio.run(_run(url, worker.pid, sorted(args.steps), args.active, args.batch))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from __future__ import annotations
+import asyncio
 import uvicorn
 
 from contextlib import asynccontextmanager
@@ -6,8 +7,20 @@ from typing import AsyncIterator
 
 from fastapi import FastAPI
 
+from src.ai.usage import USAGE_KIND, write_usage_batch
 from src.db import DatabaseManager
+from src.history import HISTORY_KIND, write_history_batch
+from src.metrics import get_metrics
+from src.ratelimit import build_rate_limiter
+from src.security import shutdown_hash_executor
+from src.sessions import (
+    SessionCookieMiddleware,
+    SessionGarbageCollector,
+    get_session_touch_buffer,
+)
 from src.settings import settings
+from src.tracing import TRACE_KIND, write_trace_batch
+from src.write_behind import get_write_behind_queue
 from src.routers.auth import router as auth_router
 from src.routers.kubo_router import router as kubo_router
 from fastapi.middleware.cors import CORSMiddleware
@@ -26,9 +39,29 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
 
     app.state.db_manager = db_manager
     app.state.session = session
+    app.state.rate_limiter = build_rate_limiter(db_manager)
+    touch_buffer = get_session_touch_buffer()
+    write_behind = get_write_behind_queue()
+    write_behind.register(HISTORY_KIND, write_history_batch)
+    write_behind.register(USAGE_KIND, write_usage_batch)
+    write_behind.register(TRACE_KIND, write_trace_batch)
+    write_behind.start(db_manager)
+    background_tasks = [
+        asyncio.create_task(SessionGarbageCollector(db_manager).run()),
+        asyncio.create_task(touch_buffer.run(db_manager)),
+    ]
     try:
         yield
     finally:
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        # Drain queued history/telemetry rows (or spill them) before the pool closes
+        await write_behind.stop()
+        try:
+            await touch_buffer.flush(db_manager)
+        except Exception:  # noqa: BLE001
+            pass
         # Release the session connection and close the pool on shutdown
         try:
             if getattr(app.state, "db_manager", None) is not None and getattr(app.state, "session", None) is not None:
@@ -36,6 +69,7 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
         finally:
             if getattr(app.state, "db_manager", None) is not None:
                 app.state.db_manager.close()
+            shutdown_hash_executor()
 
 
 app = FastAPI(title=settings.app_name, lifespan=lifespan)
@@ -43,6 +77,7 @@ app = FastAPI(title=settings.app_name, lifespan=lifespan)
 app.include_router(auth_router)
 app.include_router(kubo_router)
 app.include_router(ai_router)
+app.add_middleware(SessionCookieMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
@@ -57,6 +92,11 @@ async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def metrics() -> dict[str, object]:
+    return get_metrics().snapshot()
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
 
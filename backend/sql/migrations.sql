@@ -39,11 +39,23 @@ CREATE TABLE IF NOT EXISTS sessions (
   expires_at TIMESTAMPTZ NOT NULL,
   revoked BOOLEAN NOT NULL DEFAULT FALSE,
   ip_address VARCHAR(64),
-  user_agent TEXT
+  user_agent TEXT,
+  last_seen_at TIMESTAMPTZ
 );
 
+ALTER TABLE sessions ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMPTZ;
+
 CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions(user_id);
-CREATE INDEX IF NOT EXISTS idx_sessions_token_hash ON sessions(token_hash);
+
+-- token_hash is already covered by the UNIQUE constraint; session lookups only
+-- ever want live rows, so index just those (and carry the join/expiry columns).
+DROP INDEX IF EXISTS idx_sessions_token_hash;
+CREATE INDEX IF NOT EXISTS idx_sessions_live_token
+  ON sessions(token_hash) INCLUDE (user_id, expires_at)
+  WHERE revoked = FALSE;
+
+-- Lets the session GC find expired rows without scanning the table.
+CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions(expires_at);
 
 -- Pods (Rooms / Inventory & Pricing)
 CREATE TABLE IF NOT EXISTS pods (
@@ -96,14 +108,125 @@ FOR EACH ROW EXECUTE FUNCTION set_updated_at();
 
 
 -- Chat bot conversation history --------------------------------------------
-CREATE TABLE IF NOT EXISTS chat_history (
+-- Append-only: each turn inserts only its new messages. message_count is the
+-- last seq handed out, so appends number their rows without reading them.
+CREATE TABLE IF NOT EXISTS conversations (
   id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
   user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
-  message_history JSONB NOT NULL DEFAULT '[]'::jsonb,
+  message_count INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversations_user
+  ON conversations(user_id, updated_at DESC);
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+  conversation_id UUID NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+  seq INTEGER NOT NULL,
+  message JSONB NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (conversation_id, seq)
+);
+
+-- Older deployments stored a full snapshot of the conversation on every turn.
+-- Keep only snapshots no later snapshot extends, turn each into a
+-- conversation (reusing its id), then drop the snapshot table.
+DO $$
+BEGIN
+  IF to_regclass('chat_history') IS NOT NULL THEN
+    CREATE TEMP TABLE chat_history_kept ON COMMIT DROP AS
+    SELECT h.id, h.user_id, h.message_history, h.created_at
+    FROM chat_history h
+    WHERE jsonb_typeof(h.message_history) = 'array'
+      AND jsonb_array_length(h.message_history) > 0
+      AND NOT EXISTS (
+        SELECT 1
+        FROM chat_history later
+        WHERE later.user_id IS NOT DISTINCT FROM h.user_id
+          AND later.id <> h.id
+          AND jsonb_typeof(later.message_history) = 'array'
+          AND (
+            jsonb_array_length(later.message_history) > jsonb_array_length(h.message_history)
+            OR (
+              jsonb_array_length(later.message_history) = jsonb_array_length(h.message_history)
+              AND (later.created_at, later.id) > (h.created_at, h.id)
+            )
+          )
+          AND jsonb_path_query_array(
+                later.message_history,
+                '$[0 to $last]',
+                jsonb_build_object('last', jsonb_array_length(h.message_history) - 1)
+              ) = h.message_history
+      );
+
+    INSERT INTO conversations (id, user_id, message_count, created_at, updated_at)
+    SELECT id, user_id, jsonb_array_length(message_history), created_at, created_at
+    FROM chat_history_kept
+    ON CONFLICT (id) DO NOTHING;
+
+    INSERT INTO chat_messages (conversation_id, seq, message, created_at)
+    SELECT k.id, m.seq, m.message, k.created_at
+    FROM chat_history_kept k
+    CROSS JOIN LATERAL jsonb_array_elements(k.message_history) WITH ORDINALITY AS m(message, seq)
+    ON CONFLICT (conversation_id, seq) DO NOTHING;
+
+    DROP TABLE chat_history;
+  END IF;
+END
+$$;
+
+
+
+
+-- Per-request LLM usage, written in batches by the write-behind queue -------
+CREATE TABLE IF NOT EXISTS ai_request_log (
+  id BIGSERIAL PRIMARY KEY,
+  user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
+  endpoint TEXT NOT NULL,
+  model TEXT,
+  prompt_tokens INTEGER,
+  completion_tokens INTEGER,
+  tool_calls INTEGER NOT NULL DEFAULT 0,
+  duration_ms INTEGER NOT NULL,
   created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
-CREATE INDEX IF NOT EXISTS idx_chat_history_user
-  ON chat_history(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_ai_request_log_created ON ai_request_log(created_at);
+
+
+-- Shared rate limit buckets (only used with RATE_LIMIT_BACKEND=postgres) -----
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+  key TEXT PRIMARY KEY,
+  tokens DOUBLE PRECISION NOT NULL,
+  allowed BOOLEAN NOT NULL DEFAULT TRUE,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+
+-- Data versions for the AI caches --------------------------------------------
+-- Every write to pods or bookings bumps its tag, so each worker can tell its
+-- cached tool results and answers are stale (AI_DATA_VERSIONS_BACKEND=postgres).
+CREATE TABLE IF NOT EXISTS data_versions (
+  tag TEXT PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION bump_data_version()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO data_versions (tag, version) VALUES (TG_ARGV[0], 1)
+  ON CONFLICT (tag) DO UPDATE SET version = data_versions.version + 1;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
 
+DROP TRIGGER IF EXISTS trg_pods_data_version ON pods;
+CREATE TRIGGER trg_pods_data_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON pods
+FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('pods');
 
+DROP TRIGGER IF EXISTS trg_bookings_data_version ON bookings;
+CREATE TRIGGER trg_bookings_data_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON bookings
+FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('bookings');
@@ -1,15 +1,17 @@
 """AI integration utilities for interacting with Cerebras LLMs."""
 
-from .client import get_cerebras_client
-from .executor import ToolExecutor, execute_with_tools, execute_with_tools_streaming
+from .client import get_async_cerebras_client, get_cerebras_client
+from .executor import ToolEvent, ToolExecutor, execute_with_tools, execute_with_tools_streaming
 from .models import CEREBRAS_LATEST_MODELS
 from .prompts import SYSTEM_PROMPT
 from .tools import ToolRegistry, get_tool_registry
 
 __all__ = [
     "get_cerebras_client",
+    "get_async_cerebras_client",
     "CEREBRAS_LATEST_MODELS",
     "ToolExecutor",
+    "ToolEvent",
     "execute_with_tools",
     "execute_with_tools_streaming",
     "ToolRegistry",
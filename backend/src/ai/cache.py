@@ -0,0 +1,128 @@
+"""Small thread-safe TTL + LRU cache with tag-based invalidation.
+
+Entries remember the version of every data tag (e.g. ``"pods"``) they were
+computed from. Invalidating a tag just bumps its version, which makes every
+dependent entry stale in O(1); stale entries are dropped lazily on access or
+by LRU eviction.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable
+
+from ..metrics import get_metrics
+
+
+logger = logging.getLogger(__name__)
+
+Stamp = tuple[tuple[str, int], ...]
+
+
+class DataVersions:
+    """Monotonic version counters per data tag.
+
+    :meth:`bump` counts writes made by this process. Those counters restart at
+    zero with the process, so ``epoch`` identifies the process that issued a
+    stamp; stamps from another epoch can't be trusted.
+
+    ``shared`` reads counters every worker sees (the ``data_versions`` table,
+    which triggers bump on every write). A tag's version is then the sum of
+    both counters, so writes made through another worker, or straight to the
+    database, make entries stale too. When the shared counters can't be read,
+    nothing is current and nothing can be stamped.
+    """
+
+    def __init__(self, shared: Callable[[], dict[str, int]] | None = None) -> None:
+        self._lock = threading.Lock()
+        self._versions: dict[str, int] = {}
+        self._shared = shared
+        self.epoch = uuid.uuid4().hex
+
+    def _read(self, tags: list[str] | None) -> dict[str, int] | None:
+        """Versions of ``tags`` (None for all), or None if the shared ones are unavailable."""
+        with self._lock:
+            local = dict(self._versions)
+        if self._shared is None or tags == []:
+            return local
+        try:
+            shared = self._shared()
+        except Exception:  # noqa: BLE001
+            get_metrics().incr("data_versions.errors")
+            logger.exception("Could not read shared data versions")
+            return None
+        return {tag: local.get(tag, 0) + shared.get(tag, 0) for tag in local.keys() | shared.keys()}
+
+    def snapshot(self, tags: Iterable[str]) -> Stamp | None:
+        tags = sorted(set(tags))
+        versions = self._read(tags)
+        if versions is None:
+            return None
+        return tuple((tag, versions.get(tag, 0)) for tag in tags)
+
+    def snapshot_all(self) -> dict[str, int] | None:
+        return self._read(None)
+
+    def is_current(self, stamp: Stamp) -> bool:
+        versions = self._read([tag for tag, _ in stamp])
+        if versions is None:
+            return False
+        return all(versions.get(tag, 0) == version for tag, version in stamp)
+
+    def bump(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+
+class TTLCache:
+    """LRU-bounded cache whose entries expire after a TTL or on tag invalidation."""
+
+    def __init__(self, *, maxsize: int, versions: DataVersions, name: str) -> None:
+        self.maxsize = maxsize
+        self.versions = versions
+        self.name = name
+        self._lock = threading.Lock()
+        # key -> (expires_at monotonic, version stamp, value)
+        self._entries: OrderedDict[Hashable, tuple[float, Stamp, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        """Return ``(hit, value)``."""
+        metrics = get_metrics()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, stamp, value = entry
+            # Checked outside the lock: shared versions may take a query
+            fresh = expires_at > time.monotonic() and self.versions.is_current(stamp)
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    if fresh:
+                        self._entries.move_to_end(key)
+                    else:
+                        del self._entries[key]
+            if fresh:
+                metrics.incr(f"{self.name}.hits")
+                return True, value
+        metrics.incr(f"{self.name}.misses")
+        return False, None
+
+    def set(self, key: Hashable, value: Any, *, ttl: float, stamp: Stamp) -> None:
+        """Store ``value``; ``stamp`` must be taken *before* computing it."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, stamp, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                get_metrics().incr(f"{self.name}.evictions")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -5,17 +5,30 @@ Tool use documentation: https://inference-docs.cerebras.ai/capabilities/tool-use
 
 from __future__ import annotations
 
-from typing import Any, Iterator, Optional
+import asyncio
+import time
+from typing import Any, AsyncIterator, Iterator, Optional
 
-from cerebras.cloud.sdk import Cerebras
+from cerebras.cloud.sdk import AsyncCerebras, Cerebras
 
+from ..metrics import get_metrics
 from ..settings import settings
+from .models import get_model
+from .resilience import CircuitBreaker, backoff_delay, hedged, is_retryable
 
 
 class CerebrasClientError(RuntimeError):
     """Raised when a Cerebras API call fails."""
 
 
+class DeadlineExceededError(CerebrasClientError):
+    """Raised when the request's time budget runs out before the model answers."""
+
+
+class CircuitOpenError(CerebrasClientError):
+    """Raised without calling upstream while a model's circuit breaker is open."""
+
+
 class CerebrasClient:
     """Wrapper for interacting with Cerebras API using the official SDK."""
 
@@ -25,8 +38,31 @@ class CerebrasClient:
     _DEFAULT_MAX_TOKENS = 4096
     _DEFAULT_REASONING_EFFORT = "low"
 
-    def __init__(self, api_key: str) -> None:
-        self._client = Cerebras(api_key=api_key)
+    def __init__(self, api_key: str | None, base_url: str | None = None) -> None:
+        # The sync client relies on the SDK's own timeout and retries
+        self._client = Cerebras(
+            api_key=api_key,
+            base_url=base_url or settings.cerebras_base_url,
+            timeout=settings.ai_llm_timeout_seconds,
+            max_retries=settings.ai_llm_max_retries,
+        )
+
+    @classmethod
+    def _params(cls, model: str, messages: list[dict[str, Any]], stream: bool) -> dict[str, Any]:
+        """Request parameters shared by the sync and async clients."""
+        params: dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+            "stream": stream,
+            "temperature": cls._DEFAULT_TEMPERATURE,
+            "top_p": cls._DEFAULT_TOP_P,
+            "max_completion_tokens": cls._DEFAULT_MAX_TOKENS,
+        }
+        # Only reasoning models accept reasoning_effort
+        descriptor = get_model(model)
+        if descriptor is not None and descriptor.supports_reasoning:
+            params["reasoning_effort"] = cls._DEFAULT_REASONING_EFFORT
+        return params
 
     def chat_completion(
         self,
@@ -34,6 +70,7 @@ class CerebrasClient:
         messages: list[dict[str, str]],
         tools: list[dict[str, Any]] | None = None,
         stream: bool = False,
+        model: str | None = None,
     ) -> Any:
         """Call the Cerebras chat completions endpoint with optimal defaults.
         
@@ -41,6 +78,7 @@ class CerebrasClient:
             messages: Chat messages with role and content
             tools: Optional list of function tools (auto-populated from registry)
             stream: Whether to stream the response
+            model: Model identifier (defaults to ``gpt-oss-120b``)
             
         Returns:
             Completion response object or stream iterator
@@ -49,15 +87,7 @@ class CerebrasClient:
             https://inference-docs.cerebras.ai/capabilities/tool-use
         """
         try:
-            params: dict[str, Any] = {
-                "model": self._DEFAULT_MODEL,
-                "messages": messages,
-                "stream": stream,
-                "temperature": self._DEFAULT_TEMPERATURE,
-                "top_p": self._DEFAULT_TOP_P,
-                "max_completion_tokens": self._DEFAULT_MAX_TOKENS,
-                "reasoning_effort": self._DEFAULT_REASONING_EFFORT,
-            }
+            params = self._params(model or self._DEFAULT_MODEL, messages, stream)
             
             if tools is not None:
                 params["tools"] = tools
@@ -85,7 +115,225 @@ class CerebrasClient:
             yield chunk
 
 
+class AsyncCerebrasClient:
+    """Non-blocking counterpart of :class:`CerebrasClient` built on ``AsyncCerebras``.
+
+    Awaiting a completion yields the event loop, so one worker can keep many
+    chats in flight while the upstream model generates.
+
+    Every call runs against a deadline. Retryable failures are retried with
+    jittered backoff. A non-streaming attempt slower than the model's recent
+    latency percentile gets a hedged duplicate, and the faster one wins. A
+    circuit breaker per model fails fast while upstream is unhealthy.
+    """
+
+    _DEFAULT_MODEL = CerebrasClient._DEFAULT_MODEL
+    _DEFAULT_TEMPERATURE = CerebrasClient._DEFAULT_TEMPERATURE
+    _DEFAULT_TOP_P = CerebrasClient._DEFAULT_TOP_P
+    _DEFAULT_MAX_TOKENS = CerebrasClient._DEFAULT_MAX_TOKENS
+    _DEFAULT_REASONING_EFFORT = CerebrasClient._DEFAULT_REASONING_EFFORT
+
+    def __init__(
+        self, api_key: str | None, model: str | None = None, base_url: str | None = None
+    ) -> None:
+        # Retries are handled here, against the request deadline
+        self._client = AsyncCerebras(
+            api_key=api_key, base_url=base_url or settings.cerebras_base_url, max_retries=0
+        )
+        self.model = model or self._DEFAULT_MODEL
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    async def chat_completion(
+        self,
+        *,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None = None,
+        stream: bool = False,
+        model: str | None = None,
+        timeout: float | None = None,
+    ) -> Any:
+        """Call the chat completions endpoint; see :meth:`CerebrasClient.chat_completion`.
+
+        ``timeout`` is the time left in the caller's budget (default
+        ``AI_LLM_TIMEOUT_SECONDS``); retries and hedges all fit inside it. For a
+        stream, retries cover opening it. While it is read, each chunk must
+        arrive within the attempt timeout and the budget; a stalled stream
+        raises and counts as a failure.
+
+        Returns the completion, or an async iterator of chunks when ``stream`` is set.
+
+        Raises:
+            CircuitOpenError: The model's circuit breaker is open
+            DeadlineExceededError: The budget ran out
+            CerebrasClientError: Any other failure, after retries
+        """
+        model = model or self.model
+        params = CerebrasClient._params(model, messages, stream)
+        if tools is not None:
+            params["tools"] = tools
+
+        budget = settings.ai_llm_timeout_seconds if timeout is None else timeout
+        deadline = time.monotonic() + budget
+        breaker = self._breaker(model)
+        metrics = get_metrics()
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                metrics.incr("llm.circuit_rejections")
+                raise CircuitOpenError(f"Cerebras model {model} is unavailable (circuit open)")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                metrics.incr("llm.deadline_exceeded")
+                raise DeadlineExceededError(f"Cerebras API call exceeded its {budget:g}s budget")
+
+            try:
+                response = await self._attempt(model, params, remaining, stream)
+            except Exception as exc:
+                retryable = is_retryable(exc)
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    # Upstream answered; the request itself is at fault
+                    breaker.record_success()
+                delay = backoff_delay(
+                    attempt,
+                    base=settings.ai_llm_retry_base_seconds,
+                    cap=settings.ai_llm_retry_max_seconds,
+                )
+                if isinstance(exc, asyncio.TimeoutError) and deadline - time.monotonic() <= 0:
+                    metrics.incr("llm.deadline_exceeded")
+                    raise DeadlineExceededError(
+                        f"Cerebras API call exceeded its {budget:g}s budget"
+                    ) from exc
+                if (
+                    not retryable
+                    or attempt >= settings.ai_llm_max_retries
+                    or time.monotonic() + delay >= deadline
+                ):
+                    raise CerebrasClientError(f"Cerebras API call failed: {exc}") from exc
+                attempt += 1
+                metrics.incr("llm.retries")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled: says nothing about upstream, but a half-open
+                # breaker must not wait for this probe forever
+                breaker.release()
+                raise
+
+            breaker.record_success()
+            if stream:
+                return _GuardedStream(response, breaker, deadline, budget)
+            return response
+
+    async def _attempt(
+        self, model: str, params: dict[str, Any], remaining: float, stream: bool
+    ) -> Any:
+        """One attempt (possibly hedged), bounded by the per-attempt timeout."""
+        timeout = min(remaining, settings.ai_llm_attempt_timeout_seconds)
+
+        async def call() -> Any:
+            started = time.perf_counter()
+            request = self._client.chat.completions.create(**params)
+            response = await asyncio.wait_for(request, timeout)
+            get_metrics().observe(f"llm.latency_seconds.{model}", time.perf_counter() - started)
+            return response
+
+        if stream:
+            return await call()
+        return await hedged(call, self._hedge_delay(model, timeout))
+
+    @staticmethod
+    def _hedge_delay(model: str, timeout: float) -> float | None:
+        """When to send a hedged duplicate: the model's recent latency percentile."""
+        if not settings.ai_llm_hedge_enabled:
+            return None
+        metrics = get_metrics()
+        name = f"llm.latency_seconds.{model}"
+        # Too few samples to know what "slow" is yet
+        if metrics.count(name) < 20:
+            return None
+        delay = max(
+            metrics.percentile(name, settings.ai_llm_hedge_percentile),
+            settings.ai_llm_hedge_min_seconds,
+        )
+        return delay if delay < timeout else None
+
+    def _breaker(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = CircuitBreaker(
+                f"llm.{model}",
+                failure_threshold=settings.ai_llm_breaker_failures,
+                reset_timeout=settings.ai_llm_breaker_reset_seconds,
+            )
+        return breaker
+
+    async def chat_completion_stream(
+        self,
+        *,
+        messages: list[dict[str, Any]],
+    ) -> AsyncIterator[Any]:
+        """Stream chat completion chunks (without tool calling)."""
+        response_stream = await self.chat_completion(
+            messages=messages,
+            stream=True,
+        )
+
+        async for chunk in response_stream:
+            yield chunk
+
+
+class _GuardedStream:
+    """A completion stream whose chunks must keep arriving.
+
+    Each chunk gets ``AI_LLM_ATTEMPT_TIMEOUT_SECONDS``, capped by the request
+    deadline. A stall or a retryable read error counts against the model's
+    circuit breaker, like a failed call.
+    """
+
+    def __init__(
+        self, stream: Any, breaker: CircuitBreaker, deadline: float, budget: float
+    ) -> None:
+        self._stream = stream
+        self._iterator = stream.__aiter__()
+        self._breaker = breaker
+        self._deadline = deadline
+        self._budget = budget
+
+    def __aiter__(self) -> _GuardedStream:
+        return self
+
+    async def __anext__(self) -> Any:
+        timeout = min(self._deadline - time.monotonic(), settings.ai_llm_attempt_timeout_seconds)
+        try:
+            async with asyncio.timeout(max(0.0, timeout)):
+                return await self._iterator.__anext__()
+        except StopAsyncIteration:
+            raise
+        except TimeoutError as exc:
+            self._breaker.record_failure()
+            await self.close()
+            if self._deadline - time.monotonic() <= 0:
+                get_metrics().incr("llm.deadline_exceeded")
+                raise DeadlineExceededError(
+                    f"Cerebras API call exceeded its {self._budget:g}s budget"
+                ) from exc
+            get_metrics().incr("llm.stream_stalls")
+            raise CerebrasClientError(f"Cerebras stream stalled for {timeout:g}s") from exc
+        except Exception as exc:
+            if is_retryable(exc):
+                self._breaker.record_failure()
+            raise CerebrasClientError(f"Cerebras stream failed: {exc}") from exc
+
+    async def close(self) -> None:
+        close = getattr(self._stream, "close", None) or getattr(self._stream, "aclose", None)
+        if close is not None:
+            await close()
+
+
 _client_instance: Optional[CerebrasClient] = None
+_async_client_instance: Optional[AsyncCerebrasClient] = None
 
 
 def get_cerebras_client() -> CerebrasClient:
@@ -97,3 +345,12 @@ def get_cerebras_client() -> CerebrasClient:
     return _client_instance
 
 
+
+
+def get_async_cerebras_client() -> AsyncCerebrasClient:
+    """Return a cached AsyncCerebrasClient instance configured from settings."""
+
+    global _async_client_instance
+    if _async_client_instance is None:
+        _async_client_instance = AsyncCerebrasClient(settings.cerebras_api_key)
+    return _async_client_instance
@@ -0,0 +1,218 @@
+"""Keeps prompts inside a per-model token budget.
+
+Messages are measured with a cheap character-based estimate. When a
+conversation exceeds the budget, old tool results are compacted first, then
+older turns are folded into a rolling summary system message; the most recent
+turns are always sent verbatim. Summaries are cached per conversation and
+extended incrementally, so each new turn only summarises what's new.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from ..metrics import get_metrics
+from ..settings import settings
+from .client import AsyncCerebrasClient
+from .models import get_model
+
+
+# Roughly four characters per token for English text and JSON
+_CHARS_PER_TOKEN = 4
+_MESSAGE_OVERHEAD_TOKENS = 4
+_SUMMARY_HEADER = "Summary of the earlier conversation (older turns were condensed):"
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+def message_tokens(message: dict[str, Any]) -> int:
+    tokens = _MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content") or "")
+    if message.get("tool_calls"):
+        tokens += estimate_tokens(json.dumps(message["tool_calls"], default=str))
+    return tokens
+
+
+def _digest(messages: list[dict[str, Any]]) -> str:
+    encoded = json.dumps(messages, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+class ContextManager:
+    """Fits a message list into the prompt budget of a model."""
+
+    def __init__(self, *, max_conversations: int = 2048) -> None:
+        self._lock = threading.Lock()
+        self.max_conversations = max_conversations
+        # conversation id -> (messages summarised, digest of those messages, summary lines)
+        self._summaries: OrderedDict[str, tuple[int, str, list[str]]] = OrderedDict()
+
+    def budget_for(self, model: str, tools: list[dict[str, Any]] | None = None) -> int:
+        """Prompt tokens available for messages on ``model``."""
+        budget = settings.ai_context_budget_tokens
+        descriptor = get_model(model)
+        if descriptor is not None and descriptor.context_window:
+            # Leave room for the completion itself
+            window = descriptor.context_window - AsyncCerebrasClient._DEFAULT_MAX_TOKENS
+            budget = min(budget, window)
+        if tools:
+            budget -= estimate_tokens(json.dumps(tools))
+        return max(budget, 512)
+
+    def fit(
+        self,
+        messages: list[dict[str, Any]],
+        *,
+        model: str,
+        tools: list[dict[str, Any]] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Return a prompt for ``messages`` that fits the budget.
+
+        The input list is never modified; the full history stays with the caller.
+        """
+        budget = self.budget_for(model, tools)
+        before = sum(message_tokens(message) for message in messages)
+        if before <= budget:
+            return messages
+
+        head = 0
+        while head < len(messages) and messages[head].get("role") == "system":
+            head += 1
+        split = self._recent_start(messages, head, settings.ai_context_recent_messages)
+
+        # 1. Compact bulky tool results outside the recent window
+        older = [self._compact_tool_result(message) for message in messages[head:split]]
+        recent = list(messages[split:])
+        prompt = messages[:head] + older + recent
+        tokens = sum(message_tokens(message) for message in prompt)
+
+        # 2. Fold older turns into the rolling summary, shrinking the recent window if needed
+        while tokens > budget and split > head:
+            summary = self._summary_message(messages, head, split)
+            prompt = messages[:head] + [summary] + recent
+            tokens = sum(message_tokens(message) for message in prompt)
+            split = self._next_turn(messages, split)
+            if tokens <= budget or split >= len(messages):
+                break
+            recent = list(messages[split:])
+
+        # 3. Last resort: compact tool results in the verbatim window as well
+        if tokens > budget:
+            prompt = [self._compact_tool_result(message) for message in prompt]
+            tokens = sum(message_tokens(message) for message in prompt)
+
+        metrics = get_metrics()
+        metrics.incr("context.compacted_requests")
+        metrics.incr("context.tokens_saved", before - tokens)
+        metrics.observe("context.tokens_saved_per_request", before - tokens)
+        return prompt
+
+    @staticmethod
+    def _recent_start(messages: list[dict[str, Any]], floor: int, keep: int) -> int:
+        """Index where the verbatim window of (at most) ``keep`` messages begins.
+
+        Never starts on a tool result, so each tool message keeps the assistant
+        message that requested it.
+        """
+        start = max(floor, len(messages) - keep)
+        while start > floor and messages[start].get("role") == "tool":
+            start -= 1
+        return start
+
+    @staticmethod
+    def _next_turn(messages: list[dict[str, Any]], index: int) -> int:
+        """First index after ``index`` that doesn't start with a tool result."""
+        index += 1
+        while index < len(messages) and messages[index].get("role") == "tool":
+            index += 1
+        return index
+
+    @staticmethod
+    def _compact_tool_result(message: dict[str, Any]) -> dict[str, Any]:
+        if message.get("role") != "tool":
+            return message
+        content = message.get("content") or ""
+        limit = settings.ai_context_tool_result_tokens * _CHARS_PER_TOKEN
+        if len(content) <= limit:
+            return message
+        return {
+            **message,
+            "content": content[:limit]
+            + f"… [truncated {len(content) - limit} chars; call the tool again for full data]",
+        }
+
+    def _summary_message(
+        self, messages: list[dict[str, Any]], head: int, split: int
+    ) -> dict[str, Any]:
+        conversation_id = _digest(messages[head : head + 1])
+        prefix = messages[head:split]
+        with self._lock:
+            cached = self._summaries.get(conversation_id)
+        lines: list[str] = []
+        done = 0
+        if (
+            cached is not None
+            and cached[0] <= len(prefix)
+            and cached[1] == _digest(prefix[: cached[0]])
+        ):
+            done, lines = cached[0], list(cached[2])
+            get_metrics().incr("context.summary_cache_hits")
+        for message in prefix[done:]:
+            line = self._summary_line(message)
+            if line:
+                lines.append(line)
+
+        # Keep the newest lines that fit the summary budget
+        limit = settings.ai_context_summary_tokens * _CHARS_PER_TOKEN
+        kept: list[str] = []
+        used = 0
+        for line in reversed(lines):
+            used += len(line) + 1
+            if used > limit:
+                break
+            kept.append(line)
+        kept.reverse()
+
+        with self._lock:
+            self._summaries[conversation_id] = (len(prefix), _digest(prefix), kept)
+            self._summaries.move_to_end(conversation_id)
+            while len(self._summaries) > self.max_conversations:
+                self._summaries.popitem(last=False)
+        return {"role": "system", "content": "\n".join([_SUMMARY_HEADER, *kept])}
+
+    @staticmethod
+    def _summary_line(message: dict[str, Any]) -> str:
+        role = message.get("role")
+        content = message.get("content") or ""
+        if role == "user":
+            return f"- User: {_clip(content, 200)}"
+        if role == "assistant":
+            if message.get("tool_calls"):
+                calls = message["tool_calls"]
+                names = ", ".join(call.get("function", {}).get("name", "") for call in calls)
+                return f"- Assistant called: {names}"
+            return f"- Assistant: {_clip(content, 240)}" if content else ""
+        if role == "tool":
+            return f"- {message.get('name', 'tool')} returned {_clip(content, 120)}"
+        return ""
+
+
+_context_manager: Optional[ContextManager] = None
+
+
+def get_context_manager() -> ContextManager:
+    """Get or create the shared context manager."""
+    global _context_manager
+    if _context_manager is None:
+        _context_manager = ContextManager()
+    return _context_manager
@@ -0,0 +1,125 @@
+"""Server-side conversation state.
+
+Clients continue a conversation by id and send only their new message; the
+server supplies the history. Each worker keeps the recent messages of its
+active conversations in an LRU (``AI_CONVERSATION_CACHE_SIZE`` entries of at
+most ``AI_CONVERSATION_MAX_MESSAGES`` messages). A miss loads the tail of the
+conversation from the history store.
+
+Other workers may append to the same conversation, so a hit is checked
+against ``conversations.message_count``: if the store holds more messages
+than this worker has seen, the entry is reloaded. Turns are written through
+the write-behind queue, so a conversation that moves to another worker within
+``WRITE_BEHIND_FLUSH_MS`` of its last turn may still miss that turn.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from typing import Any
+
+from ..db import DatabaseManager
+from ..history import ConversationNotFoundError, HistoryStore
+from ..metrics import get_metrics
+from ..settings import settings
+
+_Entry = tuple[int, list[dict[str, Any]]]
+
+
+def _trim(messages: list[dict[str, Any]], limit: int) -> list[dict[str, Any]]:
+    """The newest ``limit`` messages, starting at a user message.
+
+    Cutting elsewhere could leave tool results without the assistant
+    message that called them.
+    """
+    if len(messages) <= limit:
+        return messages
+    tail = messages[-limit:]
+    start = next((i for i, message in enumerate(tail) if message.get("role") == "user"), len(tail))
+    return tail[start:]
+
+
+class ConversationCache:
+    """Per-worker LRU of recent messages, keyed by ``(user_id, conversation_id)``.
+
+    Each entry also holds the message count it reflects: the stored count when
+    it was loaded plus the messages this worker has appended since.
+    """
+
+    def __init__(self, capacity: int | None = None, max_messages: int | None = None) -> None:
+        self.capacity = capacity or settings.ai_conversation_cache_size
+        self.max_messages = max_messages or settings.ai_conversation_max_messages
+        # (user_id, conversation_id) -> (message count, recent messages)
+        self._entries: OrderedDict[tuple[int, str], _Entry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def history(
+        self, db_manager: DatabaseManager, user_id: int, conversation_id: str
+    ) -> list[dict[str, Any]]:
+        """Recent messages of a conversation, oldest first.
+
+        An id that isn't one of the user's conversations yields an empty
+        history; the next turn starts the conversation under that id.
+        """
+        metrics = get_metrics()
+        key = (user_id, conversation_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            seen, messages = entry
+            store = HistoryStore(db_manager)
+            stored_count = await asyncio.to_thread(store.message_count, user_id, conversation_id)
+            if (stored_count or 0) <= seen:
+                self._entries.move_to_end(key)
+                metrics.incr("conversations.cache_hits")
+                return list(messages)
+            # Another worker added to the conversation
+            metrics.incr("conversations.cache_stale")
+
+        metrics.incr("conversations.cache_misses")
+        try:
+            page = await asyncio.to_thread(
+                HistoryStore(db_manager).read, user_id, conversation_id, limit=self.max_messages
+            )
+            stored = page.messages
+        except ConversationNotFoundError:
+            stored = []
+        seen = stored[-1]["seq"] if stored else 0
+        # System prompts are rebuilt every turn; older rows may still hold them
+        messages = _trim(
+            [
+                {key: value for key, value in message.items() if key != "seq"}
+                for message in stored
+                if message.get("role") != "system"
+            ],
+            self.max_messages,
+        )
+        self._store(key, seen, messages)
+        return list(messages)
+
+    def append(self, user_id: int, conversation_id: str, messages: list[dict[str, Any]]) -> None:
+        """Record a finished turn."""
+        key = (user_id, conversation_id)
+        seen, cached = self._entries.get(key, (0, []))
+        self._store(key, seen + len(messages), _trim(cached + messages, self.max_messages))
+
+    def _store(self, key: tuple[int, str], seen: int, messages: list[dict[str, Any]]) -> None:
+        self._entries[key] = (seen, messages)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            get_metrics().incr("conversations.evictions")
+        get_metrics().set_gauge("conversations.cached", len(self._entries))
+
+
+_conversation_cache: ConversationCache | None = None
+
+
+def get_conversation_cache() -> ConversationCache:
+    """Get the per-worker conversation cache."""
+    global _conversation_cache
+    if _conversation_cache is None:
+        _conversation_cache = ConversationCache()
+    return _conversation_cache
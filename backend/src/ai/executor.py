@@ -5,32 +5,133 @@ Reference: https://inference-docs.cerebras.ai/capabilities/tool-use
 
 from __future__ import annotations
 
+import asyncio
 import json
-from typing import Any
+import time
+import uuid
+from contextlib import AbstractAsyncContextManager, aclosing, nullcontext
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator
 
-from .client import CerebrasClient, get_cerebras_client
+from .. import tracing
+from ..metrics import get_metrics
+from ..settings import settings
+from .client import (
+    AsyncCerebrasClient,
+    CerebrasClientError,
+    DeadlineExceededError,
+    get_async_cerebras_client,
+)
+from .context import ContextManager, get_context_manager, message_tokens
+from .fast_path import FastPathRouter, get_fast_path_router
 from .prompts import SYSTEM_PROMPT
-from .tools import get_tool_registry
+from .response_cache import ResponseCache, get_response_cache
+from .routing import ModelRouter, Route, get_model_router
+from .scheduler import LLMScheduler, get_llm_scheduler
+from .selection import ToolSelector, get_tool_selector
+from .tools import TOOL_DB_MAX_CONNECTIONS, get_tool_registry
+
+
+@dataclass(frozen=True)
+class ToolEvent:
+    """Tool progress emitted on the streaming path alongside content chunks.
+
+    ``kind`` is ``"tool_start"`` before a tool runs and ``"tool_end"`` after.
+    """
+
+    kind: str
+    tool_call_id: str
+    name: str
+    ok: bool = True
+
+
+def _field(obj: Any, name: str) -> Any:
+    """Read ``name`` from an SDK object or a plain dict."""
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _trace_response(span: Any, response: Any) -> None:
+    """Copy the model and token usage of a completion (or stream chunk) onto its span."""
+    model = _field(response, "model")
+    if model:
+        span.set("gen_ai.response.model", model)
+    usage = _field(response, "usage")
+    if usage:
+        span.set("gen_ai.usage.input_tokens", _field(usage, "prompt_tokens") or 0)
+        span.set("gen_ai.usage.output_tokens", _field(usage, "completion_tokens") or 0)
+
+
+# Sentinel ending the chunks of one streamed completion
+_END_OF_STREAM = object()
+
+
+async def _close_stream(stream: Any) -> None:
+    """Close a completion stream that wasn't read to the end, dropping its connection."""
+    close = getattr(stream, "close", None) or getattr(stream, "aclose", None)
+    if close is not None:
+        await close()
 
 
 class ToolExecutor:
-    """Orchestrates the tool calling loop with LLM."""
+    """Orchestrates the tool calling loop with LLM.
 
-    def __init__(self, client: CerebrasClient | None = None, max_iterations: int = 5) -> None:
+    The loop is fully async: LLM calls are awaited and the (blocking, DB-backed)
+    tools run in worker threads, so the event loop stays free for other chats.
+    """
+
+    def __init__(
+        self,
+        client: AsyncCerebrasClient | None = None,
+        max_iterations: int = 5,
+        response_cache: ResponseCache | None = None,
+        context_manager: ContextManager | None = None,
+        tool_selector: ToolSelector | None = None,
+        fast_path: FastPathRouter | None = None,
+        model_router: ModelRouter | None = None,
+        scheduler: LLMScheduler | None = None,
+    ) -> None:
         """Initialize the tool executor.
         
         Args:
-            client: Cerebras client instance
+            client: Async Cerebras client instance
             max_iterations: Maximum number of tool calling iterations to prevent infinite loops
+            response_cache: Cache of complete answers (defaults to the shared one, if enabled)
+            context_manager: Fits each prompt into the model's token budget
+            tool_selector: Picks the tools offered per turn (defaults to the
+                shared one when ``AI_TOOL_SELECTION_ENABLED``; otherwise all tools)
+            fast_path: Answers simple requests without the LLM (defaults to the
+                shared router when ``AI_FAST_PATH_ENABLED``)
+            model_router: Picks the model per turn (defaults to the shared router
+                when ``AI_MODEL_ROUTING_ENABLED``; otherwise the client's model)
+            scheduler: Bounds and orders LLM calls (defaults to the worker's
+                scheduler when ``AI_SCHEDULER_ENABLED``)
         """
-        self.client = client or get_cerebras_client()
+        self.client = client or get_async_cerebras_client()
         self.max_iterations = max_iterations
         self.tool_registry = get_tool_registry()
+        self.response_cache = response_cache if response_cache is not None else get_response_cache()
+        self.context_manager = context_manager or get_context_manager()
+        if tool_selector is None and settings.ai_tool_selection_enabled:
+            tool_selector = get_tool_selector()
+        self.tool_selector = tool_selector
+        if fast_path is None and settings.ai_fast_path_enabled:
+            fast_path = get_fast_path_router()
+        self.fast_path = fast_path
+        if model_router is None and settings.ai_model_routing_enabled:
+            model_router = get_model_router()
+        self.model_router = model_router
+        if scheduler is None and settings.ai_scheduler_enabled:
+            scheduler = get_llm_scheduler()
+        self.scheduler = scheduler
 
-    def execute_with_tools(
+    async def execute_with_tools(
         self,
         *,
         messages: list[dict[str, Any]],
+        endpoint: str = "default",
+        client_key: str = "anonymous",
     ) -> tuple[Any, list[dict[str, Any]]]:
         """Execute a chat completion with automatic tool calling.
         
@@ -42,27 +143,59 @@ class ToolExecutor:
         
         Args:
             messages: Initial conversation messages
+            endpoint: Calling endpoint, used to look up its routing policy and priority
+            client_key: Caller identity for fair scheduling of LLM calls
             
         Returns:
             Tuple of (final_response, full_conversation_history)
         """
-        # Get all registered tools
-        tools = self.tool_registry.get_all_schemas()
+        # Simple requests are answered without the LLM
+        fast = await self._try_fast_path(messages)
+        if fast is not None:
+            tracing.annotate(**{"ai.fast_path": True})
+            return fast["response"], list(messages) + fast["messages"]
+        
+        # Pick the tools for this turn
+        tools, system_prompt = self._select_tools(messages)
         
         # Add system prompt if not already present
         has_system = any(msg.get("role") == "system" for msg in messages)
         if not has_system:
-            messages = [{"role": "system", "content": SYSTEM_PROMPT}] + list(messages)
+            messages = [{"role": "system", "content": system_prompt}] + list(messages)
+        
+        # Serve repeated conversations from the response cache
+        response_cache = self.response_cache
+        cache_key = None
+        versions_before: dict[str, int] | None = {}
+        started = time.perf_counter()
+        if response_cache is not None:
+            cache_key = response_cache.make_key(messages, model=self._model_key(endpoint))
+            cached = await response_cache.get(cache_key)
+            if cached is not None:
+                tracing.annotate(**{"ai.response_cache_hit": True})
+                return cached["response"], list(messages) + cached["messages"]
+            # Shared versions may take a query
+            versions_before = await asyncio.to_thread(self.tool_registry.data_versions.snapshot_all)
         
         # Make a copy of messages to track the conversation
         conversation = list(messages)
+        route = self._start_route(endpoint, conversation, tools)
+        deadline = time.monotonic() + settings.ai_request_budget_seconds
+        response: Any = None
         
         for iteration in range(self.max_iterations):
             # Call LLM
-            response = self.client.chat_completion(
-                messages=conversation,
-                tools=tools,
-            )
+            with tracing.span("llm.chat", **{"llm.turn": iteration}) as span:
+                queued = time.perf_counter()
+                try:
+                    async with self._llm_slot(client_key, endpoint, conversation, deadline):
+                        span.set("llm.queue_ms", round((time.perf_counter() - queued) * 1000, 2))
+                        response = await self._complete(route, conversation, tools, deadline)
+                except asyncio.CancelledError:
+                    span.set("llm.cancelled", True)
+                    get_metrics().incr("ai.cancel.llm_calls")
+                    raise
+                _trace_response(span, response)
             
             # Extract the assistant message
             if hasattr(response, 'choices'):
@@ -82,23 +215,243 @@ class ToolExecutor:
             
             if not tool_calls:
                 # No more tool calls, return final response
+                if response_cache is not None and cache_key is not None:
+                    generated = conversation[len(messages):]
+                    stamp = response_cache.stamp_for(generated, versions_before)
+                    if stamp is not None:
+                        await response_cache.put(
+                            cache_key,
+                            response=response,
+                            generated=generated,
+                            stamp=stamp,
+                            elapsed=time.perf_counter() - started,
+                        )
                 return response, conversation
             
-            # Execute each tool call
-            for tool_call in tool_calls:
-                tool_result = self._execute_tool_call(tool_call)
-                
-                # Add tool result to conversation
-                conversation.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.get("id", ""),
-                    "name": tool_call.get("function", {}).get("name", ""),
-                    "content": tool_result,
-                })
+            self._after_turn(route, tool_calls, conversation, tools)
+            
+            # Execute the tool calls (read-only ones concurrently) and add
+            # the results to the conversation in the original order
+            tool_results = await self._execute_tool_calls(tool_calls)
+            for tool_call, tool_result in zip(tool_calls, tool_results):
+                conversation.append(self._tool_result_message(tool_call, tool_result))
         
         # Max iterations reached, return last response
         return response, conversation
 
+    async def execute_with_tools_streaming(
+        self,
+        *,
+        messages: list[dict[str, Any]],
+        endpoint: str = "default",
+        client_key: str = "anonymous",
+        transcript: list[dict[str, Any]] | None = None,
+    ) -> AsyncGenerator[Any, None]:
+        """Stream a chat completion with automatic tool calling in a single pass.
+        
+        Every LLM turn is streamed. Content chunks are forwarded as they arrive
+        while tool-call deltas are assembled on the fly; when a turn ends with
+        tool calls they are executed (emitting :class:`ToolEvent` progress) and
+        the next turn is streamed. The final answer is generated exactly once.
+        
+        Args:
+            messages: Initial conversation messages
+            endpoint: Calling endpoint, used to look up its routing policy and priority
+            client_key: Caller identity for fair scheduling of LLM calls
+            transcript: Receives the messages this request generated (assistant
+                turns and tool results), even if the stream is abandoned
+            
+        Yields:
+            SDK chunks carrying content, and ToolEvent instances
+        """
+        fast = await self._try_fast_path(messages)
+        if fast is not None:
+            if transcript is not None:
+                transcript.extend(fast["messages"])
+            tool_call = fast["messages"][0]["tool_calls"][0]
+            ok = not fast["messages"][1]["content"].startswith('{"error"')
+            yield ToolEvent("tool_start", tool_call["id"], tool_call["function"]["name"])
+            yield ToolEvent("tool_end", tool_call["id"], tool_call["function"]["name"], ok=ok)
+            yield {
+                "id": fast["response"]["id"],
+                "object": "chat.completion.chunk",
+                "model": fast["response"]["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"role": "assistant", "content": fast["text"]},
+                        "finish_reason": "stop",
+                    }
+                ],
+            }
+            return
+        
+        tools, system_prompt = self._select_tools(messages)
+        
+        has_system = any(msg.get("role") == "system" for msg in messages)
+        if not has_system:
+            messages = [{"role": "system", "content": system_prompt}] + list(messages)
+        
+        conversation = list(messages)
+        try:
+            # Closed here, so its cleanup lands in the transcript below
+            turns = self._stream_turns(conversation, tools, endpoint, client_key)
+            async with aclosing(turns):
+                async for event in turns:
+                    yield event
+        finally:
+            if transcript is not None:
+                transcript.extend(conversation[len(messages):])
+
+    async def _stream_turns(
+        self,
+        conversation: list[dict[str, Any]],
+        tools: list[dict[str, Any]],
+        endpoint: str,
+        client_key: str,
+    ) -> AsyncGenerator[Any, None]:
+        """The LLM/tool loop of :meth:`execute_with_tools_streaming`.
+
+        Appends to ``conversation``.
+        """
+        route = self._start_route(endpoint, conversation, tools)
+        deadline = time.monotonic() + settings.ai_request_budget_seconds
+        
+        for iteration in range(self.max_iterations):
+            # Not current: the span stays open while chunks are yielded
+            span = tracing.start_span("llm.chat", **{"llm.turn": iteration, "llm.stream": True})
+            # Read by its own task, so the slot is freed when upstream finishes
+            # rather than when a slow client has taken every chunk
+            chunks: asyncio.Queue[Any] = asyncio.Queue()
+            reader = asyncio.ensure_future(
+                self._read_completion(
+                    route, conversation, tools, endpoint, client_key, deadline, span, chunks
+                )
+            )
+            content_parts: list[str] = []
+            pending_calls: dict[int, dict[str, Any]] = {}
+            try:
+                while (chunk := await chunks.get()) is not _END_OF_STREAM:
+                    choices = _field(chunk, "choices") or []
+                    if not choices:
+                        continue
+                    delta = _field(choices[0], "delta") or {}
+
+                    for position, tc_delta in enumerate(_field(delta, "tool_calls") or []):
+                        index = _field(tc_delta, "index")
+                        call = pending_calls.setdefault(
+                            position if index is None else index,
+                            {
+                                "id": "",
+                                "type": "function",
+                                "function": {"name": "", "arguments": ""},
+                            },
+                        )
+                        if _field(tc_delta, "id"):
+                            call["id"] = _field(tc_delta, "id")
+                        function = _field(tc_delta, "function")
+                        if function is not None:
+                            call["function"]["name"] += _field(function, "name") or ""
+                            call["function"]["arguments"] += _field(function, "arguments") or ""
+
+                    content = _field(delta, "content")
+                    if content:
+                        content_parts.append(content)
+                        yield chunk
+                    elif _field(choices[0], "finish_reason") and not pending_calls:
+                        yield chunk
+                # Raises whatever ended the completion early
+                await reader
+            except (asyncio.CancelledError, GeneratorExit):
+                span.set("llm.cancelled", True)
+                get_metrics().incr("ai.cancel.llm_calls")
+                if content_parts:
+                    # The client has seen this much of the answer
+                    conversation.append({"role": "assistant", "content": "".join(content_parts)})
+                raise
+            except Exception as exc:
+                span.fail(exc)
+                raise
+            finally:
+                if not reader.done():
+                    # Aborts the completion instead of letting upstream generate into a dead socket
+                    reader.cancel()
+                    await asyncio.gather(reader, return_exceptions=True)
+                span.end()
+            
+            tool_calls = [pending_calls[index] for index in sorted(pending_calls)]
+            assistant_message: dict[str, Any] = {
+                "role": "assistant",
+                "content": "".join(content_parts) or None,
+            }
+            if tool_calls:
+                assistant_message["tool_calls"] = tool_calls
+            conversation.append(assistant_message)
+            
+            if not tool_calls:
+                return
+            
+            self._after_turn(route, tool_calls, conversation, tools)
+            finished: dict[str, str] = {}
+            try:
+                for batch in self._tool_batches(tool_calls):
+                    for tool_call in batch:
+                        name = tool_call["function"]["name"]
+                        yield ToolEvent("tool_start", tool_call["id"], name)
+                    tool_results = await self._run_tool_batch(batch, finished)
+                    for tool_call, tool_result in zip(batch, tool_results):
+                        conversation.append(self._tool_result_message(tool_call, tool_result))
+                    for tool_call, tool_result in zip(batch, tool_results):
+                        yield ToolEvent(
+                            "tool_end",
+                            tool_call["id"],
+                            tool_call["function"]["name"],
+                            ok=not tool_result.startswith('{"error"'),
+                        )
+            except (asyncio.CancelledError, GeneratorExit):
+                self._answer_cancelled_calls(tool_calls, conversation, finished)
+                raise
+
+    async def _read_completion(
+        self,
+        route: Route | None,
+        conversation: list[dict[str, Any]],
+        tools: list[dict[str, Any]],
+        endpoint: str,
+        client_key: str,
+        deadline: float,
+        span: Any,
+        chunks: asyncio.Queue[Any],
+    ) -> None:
+        """Read one streamed completion into ``chunks``, holding a scheduler slot meanwhile.
+
+        Ends ``chunks`` with ``_END_OF_STREAM`` however the completion ends; a
+        cancelled read closes the stream, dropping its upstream connection.
+        """
+        queued = time.perf_counter()
+        stream = None
+        try:
+            async with self._llm_slot(client_key, endpoint, conversation, deadline):
+                sent = time.perf_counter()
+                span.set("llm.queue_ms", round((sent - queued) * 1000, 2))
+                stream = await self._complete(route, conversation, tools, deadline, stream=True)
+                first_token = True
+                async for chunk in stream:
+                    _trace_response(span, chunk)
+                    if first_token:
+                        choices = _field(chunk, "choices") or []
+                        delta = (_field(choices[0], "delta") or {}) if choices else {}
+                        if _field(delta, "content") or _field(delta, "tool_calls"):
+                            first_token = False
+                            span.set("llm.ttft_ms", round((time.perf_counter() - sent) * 1000, 2))
+                    chunks.put_nowait(chunk)
+                # Read to the end, so the SDK has released the connection
+                stream = None
+        finally:
+            if stream is not None:
+                await _close_stream(stream)
+            chunks.put_nowait(_END_OF_STREAM)
+
     def _extract_tool_calls(self, message: Any) -> list[dict[str, Any]]:
         """Extract tool calls from the assistant message.
         
@@ -149,6 +502,302 @@ class ToolExecutor:
             "content": getattr(message, 'content', ''),
         }
 
+    async def _try_fast_path(self, messages: list[dict[str, Any]]) -> dict[str, Any] | None:
+        """Answer ``messages`` through the fast path, or return None to use the LLM.
+
+        Returns the completion-shaped ``response``, the answer ``text`` and the
+        generated ``messages`` (tool call, tool result and answer).
+        """
+        if self.fast_path is None:
+            return None
+        metrics = get_metrics()
+        started = time.perf_counter()
+        match = self.fast_path.match(messages)
+        if match is None:
+            metrics.incr("fast_path.misses")
+            self._record_fast_path_coverage()
+            return None
+        
+        tool_call = {
+            "id": f"fast_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {"name": match.tool, "arguments": json.dumps(match.arguments)},
+        }
+        result = await self._execute_tool_call_async(tool_call)
+        text = self.fast_path.render(match, result)
+        if text is None:
+            metrics.incr("fast_path.fallthroughs")
+            self._record_fast_path_coverage()
+            return None
+        
+        metrics.incr("fast_path.hits")
+        metrics.incr(f"fast_path.hits.{match.intent}")
+        metrics.observe("fast_path.latency_seconds", time.perf_counter() - started)
+        self._record_fast_path_coverage()
+        answer = {"role": "assistant", "content": text}
+        return {
+            "response": {
+                "id": f"chatcmpl-{tool_call['id']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": "fast-path",
+                "choices": [{"index": 0, "message": answer, "finish_reason": "stop"}],
+            },
+            "text": text,
+            "messages": [
+                {"role": "assistant", "content": None, "tool_calls": [tool_call]},
+                self._tool_result_message(tool_call, result),
+                answer,
+            ],
+        }
+
+    @staticmethod
+    def _record_fast_path_coverage() -> None:
+        metrics = get_metrics()
+        hits = metrics.counter("fast_path.hits")
+        misses = metrics.counter("fast_path.misses") + metrics.counter("fast_path.fallthroughs")
+        total = hits + misses
+        metrics.set_gauge("fast_path.coverage", hits / total if total else 0.0)
+
+    def _select_tools(self, messages: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], str]:
+        """Tool schemas and default system prompt for this turn."""
+        if self.tool_selector is None:
+            return self.tool_registry.get_all_schemas(), SYSTEM_PROMPT
+        return self.tool_selector.select(messages)
+
+    def _prompt(
+        self,
+        conversation: list[dict[str, Any]],
+        tools: list[dict[str, Any]],
+        model: str,
+    ) -> list[dict[str, Any]]:
+        """Messages to send for the next turn; the full conversation is kept as-is."""
+        return self.context_manager.fit(conversation, model=model, tools=tools)
+
+    def _model_key(self, endpoint: str) -> str:
+        """What the answer depends on besides the messages: the policy or the fixed model."""
+        if self.model_router is None:
+            return getattr(self.client, "model", "")
+        return f"policy:{self.model_router.policy_for(endpoint).name}"
+
+    @staticmethod
+    def _routing_tokens(conversation: list[dict[str, Any]]) -> int:
+        """Prompt size used to check models' context windows (after compaction)."""
+        tokens = sum(message_tokens(message) for message in conversation)
+        return min(tokens, settings.ai_context_budget_tokens)
+
+    def _start_route(
+        self,
+        endpoint: str,
+        conversation: list[dict[str, Any]],
+        tools: list[dict[str, Any]],
+    ) -> Route | None:
+        if self.model_router is None:
+            return None
+        tokens = self._routing_tokens(conversation)
+        return self.model_router.start(endpoint, conversation, tools, tokens)
+
+    def _after_turn(
+        self,
+        route: Route | None,
+        tool_calls: list[dict[str, Any]],
+        conversation: list[dict[str, Any]],
+        tools: list[dict[str, Any]],
+    ) -> None:
+        if route is not None and self.model_router is not None:
+            tokens = self._routing_tokens(conversation)
+            self.model_router.after_turn(route, tool_calls, tools, tokens)
+
+    def _llm_slot(
+        self,
+        client_key: str,
+        endpoint: str,
+        conversation: list[dict[str, Any]],
+        deadline: float,
+    ) -> AbstractAsyncContextManager[None]:
+        """Scheduler slot for one LLM turn, charged by prompt size."""
+        if self.scheduler is None:
+            return nullcontext()
+        return self.scheduler.slot(
+            client=client_key,
+            priority=self.scheduler.priority_for(endpoint),
+            cost=self._routing_tokens(conversation),
+            deadline=deadline,
+        )
+
+    async def _complete(
+        self,
+        route: Route | None,
+        conversation: list[dict[str, Any]],
+        tools: list[dict[str, Any]],
+        deadline: float,
+        *,
+        stream: bool = False,
+    ) -> Any:
+        """Call the LLM for one turn on the routed model, escalating on failure.
+
+        Each call gets whatever is left of the request budget as its timeout.
+        """
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceededError(
+                    f"Request exceeded its {settings.ai_request_budget_seconds:g}s budget"
+                )
+            router = self.model_router
+            if route is None or router is None:
+                return await self.client.chat_completion(
+                    messages=self._prompt(conversation, tools, getattr(self.client, "model", "")),
+                    tools=tools,
+                    stream=stream,
+                    timeout=remaining,
+                )
+            model = route.model
+            started = time.perf_counter()
+            try:
+                response = await self.client.chat_completion(
+                    messages=self._prompt(conversation, tools, model),
+                    tools=tools,
+                    stream=stream,
+                    model=model,
+                    timeout=remaining,
+                )
+            except DeadlineExceededError:
+                # Another model won't be faster than the time that's left
+                raise
+            except CerebrasClientError:
+                router.record(model, time.perf_counter() - started, ok=False)
+                if not router.escalate(route, tools, self._routing_tokens(conversation)):
+                    raise
+                continue
+            router.record(model, time.perf_counter() - started, ok=True)
+            return response
+
+    def _tool_batches(self, tool_calls: list[dict[str, Any]]) -> list[list[dict[str, Any]]]:
+        """Split tool calls into batches that may run concurrently.
+        
+        Consecutive read-only calls share a batch; any call with side effects
+        gets a batch of its own, so writes keep their order relative to
+        everything around them.
+        """
+        batches: list[list[dict[str, Any]]] = []
+        previous_read_only = False
+        for tool_call in tool_calls:
+            name = tool_call.get("function", {}).get("name", "")
+            read_only = self.tool_registry.is_read_only(name)
+            if read_only and previous_read_only:
+                batches[-1].append(tool_call)
+            else:
+                batches.append([tool_call])
+            previous_read_only = read_only
+        return batches
+
+    async def _run_tool_batch(
+        self,
+        batch: list[dict[str, Any]],
+        finished: dict[str, str] | None = None,
+    ) -> list[str]:
+        """Results of one batch from :meth:`_tool_batches`.
+        
+        Cancelling drops read-only calls at once. A call with side effects is
+        left to finish first, so the caller learns what it did: its result
+        goes to ``finished`` under the call id before the cancellation is
+        re-raised.
+        """
+        if len(batch) > 1:
+            calls = (self._execute_tool_call_async(call) for call in batch)
+            return list(await asyncio.gather(*calls))
+        tool_call = batch[0]
+        if self.tool_registry.is_read_only(tool_call.get("function", {}).get("name", "")):
+            return [await self._execute_tool_call_async(tool_call)]
+        task = asyncio.ensure_future(self._execute_tool_call_async(tool_call))
+        try:
+            return [await asyncio.shield(task)]
+        except asyncio.CancelledError:
+            result = await task
+            get_metrics().incr("ai.cancel.writes_completed")
+            if finished is not None:
+                finished[tool_call.get("id", "")] = result
+            raise
+
+    async def _execute_tool_calls(self, tool_calls: list[dict[str, Any]]) -> list[str]:
+        """Execute tool calls, returning results in the original order."""
+        results: list[str] = []
+        finished: dict[str, str] = {}
+        try:
+            for batch in self._tool_batches(tool_calls):
+                results.extend(await self._run_tool_batch(batch, finished))
+        except asyncio.CancelledError:
+            skipped = len(tool_calls) - len(results) - len(finished)
+            get_metrics().incr("ai.cancel.tool_calls_skipped", skipped)
+            raise
+        return results
+
+    def _answer_cancelled_calls(
+        self,
+        tool_calls: list[dict[str, Any]],
+        conversation: list[dict[str, Any]],
+        finished: dict[str, str],
+    ) -> None:
+        """Give each of the turn's tool calls a result after a cancellation.
+        
+        Calls that finished keep their result; the rest are recorded as
+        cancelled, so the conversation can still be sent to the model.
+        """
+        answered = {
+            message.get("tool_call_id") for message in conversation if message.get("role") == "tool"
+        }
+        skipped = 0
+        for tool_call in tool_calls:
+            if tool_call["id"] in answered:
+                continue
+            result = finished.get(tool_call["id"])
+            if result is None:
+                skipped += 1
+                result = json.dumps({"error": "Cancelled: the client disconnected"})
+            conversation.append(self._tool_result_message(tool_call, result))
+        get_metrics().incr("ai.cancel.tool_calls_skipped", skipped)
+
+    def _tool_result_message(self, tool_call: dict[str, Any], tool_result: str) -> dict[str, Any]:
+        return {
+            "role": "tool",
+            "tool_call_id": tool_call.get("id", ""),
+            "name": tool_call.get("function", {}).get("name", ""),
+            "content": tool_result,
+        }
+
+    async def _execute_tool_call_async(self, tool_call: dict[str, Any]) -> str:
+        """Run :meth:`_execute_tool_call` in a worker thread.
+        
+        A read-only tool is given up on after ``AI_TOOL_TIMEOUT_SECONDS``. A
+        tool with side effects isn't: its thread can't be stopped, so the
+        model would be told it failed while, say, the booking still commits.
+        Either way the thread keeps its slot until it really ends, which
+        keeps running tools within the tools' connection pool.
+        """
+        function = tool_call.get("function", {})
+        name = function.get("name", "")
+        arguments = function.get("arguments") or ""
+        if not isinstance(arguments, str):
+            arguments = json.dumps(arguments)
+        attributes = {"tool.name": name, "tool.args_bytes": len(arguments)}
+        with tracing.span("tool.execute", **attributes) as span:
+            slots = get_tool_slots()
+            await slots.acquire()
+            thread = asyncio.ensure_future(asyncio.to_thread(self._execute_tool_call, tool_call))
+            thread.add_done_callback(lambda _: slots.release())
+            timeout = settings.ai_tool_timeout_seconds
+            try:
+                if self.tool_registry.is_read_only(name):
+                    result = await asyncio.wait_for(asyncio.shield(thread), timeout=timeout)
+                else:
+                    result = await asyncio.shield(thread)
+            except asyncio.TimeoutError:
+                result = json.dumps({"error": f"Tool '{name}' timed out after {timeout:g}s"})
+            span.set("tool.result_bytes", len(result))
+            span.set("tool.ok", not result.startswith('{"error"'))
+            return result
+
     def _execute_tool_call(self, tool_call: dict[str, Any]) -> str:
         """Execute a single tool call.
         
@@ -184,98 +833,70 @@ class ToolExecutor:
             return json.dumps({"error": f"Tool execution failed: {exc}"})
 
 
-def execute_with_tools(
+_tool_slots: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+
+def get_tool_slots() -> asyncio.Semaphore:
+    """This worker's limit on tool threads, shared by every executor.
+
+    ``AI_TOOL_CONCURRENCY``, capped by the tools' connection pool, which
+    raises rather than waits when it runs out. A semaphore only works on one
+    event loop, so a new loop (e.g. each ``asyncio.run`` of a benchmark) gets
+    a new one.
+    """
+    global _tool_slots
+    loop = asyncio.get_running_loop()
+    if _tool_slots is None or _tool_slots[0] is not loop:
+        limit = max(1, min(settings.ai_tool_concurrency, TOOL_DB_MAX_CONNECTIONS))
+        _tool_slots = (loop, asyncio.Semaphore(limit))
+    return _tool_slots[1]
+
+
+async def execute_with_tools(
     *,
     messages: list[dict[str, Any]],
+    endpoint: str = "default",
+    client_key: str = "anonymous",
 ) -> tuple[Any, list[dict[str, Any]]]:
     """Convenience function to execute chat with tool calling.
     
     Args:
         messages: Initial conversation messages
+        endpoint: Calling endpoint, used to look up its routing policy and priority
+        client_key: Caller identity for fair scheduling of LLM calls
         
     Returns:
         Tuple of (final_response, conversation_history)
     """
     executor = ToolExecutor()
-    return executor.execute_with_tools(messages=messages)
+    return await executor.execute_with_tools(
+        messages=messages, endpoint=endpoint, client_key=client_key
+    )
 
 
-def execute_with_tools_streaming(
+async def execute_with_tools_streaming(
     *,
     messages: list[dict[str, Any]],
-) -> Any:
-    """Execute chat with tool calling and stream the final response.
-    
-    This function:
-    1. Handles the tool calling loop (blocking)
-    2. Executes any tools needed
-    3. Streams only the final response after all tools are done
+    endpoint: str = "default",
+    client_key: str = "anonymous",
+    transcript: list[dict[str, Any]] | None = None,
+) -> AsyncGenerator[Any, None]:
+    """Convenience function to stream chat with tool calling.
     
     Args:
         messages: Initial conversation messages
+        endpoint: Calling endpoint, used to look up its routing policy and priority
+        client_key: Caller identity for fair scheduling of LLM calls
+        transcript: Receives the messages the request generated
         
     Yields:
-        Response chunks from the final streaming completion
+        Content chunks and ToolEvent progress events
     """
     executor = ToolExecutor()
-    
-    # Get all registered tools
-    tools = executor.tool_registry.get_all_schemas()
-    
-    # Add system prompt if not already present
-    has_system = any(msg.get("role") == "system" for msg in messages)
-    if not has_system:
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}] + list(messages)
-    
-    # Make a copy of messages to track the conversation
-    conversation = list(messages)
-    
-    # Handle tool calling loop (blocking until no more tools needed)
-    for iteration in range(executor.max_iterations):
-        # Call LLM (blocking)
-        response = executor.client.chat_completion(
-            messages=conversation,
-            tools=tools,
-        )
-        
-        # Extract the assistant message
-        if hasattr(response, 'choices'):
-            choice = response.choices[0]
-            message = choice.message
-        else:
-            choice = response.get('choices', [{}])[0]
-            message = choice.get('message', {})
-        
-        # Add assistant message to conversation
-        assistant_message = executor._message_to_dict(message)
-        conversation.append(assistant_message)
-        
-        # Check if there are tool calls
-        tool_calls = executor._extract_tool_calls(message)
-        
-        if not tool_calls:
-            # No more tool calls - now stream the final response
-            # Remove the last assistant message since we'll stream it
-            conversation.pop()
-            
-            # Stream the final response
-            for chunk in executor.client.chat_completion_stream(messages=conversation):
-                yield chunk
-            return
-        
-        # Execute each tool call
-        for tool_call in tool_calls:
-            tool_result = executor._execute_tool_call(tool_call)
-            
-            # Add tool result to conversation
-            conversation.append({
-                "role": "tool",
-                "tool_call_id": tool_call.get("id", ""),
-                "name": tool_call.get("function", {}).get("name", ""),
-                "content": tool_result,
-            })
-    
-    # Max iterations reached - stream last response anyway
-    for chunk in executor.client.chat_completion_stream(messages=conversation):
-        yield chunk
-
+    events = executor.execute_with_tools_streaming(
+        messages=messages, endpoint=endpoint, client_key=client_key, transcript=transcript
+    )
+    # Closing this generator closes the executor's, so its cleanup runs now
+    async with aclosing(events):
+        async for event in events:
+            yield event
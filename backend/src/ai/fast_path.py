@@ -0,0 +1,200 @@
+"""Deterministic fast path for simple, unambiguous requests.
+
+Messages such as "list pods", "what is 25*4" or "show booking 12" map to a
+single tool call with obvious arguments. The router recognises them with
+anchored patterns, the executor runs the tool directly and the answer is
+rendered from a template, skipping both LLM round trips. Anything that
+doesn't match exactly, or whose tool result can't be rendered, falls through
+to the model.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass(frozen=True)
+class FastPathMatch:
+    """A recognised intent and the tool call that answers it."""
+
+    intent: str
+    tool: str
+    arguments: dict[str, Any] = field(default_factory=dict)
+
+
+_POLITE = r"(?:(?:please|pls|can you|could you)\s+)?"
+_TRAILER = r"(?:\s+please)?"
+
+_OPERATOR_WORDS = (
+    (re.compile(r"\bmultiplied by\b|\btimes\b|(?<=\d)\s*[x×]\s*(?=\d)", re.IGNORECASE), "*"),
+    (re.compile(r"\bdivided by\b|÷", re.IGNORECASE), "/"),
+    (re.compile(r"\bplus\b", re.IGNORECASE), "+"),
+    (re.compile(r"\bminus\b", re.IGNORECASE), "-"),
+)
+
+_MATH = re.compile(
+    _POLITE
+    + r"(?:what(?:'s| is)|calculate|compute|evaluate)?"
+    r"\s*(?P<expr>[\d\s.+\-*/()]+?)\s*(?:=\s*)?",
+    re.IGNORECASE,
+)
+_MATH_OPERATION = re.compile(r"\d[\s)]*[-+*/][\s(]*[\d.]")
+# Dates and phone numbers look like subtraction or division
+_NOT_MATH = re.compile(
+    r"\d{4}-\d{1,2}-\d{1,2}"
+    r"|\d{1,2}/\d{1,2}(?:/\d{2,4})?"
+    r"|(?:\(?\d{3}\)?[\s-]?)?\d{3}-\d{4}"
+)
+
+_LIST_PODS = (
+    re.compile(
+        _POLITE
+        + r"(?:list|show(?: me)?|get|view|browse)?\s*(?:all\s+)?(?:the\s+)?(?:available\s+)?pods"
+        r"(?:\s+(?:that\s+)?are\s+available)?" + _TRAILER,
+        re.IGNORECASE,
+    ),
+    re.compile(
+        r"(?:what|which) pods (?:are (?:there|available)|can i book|do you have)", re.IGNORECASE
+    ),
+)
+
+_SHOW_BOOKING = re.compile(
+    _POLITE + r"(?:show(?: me)?|get|view|display|details (?:of|for)|what(?:'s| is))?\s*(?:the\s+)?"
+    r"booking\s*(?:#|no\.?|number|id)?\s*(?P<id>\d+)(?:\s+details)?" + _TRAILER,
+    re.IGNORECASE,
+)
+
+_SHOW_POD = re.compile(
+    _POLITE + r"(?:show(?: me)?|get|view|display|details (?:of|for)|tell me about)?\s*(?:the\s+)?"
+    r"pod\s*(?:#|no\.?|number|id)?\s*(?P<id>\d+)(?:\s+details)?" + _TRAILER,
+    re.IGNORECASE,
+)
+
+
+def _normalise(text: str) -> str:
+    return " ".join(text.split()).rstrip("?!. ")
+
+
+def _settled(messages: list[dict[str, Any]]) -> bool:
+    """Whether the latest user message starts a new request.
+
+    A reply to a clarifying question ("which booking?") or to an unfinished
+    tool flow belongs to that flow, so only the first turn or a turn after a
+    final answer is eligible.
+    """
+    for message in reversed(messages[:-1]):
+        role = message.get("role")
+        if role == "tool":
+            return False
+        if role != "assistant":
+            continue
+        if message.get("tool_calls"):
+            return False
+        return not (message.get("content") or "").rstrip().endswith("?")
+    return True
+
+
+def _money(cents: Any) -> str:
+    return f"${cents / 100:.2f}" if isinstance(cents, (int, float)) else "n/a"
+
+
+class FastPathRouter:
+    """Recognises simple intents and renders their answers from templates."""
+
+    def match(self, messages: list[dict[str, Any]]) -> FastPathMatch | None:
+        """Fast-path match for the latest message, if it is a user message."""
+        if not messages or messages[-1].get("role") != "user" or not _settled(messages):
+            return None
+        text = _normalise(messages[-1].get("content") or "")
+        if not text or len(text) > 200:
+            return None
+
+        expression = text
+        for pattern, operator in _OPERATOR_WORDS:
+            expression = pattern.sub(f" {operator} ", expression)
+        math = _MATH.fullmatch(expression)
+        if math:
+            expr = " ".join(math.group("expr").split())
+            if _MATH_OPERATION.search(expr) and not _NOT_MATH.fullmatch(expr):
+                return FastPathMatch("math", "calculate", {"expression": expr})
+
+        if any(pattern.fullmatch(text) for pattern in _LIST_PODS):
+            return FastPathMatch("list_pods", "list_available_pods")
+
+        booking = _SHOW_BOOKING.fullmatch(text)
+        if booking:
+            arguments = {"booking_id": int(booking.group("id"))}
+            return FastPathMatch("show_booking", "get_booking_details", arguments)
+
+        pod = _SHOW_POD.fullmatch(text)
+        if pod:
+            return FastPathMatch("show_pod", "get_pod_details", {"pod_id": int(pod.group("id"))})
+        return None
+
+    def render(self, match: FastPathMatch, result: str) -> str | None:
+        """Answer text for a tool result, or None to let the model handle it."""
+        if match.intent == "math":
+            if result.startswith("Error"):
+                return None
+            return f"{match.arguments['expression']} = {result}"
+
+        try:
+            data = json.loads(result)
+        except ValueError:
+            return None
+
+        if isinstance(data, dict) and "error" in data:
+            if data["error"] == "Booking not found":
+                return f"I couldn't find booking {match.arguments['booking_id']}."
+            if data["error"] == "Pod not found":
+                return f"I couldn't find pod {match.arguments['pod_id']}."
+            return None
+
+        if match.intent == "list_pods":
+            return self._render_pods(data)
+        if match.intent == "show_booking":
+            return (
+                f"Booking {data['id']}: pod {data['pod_id']}, "
+                f"{data['start_time']} to {data['end_time']}, "
+                f"status {data['status']}, total {_money(data.get('total_price_cents'))}."
+            )
+        if match.intent == "show_pod":
+            state = "active" if data.get("is_active") else "inactive"
+            description = f" {data['description']}" if data.get("description") else ""
+            return (
+                f"{data['name']} (pod {data['id']}): up to {data['capacity']} people, "
+                f"{_money(data.get('price_cents'))}, {state}.{description}"
+            )
+        return None
+
+    @staticmethod
+    def _render_pods(table: dict[str, Any]) -> str | None:
+        columns = table.get("columns", [])
+        if not {"id", "name", "capacity", "price_cents"} <= set(columns):
+            return None
+        rows = [dict(zip(columns, row)) for row in table.get("rows", [])]
+        if not rows:
+            return "There are no pods available right now."
+        lines = ["Here are the available pods:"]
+        lines += [
+            f"- {row['name']} (pod {row['id']}): "
+            f"up to {row['capacity']} people, {_money(row['price_cents'])}"
+            for row in rows
+        ]
+        if table.get("next_cursor") or table.get("truncated"):
+            lines.append("There are more pods; ask me to show the rest.")
+        return "\n".join(lines)
+
+
+_fast_path_router: FastPathRouter | None = None
+
+
+def get_fast_path_router() -> FastPathRouter:
+    """Get or create the shared fast path router."""
+    global _fast_path_router
+    if _fast_path_router is None:
+        _fast_path_router = FastPathRouter()
+    return _fast_path_router
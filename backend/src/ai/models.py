@@ -48,3 +48,9 @@ CEREBRAS_LATEST_MODELS: tuple[CerebrasModel, ...] = (
 )
 
 
+def get_model(identifier: str) -> CerebrasModel | None:
+    """Look up a model descriptor by identifier."""
+    for model in CEREBRAS_LATEST_MODELS:
+        if model.identifier == identifier:
+            return model
+    return None
@@ -0,0 +1,153 @@
+"""Building blocks for calling a flaky upstream: backoff, hedging and a circuit breaker.
+
+These are transport-agnostic; :class:`~src.ai.client.AsyncCerebrasClient`
+combines them around the SDK call.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from typing import Awaitable, Callable, TypeVar
+
+from cerebras.cloud.sdk import APIConnectionError, APIStatusError
+
+from ..metrics import get_metrics
+
+
+T = TypeVar("T")
+
+# 408 request timeout, 409 lock conflict, 429 rate limited, 5xx server side
+_RETRYABLE_STATUS = {408, 409, 429}
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether retrying the same request may succeed.
+
+    Timeouts, connection errors, rate limiting and server errors are
+    retryable; other 4xx responses (bad request, auth) are not.
+    """
+    if isinstance(exc, (asyncio.TimeoutError, APIConnectionError)):
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code in _RETRYABLE_STATUS or exc.status_code >= 500
+    return False
+
+
+def backoff_delay(attempt: int, *, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for retry number ``attempt`` (0-based)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+async def hedged(call: Callable[[], Awaitable[T]], delay: float | None, *, name: str = "llm") -> T:
+    """Run ``call``; if it hasn't finished after ``delay`` seconds, start a duplicate.
+
+    The first successful result wins and the other attempt is cancelled. An
+    error only propagates once no attempt is left that could still succeed.
+    """
+    first = asyncio.ensure_future(call())
+    if delay is None:
+        return await first
+
+    pending = {first}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if not done:
+            get_metrics().incr(f"{name}.hedges")
+            second = asyncio.ensure_future(call())
+            pending.add(second)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        get_metrics().incr(f"{name}.hedge_wins")
+                    return task.result()
+                error = task.exception()
+        assert error is not None
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class CircuitBreaker:
+    """Fails fast while an upstream keeps failing.
+
+    Closed: calls pass. After ``failure_threshold`` consecutive failures the
+    breaker opens and rejects calls for ``reset_timeout`` seconds. Then it is
+    half-open: one probe call is let through, and its outcome closes or
+    re-opens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, *, failure_threshold: int, reset_timeout: float) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            elapsed = time.monotonic() - self._opened_at
+            if self._state == self.OPEN and elapsed >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probing = False
+            # Half-open: a single probe at a time
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self._state != self.CLOSED:
+                self._state = self.CLOSED
+                self._report()
+
+    def release(self) -> None:
+        """End a call that neither succeeded nor failed (it was cancelled).
+
+        A half-open breaker lets the next call probe instead.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    get_metrics().incr(f"circuit.{self.name}.opened")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._report()
+
+    def _report(self) -> None:
+        is_open = 1.0 if self._state == self.OPEN else 0.0
+        get_metrics().set_gauge(f"circuit.{self.name}.open", is_open)
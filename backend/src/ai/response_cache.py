@@ -0,0 +1,254 @@
+"""Cache of complete tool-loop answers for repeated conversations.
+
+Keys hash the normalised message list together with the model and the tool
+schema version. Entries live in an in-memory LRU and, optionally, in a SQLite
+file that survives restarts. An answer is only cached when every tool it
+called is read-only and cacheable; it carries the data-version stamp of the
+tags those tools depend on, so a later booking/pod write invalidates it. The
+stamp is checked against the versions every worker shares
+(``AI_DATA_VERSIONS_BACKEND=postgres``), so writes through another worker
+count too.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from ..metrics import get_metrics
+from ..settings import settings
+from .cache import Stamp
+from .tools import ToolRegistry, get_tool_registry
+
+
+def _normalise(messages: list[dict[str, Any]]) -> list[list[Any]]:
+    normalised = []
+    for message in messages:
+        content = message.get("content") or ""
+        if isinstance(content, str):
+            content = " ".join(content.split())
+            if message.get("role") == "user":
+                content = content.casefold()
+        normalised.append(
+            [message.get("role"), content, message.get("tool_calls"), message.get("name")]
+        )
+    return normalised
+
+
+class _DiskTier:
+    """SQLite-backed second tier; every call runs in a worker thread."""
+
+    def __init__(self, path: str, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL,
+                epoch TEXT NOT NULL,
+                stamp TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> tuple[float, str, Stamp, str] | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT expires_at, epoch, stamp, payload FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        expires_at, epoch, stamp, payload = row
+        return expires_at, epoch, tuple(tuple(item) for item in json.loads(stamp)), payload
+
+    def put(self, key: str, expires_at: float, epoch: str, stamp: Stamp, payload: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, expires_at, epoch, json.dumps(stamp), payload, time.time()),
+            )
+            self._puts += 1
+            if self._puts % 100 == 0:
+                self._db.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+                self._db.execute(
+                    """
+                    DELETE FROM responses WHERE key NOT IN (
+                        SELECT key FROM responses ORDER BY last_used DESC LIMIT ?
+                    )
+                    """,
+                    (self.maxsize,),
+                )
+            self._db.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+
+
+class ResponseCache:
+    """Two-tier cache of ``(response, generated messages)`` per conversation."""
+
+    def __init__(
+        self,
+        *,
+        registry: ToolRegistry | None = None,
+        maxsize: int | None = None,
+        ttl: float | None = None,
+        disk_path: str | None = None,
+    ) -> None:
+        self.registry = registry or get_tool_registry()
+        self.maxsize = maxsize or settings.ai_response_cache_size
+        self.ttl = ttl or settings.ai_response_cache_ttl_seconds
+        self._lock = threading.Lock()
+        # key -> (expires_at wall clock, stamp, payload dict)
+        self._memory: OrderedDict[str, tuple[float, Stamp, dict[str, Any]]] = OrderedDict()
+        disk_path = disk_path if disk_path is not None else settings.ai_response_cache_path
+        self._disk = (
+            _DiskTier(disk_path, settings.ai_response_cache_disk_size) if disk_path else None
+        )
+
+    def make_key(self, messages: list[dict[str, Any]], *, model: str) -> str:
+        material = json.dumps(
+            [model, self.registry.schema_version(), _normalise(messages)],
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _valid(self, expires_at: float, stamp: Stamp, epoch: str | None = None) -> bool:
+        """Whether an entry may be served; may query the shared data versions."""
+        if expires_at <= time.time():
+            return False
+        if stamp and epoch is not None and epoch != self.registry.data_versions.epoch:
+            # Version counters restarted since this entry was written
+            return False
+        return self.registry.data_versions.is_current(stamp)
+
+    async def _valid_async(self, expires_at: float, stamp: Stamp, epoch: str | None = None) -> bool:
+        if not stamp:
+            return self._valid(expires_at, stamp, epoch)
+        return await asyncio.to_thread(self._valid, expires_at, stamp, epoch)
+
+    def _remember(self, key: str, entry: tuple[float, Stamp, dict[str, Any]]) -> None:
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """Return ``{"response", "messages", "elapsed"}`` for a valid entry."""
+        metrics = get_metrics()
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is not None:
+            valid = await self._valid_async(entry[0], entry[1])
+            with self._lock:
+                if self._memory.get(key) is entry:
+                    if valid:
+                        self._memory.move_to_end(key)
+                    else:
+                        del self._memory[key]
+            if not valid:
+                entry = None
+        if entry is None and self._disk is not None:
+            stored = await asyncio.to_thread(self._disk.get, key)
+            if stored is not None:
+                expires_at, epoch, stamp, payload = stored
+                if await self._valid_async(expires_at, stamp, epoch):
+                    entry = (expires_at, stamp, json.loads(payload))
+                    self._remember(key, entry)
+                else:
+                    await asyncio.to_thread(self._disk.delete, key)
+        metrics.incr("response_cache.hits" if entry is not None else "response_cache.misses")
+        hits = metrics.counter("response_cache.hits")
+        misses = metrics.counter("response_cache.misses")
+        metrics.set_gauge("response_cache.hit_rate", hits / (hits + misses))
+        if entry is None:
+            return None
+        metrics.incr("response_cache.latency_saved_seconds", entry[2]["elapsed"])
+        return entry[2]
+
+    def stamp_for(
+        self, generated: list[dict[str, Any]], versions_before: dict[str, int] | None
+    ) -> Stamp | None:
+        """Stamp for an answer, or None if it must not be cached.
+
+        ``versions_before`` is the data-version snapshot taken before the tool
+        loop started, so writes that happened during the loop invalidate it.
+        It is None when the shared versions couldn't be read; then only
+        answers that depend on no data are cached.
+        """
+        tags: set[str] = set()
+        for message in generated:
+            if message.get("role") != "tool":
+                continue
+            name = message.get("name", "")
+            # Keys don't include the user, so per-user answers can't be shared
+            if not self.registry.is_read_only(name) or self.registry.acts_for_caller(name):
+                return None
+            tool_tags = self.registry.cache_tags(name)
+            if tool_tags is None:
+                return None
+            tags.update(tool_tags)
+        if not tags:
+            return ()
+        if versions_before is None:
+            return None
+        return tuple((tag, versions_before.get(tag, 0)) for tag in sorted(tags))
+
+    async def put(
+        self,
+        key: str,
+        *,
+        response: Any,
+        generated: list[dict[str, Any]],
+        stamp: Stamp,
+        elapsed: float,
+    ) -> None:
+        if hasattr(response, "model_dump"):
+            response = response.model_dump()
+        payload = {"response": response, "messages": generated, "elapsed": elapsed}
+        expires_at = time.time() + self.ttl
+        self._remember(key, (expires_at, stamp, payload))
+        get_metrics().incr("response_cache.stores")
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(
+                    self._disk.put,
+                    key,
+                    expires_at,
+                    self.registry.data_versions.epoch,
+                    stamp,
+                    json.dumps(payload, default=str),
+                )
+            except (sqlite3.Error, TypeError, ValueError):
+                get_metrics().incr("response_cache.disk_errors")
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache | None:
+    """Return the shared response cache, or None when it is disabled."""
+    global _response_cache
+    if not settings.ai_response_cache_enabled:
+        return None
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
@@ -0,0 +1,202 @@
+"""Per-turn model routing across the models in ``CEREBRAS_LATEST_MODELS``.
+
+A routing policy is a ladder of models ordered from cheapest to most capable.
+Short, simple turns start at the bottom of the ladder. Complex turns, such as
+long prompts, many tools or multi-tool plans, start at the top. A failed call
+escalates one rung. The registry decides which models qualify: tool calls
+need ``supports_tools`` and the prompt must fit ``context_window``. Latency
+and success are tracked per model, and a model that keeps failing is skipped
+until it recovers.
+
+Operators pin a policy, or a single model, per endpoint with
+``AI_MODEL_ROUTES`` (e.g. ``{"chat.auto.stream": "quality"}`` or
+``{"chat.auto": "llama3.3-70b"}``).
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+from ..metrics import get_metrics
+from ..settings import settings
+from .context import estimate_tokens
+from .models import get_model
+
+
+@dataclass(frozen=True)
+class RoutingPolicy:
+    """Models a policy may use, cheapest first."""
+
+    name: str
+    ladder: tuple[str, ...]
+
+
+ROUTING_POLICIES: dict[str, RoutingPolicy] = {
+    "adaptive": RoutingPolicy("adaptive", ("llama3.1-8b", "llama3.3-70b", "gpt-oss-120b")),
+    "fast": RoutingPolicy("fast", ("llama3.1-8b", "llama3.3-70b")),
+    "quality": RoutingPolicy("quality", ("gpt-oss-120b", "llama3.3-70b")),
+}
+
+# A turn is simple when the user message and the tool set are both small,
+# or the message is so short that it can't ask for much
+_SIMPLE_MAX_MESSAGE_TOKENS = 64
+_SIMPLE_MAX_TOOLS = 4
+_TRIVIAL_MAX_MESSAGE_TOKENS = 16
+
+# Online statistics: exponentially weighted, so old samples fade out
+_EWMA_ALPHA = 0.2
+_MIN_SAMPLES = 5
+_UNHEALTHY_SUCCESS_RATE = 0.5
+
+
+@dataclass
+class ModelStats:
+    calls: int = 0
+    failures: int = 0
+    latency_ewma: float = 0.0
+    success_ewma: float = 1.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.calls < _MIN_SAMPLES or self.success_ewma >= _UNHEALTHY_SUCCESS_RATE
+
+
+@dataclass
+class Route:
+    """Routing state for one chat request, carried across its LLM turns."""
+
+    policy: RoutingPolicy
+    rung: int = 0
+    complex: bool = False
+
+    @property
+    def model(self) -> str:
+        return self.policy.ladder[self.rung]
+
+
+class ModelRouter:
+    """Chooses the model for each LLM turn and learns from the outcome."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: dict[str, ModelStats] = {}
+
+    def policy_for(self, endpoint: str) -> RoutingPolicy:
+        """Policy pinned for ``endpoint``, or the default one.
+
+        A route may name a policy or a single model identifier.
+        """
+        target = settings.ai_model_routes.get(endpoint, settings.ai_model_policy)
+        if target in ROUTING_POLICIES:
+            return ROUTING_POLICIES[target]
+        if get_model(target) is not None:
+            return RoutingPolicy(target, (target,))
+        return ROUTING_POLICIES["adaptive"]
+
+    def start(
+        self,
+        endpoint: str,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None,
+        prompt_tokens: int,
+    ) -> Route:
+        """Route the first turn of a request."""
+        last_user = next(
+            (m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), ""
+        )
+        tokens = estimate_tokens(last_user)
+        simple = tokens <= _TRIVIAL_MAX_MESSAGE_TOKENS or (
+            tokens <= _SIMPLE_MAX_MESSAGE_TOKENS and len(tools or ()) <= _SIMPLE_MAX_TOOLS
+        )
+        route = Route(self.policy_for(endpoint), complex=not simple)
+        self._settle(route, tools, prompt_tokens, top=not simple)
+        get_metrics().incr(f"routing.{'complex' if route.complex else 'simple'}_turns")
+        return route
+
+    def after_turn(
+        self,
+        route: Route,
+        tool_calls: list[dict[str, Any]],
+        tools: list[dict[str, Any]] | None,
+        prompt_tokens: int,
+    ) -> None:
+        """Escalate to the most capable model once the model plans several tool calls."""
+        if not route.complex and len(tool_calls) > 1:
+            route.complex = True
+            if self._settle(route, tools, prompt_tokens, top=True):
+                get_metrics().incr("routing.escalations.plan")
+
+    def escalate(
+        self, route: Route, tools: list[dict[str, Any]] | None, prompt_tokens: int
+    ) -> bool:
+        """Move to the next capable model after a failure; False when none is left."""
+        for rung in range(route.rung + 1, len(route.policy.ladder)):
+            if self._eligible(route.policy.ladder[rung], tools, prompt_tokens):
+                route.rung = rung
+                get_metrics().incr("routing.escalations.failure")
+                return True
+        return False
+
+    def record(self, model: str, latency: float, ok: bool) -> None:
+        """Feed the outcome of one call into the model's online statistics."""
+        with self._lock:
+            stats = self._stats.setdefault(model, ModelStats())
+            stats.calls += 1
+            stats.failures += 0 if ok else 1
+            stats.success_ewma += _EWMA_ALPHA * ((1.0 if ok else 0.0) - stats.success_ewma)
+            if ok:
+                if stats.latency_ewma == 0.0:
+                    stats.latency_ewma = latency
+                else:
+                    stats.latency_ewma += _EWMA_ALPHA * (latency - stats.latency_ewma)
+        metrics = get_metrics()
+        metrics.incr(f"routing.{model}.calls")
+        if ok:
+            metrics.observe(f"routing.{model}.latency_seconds", latency)
+        else:
+            metrics.incr(f"routing.{model}.failures")
+        metrics.set_gauge(f"routing.{model}.success_rate", stats.success_ewma)
+
+    def stats(self) -> dict[str, ModelStats]:
+        with self._lock:
+            return {model: ModelStats(**vars(stats)) for model, stats in self._stats.items()}
+
+    def _settle(
+        self, route: Route, tools: list[dict[str, Any]] | None, prompt_tokens: int, *, top: bool
+    ) -> bool:
+        """Pick the cheapest (or, with ``top``, the most capable) usable rung."""
+        ladder = route.policy.ladder
+        order = range(len(ladder) - 1, -1, -1) if top else range(len(ladder))
+        candidates = [rung for rung in order if self._eligible(ladder[rung], tools, prompt_tokens)]
+        healthy = [rung for rung in candidates if self._healthy(ladder[rung])]
+        chosen = (healthy or candidates or [route.rung])[0]
+        changed = chosen != route.rung
+        route.rung = chosen
+        return changed
+
+    def _healthy(self, model: str) -> bool:
+        with self._lock:
+            stats = self._stats.get(model)
+            return stats is None or stats.healthy
+
+    @staticmethod
+    def _eligible(model: str, tools: list[dict[str, Any]] | None, prompt_tokens: int) -> bool:
+        descriptor = get_model(model)
+        if descriptor is None:
+            return False
+        if tools and not descriptor.supports_tools:
+            return False
+        return descriptor.context_window is None or prompt_tokens < descriptor.context_window
+
+
+_model_router: ModelRouter | None = None
+
+
+def get_model_router() -> ModelRouter:
+    """Get or create the shared model router."""
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter()
+    return _model_router
@@ -0,0 +1,266 @@
+"""Admission control for LLM calls.
+
+Every completion holds one of a bounded number of slots per worker until
+upstream has finished sending it; a streamed one is read ahead of the client,
+so a slow reader doesn't keep the slot. The global cap ``AI_LLM_GLOBAL_MAX_IN_FLIGHT``
+is split evenly across ``WEB_CONCURRENCY`` workers. Waiting calls are queued
+per client and served by deficit round robin, weighted by prompt size, so one
+user's long agentic loop can't starve everyone else. Interactive calls, the
+chat endpoints a user is waiting on, go ahead of batch calls, and batch calls still get every
+``AI_SCHEDULER_BATCH_EVERY``-th free slot. A call whose predicted wait is
+longer than its remaining deadline is rejected before it queues.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from ..metrics import get_metrics
+from ..settings import settings
+from .client import DeadlineExceededError
+
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+# Endpoints a user is waiting on
+INTERACTIVE_ENDPOINTS = frozenset({"chat.auto", "chat.auto.stream", "chat.ws"})
+
+_EWMA_ALPHA = 0.2
+
+
+class SchedulerOverloadedError(RuntimeError):
+    """Raised when a call would wait longer than its deadline allows."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("client", "cost", "future", "enqueued")
+
+    def __init__(self, client: str, cost: float, future: asyncio.Future[None]) -> None:
+        self.client = client
+        self.cost = cost
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class _FairQueue:
+    """Deficit round robin over per-client FIFO queues."""
+
+    def __init__(self, quantum: float) -> None:
+        self.quantum = quantum
+        self._queues: dict[str, deque[_Waiter]] = {}
+        self._deficits: dict[str, float] = {}
+        self._ring: deque[str] = deque()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def ahead_of(self, client: str) -> int:
+        """Waiters served before a new one from ``client``, assuming equal costs.
+
+        Round robin serves every other client once per round, so only as
+        many of their waiters count as rounds ``client`` must wait.
+        """
+        rounds = len(self._queues.get(client, ())) + 1
+        others = sum(
+            min(len(queue), rounds) for other, queue in self._queues.items() if other != client
+        )
+        return others + rounds - 1
+
+    def push(self, waiter: _Waiter) -> None:
+        queue = self._queues.get(waiter.client)
+        if queue is None:
+            queue = self._queues[waiter.client] = deque()
+            self._deficits[waiter.client] = 0.0
+            self._ring.append(waiter.client)
+        queue.append(waiter)
+        self._size += 1
+
+    def pop(self) -> _Waiter | None:
+        """Next waiter to serve, skipping ones that gave up."""
+        while self._ring:
+            client = self._ring[0]
+            queue = self._queues[client]
+            head = queue[0]
+            if head.future.done():
+                # Cancelled or timed out while queued; it costs nothing
+                self._remove_head(client)
+                continue
+            if self._deficits[client] >= head.cost:
+                self._deficits[client] -= head.cost
+                self._remove_head(client)
+                return head
+            self._deficits[client] += self.quantum
+            self._ring.rotate(-1)
+        return None
+
+    def _remove_head(self, client: str) -> None:
+        queue = self._queues[client]
+        queue.popleft()
+        self._size -= 1
+        if not queue:
+            del self._queues[client]
+            del self._deficits[client]
+            self._ring.remove(client)
+
+
+class LLMScheduler:
+    """Bounds in-flight LLM calls and orders the ones waiting."""
+
+    def __init__(self, capacity: int | None = None) -> None:
+        self.capacity = capacity or self._worker_capacity()
+        self._in_flight = 0
+        self._queues = {
+            INTERACTIVE: _FairQueue(settings.ai_scheduler_quantum_tokens),
+            BATCH: _FairQueue(settings.ai_scheduler_quantum_tokens),
+        }
+        self._grants = 0
+        self._service_ewma = 0.0
+
+    @staticmethod
+    def _worker_capacity() -> int:
+        capacity = settings.ai_llm_max_in_flight
+        if settings.ai_llm_global_max_in_flight:
+            workers = max(1, settings.web_concurrency)
+            share = math.ceil(settings.ai_llm_global_max_in_flight / workers)
+            capacity = min(capacity, share)
+        return max(1, capacity)
+
+    @staticmethod
+    def priority_for(endpoint: str) -> str:
+        return INTERACTIVE if endpoint in INTERACTIVE_ENDPOINTS else BATCH
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def queue_depth(self, priority: str | None = None) -> int:
+        if priority is not None:
+            return len(self._queues[priority])
+        return sum(len(queue) for queue in self._queues.values())
+
+    def predicted_wait(self, client: str, priority: str) -> float:
+        """Expected queueing delay for a new call, in seconds."""
+        if self._in_flight < self.capacity and not self.queue_depth():
+            return 0.0
+        ahead = self._queues[priority].ahead_of(client)
+        if priority == BATCH:
+            ahead += len(self._queues[INTERACTIVE])
+        # Slots free up at capacity / service_time per second
+        return (ahead + 1) * self._service_ewma / self.capacity
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        *,
+        client: str,
+        priority: str = BATCH,
+        cost: float = 1.0,
+        deadline: float | None = None,
+    ) -> AsyncIterator[None]:
+        """Hold one LLM slot for the duration of the block.
+
+        Args:
+            client: Fairness key (user or IP); each gets a fair share of slots
+            priority: ``INTERACTIVE`` or ``BATCH``
+            cost: Work estimate (prompt tokens) charged against the client's deficit
+            deadline: ``time.monotonic()`` deadline of the request
+
+        Raises:
+            SchedulerOverloadedError: The predicted wait exceeds the deadline
+            DeadlineExceededError: The deadline passed while queued
+        """
+        metrics = get_metrics()
+        remaining = None if deadline is None else deadline - time.monotonic()
+        predicted = self.predicted_wait(client, priority)
+        if remaining is not None and predicted > remaining:
+            metrics.incr(f"scheduler.rejected.{priority}")
+            raise SchedulerOverloadedError(
+                f"LLM capacity exhausted; expected wait {predicted:.1f}s "
+                "exceeds the request deadline",
+                retry_after=predicted,
+            )
+
+        waited = 0.0
+        if self._in_flight < self.capacity and not self.queue_depth():
+            self._in_flight += 1
+        else:
+            waiter = _Waiter(client, cost, asyncio.get_running_loop().create_future())
+            self._queues[priority].push(waiter)
+            self._report()
+            try:
+                await asyncio.wait_for(waiter.future, remaining)
+            except asyncio.TimeoutError:
+                metrics.incr(f"scheduler.timeouts.{priority}")
+                raise DeadlineExceededError(
+                    "Request deadline passed while waiting for LLM capacity"
+                ) from None
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    # Granted just as we were cancelled; hand the slot on
+                    self._release()
+                raise
+            waited = time.monotonic() - waiter.enqueued
+
+        metrics.observe(f"scheduler.wait_seconds.{priority}", waited)
+        self._report()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            held = time.monotonic() - started
+            self._service_ewma = held if not self._service_ewma else (
+                self._service_ewma + _EWMA_ALPHA * (held - self._service_ewma)
+            )
+            self._release()
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters: interactive first, batch on every Nth grant."""
+        while self._in_flight < self.capacity:
+            waiter = self._next_waiter()
+            if waiter is None:
+                break
+            self._in_flight += 1
+            self._grants += 1
+            waiter.future.set_result(None)
+        self._report()
+
+    def _next_waiter(self) -> _Waiter | None:
+        batch_turn = self._grants % max(1, settings.ai_scheduler_batch_every) == 0
+        order = (BATCH, INTERACTIVE) if batch_turn else (INTERACTIVE, BATCH)
+        for priority in order:
+            waiter = self._queues[priority].pop()
+            if waiter is not None:
+                return waiter
+        return None
+
+    def _report(self) -> None:
+        metrics = get_metrics()
+        metrics.set_gauge("scheduler.in_flight", self._in_flight)
+        for priority, queue in self._queues.items():
+            metrics.set_gauge(f"scheduler.queue_depth.{priority}", len(queue))
+
+
+_llm_scheduler: LLMScheduler | None = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Get or create this worker's LLM scheduler."""
+    global _llm_scheduler
+    if _llm_scheduler is None:
+        _llm_scheduler = LLMScheduler()
+    return _llm_scheduler
@@ -0,0 +1,150 @@
+"""Per-turn tool selection.
+
+A keyword classifier maps the latest user message to intents, and each
+intent to the tools it needs. Only those schemas (and a system prompt
+generated from them) are sent to the model, which keeps the fixed prompt
+prefix small. Runs locally in microseconds; when nothing matches, every tool
+is offered so the model is never left without the one it needs.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from ..metrics import get_metrics
+from .context import estimate_tokens
+from .prompts import SYSTEM_PROMPT, build_system_prompt
+from .tools import ToolRegistry, get_tool_registry
+
+
+@dataclass(frozen=True)
+class Intent:
+    name: str
+    pattern: re.Pattern[str]
+    tools: tuple[str, ...]
+
+
+def _words(*words: str) -> re.Pattern[str]:
+    return re.compile(r"\b(?:" + "|".join(words) + r")", re.IGNORECASE)
+
+
+INTENTS: tuple[Intent, ...] = (
+    Intent(
+        "math",
+        re.compile(
+            r"\d\s*[-+*/^x×÷]\s*\d|\b(?:calculat|comput|sum\b|add\b|plus|minus|subtract|multipl|times|divide|percent|sqrt|square)",
+            re.IGNORECASE,
+        ),
+        ("calculate",),
+    ),
+    Intent(
+        "weather",
+        _words(
+            "weather", "temperature", "forecast", "rain", "snow", "sunny", "humid", "cold",
+            "hot\\b",
+        ),
+        ("get_weather",),
+    ),
+    Intent(
+        "pods",
+        _words(
+            "pods?\\b", "spaces?\\b", "rooms?\\b", "available", "availability", "capacity", "price",
+            "cost", "free\\b", "seats?\\b",
+        ),
+        ("list_available_pods", "get_pod_details"),
+    ),
+    Intent(
+        "bookings",
+        _words("bookings", "my booking", "booking \\d", "booking #", "reservations?\\b", "status"),
+        ("list_user_bookings", "get_booking_details"),
+    ),
+    Intent(
+        "book",
+        _words("book\\b", "reserve", "make a (?:booking|reservation)", "schedule"),
+        ("create_booking", "list_available_pods", "get_pod_details", "calculate"),
+    ),
+    Intent(
+        "change",
+        _words(
+            "cancel", "delete", "remove", "update", "change", "modify", "move", "reschedul",
+            "confirm", "extend",
+        ),
+        ("update_booking", "cancel_booking", "list_user_bookings", "get_booking_details"),
+    ),
+)
+
+# How many earlier user messages a short follow-up ("yes, do it") may borrow intents from
+_LOOKBACK = 3
+
+
+class ToolSelector:
+    """Chooses the tool schemas and system prompt for one turn."""
+
+    def __init__(self, registry: ToolRegistry, intents: tuple[Intent, ...] = INTENTS) -> None:
+        self.registry = registry
+        self.intents = intents
+        self._full_tokens: tuple[str, int] | None = None
+
+    def classify(self, text: str) -> list[str]:
+        """Names of the intents matched by ``text``."""
+        return [intent.name for intent in self.intents if intent.pattern.search(text)]
+
+    def select_names(self, messages: list[dict[str, Any]]) -> list[str] | None:
+        """Tool names for the next turn, or None to offer every tool."""
+        user_texts = [
+            message.get("content") or ""
+            for message in reversed(messages)
+            if message.get("role") == "user"
+        ][:_LOOKBACK]
+        for text in user_texts:
+            matched = self.classify(text)
+            if matched:
+                names: dict[str, None] = {}
+                for intent in self.intents:
+                    if intent.name in matched:
+                        names.update(dict.fromkeys(intent.tools))
+                return [name for name in names if self.registry.get_schema(name) is not None]
+        return None
+
+    def select(self, messages: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], str]:
+        """Tool schemas and system prompt for the next turn."""
+        metrics = get_metrics()
+        names = self.select_names(messages)
+        if not names:
+            metrics.incr("tool_selection.fallback_all")
+            tools = self.registry.get_all_schemas()
+        else:
+            schemas = (self.registry.get_schema(name) for name in names)
+            tools = [schema for schema in schemas if schema is not None]
+        prompt = build_system_prompt(tools)
+
+        full = self._full_prompt_tokens()
+        selected = estimate_tokens(prompt) + estimate_tokens(json.dumps(tools))
+        metrics.observe("tool_selection.tools_offered", len(tools))
+        metrics.observe("tool_selection.prompt_tokens", selected)
+        metrics.incr("tool_selection.prompt_tokens_saved", max(0, full - selected))
+        return tools, prompt
+
+    def _full_prompt_tokens(self) -> int:
+        """Tokens of the static prompt plus every schema, as sent before selection."""
+        version = self.registry.schema_version()
+        if self._full_tokens is None or self._full_tokens[0] != version:
+            schemas = json.dumps(self.registry.get_all_schemas())
+            tokens = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(schemas)
+            self._full_tokens = (version, tokens)
+            get_metrics().set_gauge("tool_selection.full_prompt_tokens", tokens)
+        return self._full_tokens[1]
+
+
+_tool_selector: ToolSelector | None = None
+
+
+def get_tool_selector() -> ToolSelector:
+    """Get or create the shared tool selector."""
+    global _tool_selector
+    if _tool_selector is None:
+        _tool_selector = ToolSelector(get_tool_registry())
+    return _tool_selector
@@ -0,0 +1,273 @@
+"""Compact server-sent events for the streaming chat endpoint.
+
+Frames carry only what a chat client renders:
+
+    data: "Hello, wor"                      content delta (a JSON string)
+    event: tool                             tool progress (see ToolEvent)
+    data: {"kind":"tool_start","tool_call_id":"call_1","name":"calculate","ok":true}
+    event: finish                           last frame of a successful stream
+    data: {"reason":"stop"}
+    event: error                            the stream failed (a JSON string)
+    data: "Request exceeded its 60s budget"
+    : ping                                  heartbeat for proxies
+
+Content arriving within ``AI_SSE_COALESCE_MS`` of the previous content frame
+is held and sent as one frame (at most ``AI_SSE_COALESCE_CHARS``), so a fast
+model doesn't cost a frame, a write and a JSON encode per token. The first
+token is never held. A comment frame goes out when nothing else has been sent
+for ``AI_SSE_HEARTBEAT_SECONDS``, e.g. while a slow tool runs. JSON is
+encoded with ``orjson``.
+
+A stream cancelled because the client went away ends without a finish frame.
+
+:func:`coalesce` does the holding and heartbeats and yields plain frames;
+:func:`encode_stream` encodes them as SSE, and ``/ai/ws`` as JSON messages.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import asdict
+from typing import Any, AsyncGenerator, AsyncIterator
+
+import orjson
+
+from ..metrics import get_metrics
+from ..settings import settings
+from .executor import ToolEvent, _field
+
+
+dumps = orjson.dumps
+
+
+HEARTBEAT = b": ping\n\n"
+
+# Frames waiting for the client before the executor is paused
+_MAX_PENDING = 64
+
+_TIMEOUT = object()
+_END = object()
+_CLOSED = object()
+
+
+def content_frame(text: str) -> bytes:
+    return b"data: " + dumps(text) + b"\n\n"
+
+
+def event_frame(name: str, data: Any) -> bytes:
+    return b"event: " + name.encode("ascii") + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+class _Failure:
+    __slots__ = ("exc",)
+
+    def __init__(self, exc: Exception) -> None:
+        self.exc = exc
+
+
+class _Channel:
+    """Bounded single-producer, single-consumer queue with a timed get.
+
+    Waits are plain futures and timer handles rather than tasks, which keeps
+    the per-token cost low. A lazy ``get`` is only woken early by urgent
+    items, so tokens arriving while content is held don't each wake the
+    consumer.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self._items: deque[Any] = deque()
+        self._maxsize = maxsize
+        self._getter: asyncio.Future[None] | None = None
+        self._putter: asyncio.Future[None] | None = None
+        self._lazy = False
+        self._closed = False
+
+    async def put(self, item: Any, *, urgent: bool = True) -> None:
+        while len(self._items) >= self._maxsize:
+            self._putter = asyncio.get_running_loop().create_future()
+            try:
+                await self._putter
+            finally:
+                self._putter = None
+        self._items.append(item)
+        if urgent or not self._lazy:
+            _wake(self._getter)
+
+    def close(self) -> None:
+        """No more items will come; an empty channel now returns ``_CLOSED``."""
+        self._closed = True
+        _wake(self._getter)
+
+    async def get(self, timeout: float, *, lazy: bool = False) -> Any:
+        """The next item, or ``_TIMEOUT`` if none arrives within ``timeout`` seconds.
+
+        With ``lazy``, only urgent items end the wait early.
+        """
+        if not self._items:
+            if self._closed:
+                return _CLOSED
+            if timeout <= 0:
+                return _TIMEOUT
+            loop = asyncio.get_running_loop()
+            self._lazy = lazy
+            self._getter = loop.create_future()
+            handle = loop.call_later(timeout, _wake, self._getter)
+            try:
+                await self._getter
+            finally:
+                handle.cancel()
+                self._getter = None
+                self._lazy = False
+            if not self._items:
+                return _CLOSED if self._closed else _TIMEOUT
+        item = self._items.popleft()
+        _wake(self._putter)
+        return item
+
+
+def _wake(future: asyncio.Future[None] | None) -> None:
+    if future is not None and not future.done():
+        future.set_result(None)
+
+
+async def _pump(events: AsyncIterator[Any], channel: _Channel) -> None:
+    """Move executor events into ``channel``; the channel's bound is the backpressure."""
+    try:
+        async for event in events:
+            await channel.put(event, urgent=isinstance(event, ToolEvent))
+    except Exception as exc:  # noqa: BLE001
+        await channel.put(_Failure(exc))
+    else:
+        await channel.put(_END)
+    finally:
+        aclose = getattr(events, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        # Wakes the consumer if the pump was cancelled
+        channel.close()
+
+
+async def coalesce(
+    events: AsyncIterator[Any],
+    *,
+    coalesce_ms: float | None = None,
+    coalesce_chars: int | None = None,
+    heartbeat_seconds: float | None = None,
+    cancel: asyncio.Future[Any] | None = None,
+    metric_prefix: str = "sse",
+) -> AsyncGenerator[tuple[str, Any], None]:
+    """Turn executor output (SDK chunks and ToolEvents) into frames to send.
+
+    Yields ``("content", text)``, ``("tool", ToolEvent)``, ``("ping", None)``
+    when nothing was sent for ``heartbeat_seconds`` and, last,
+    ``("finish", reason)``. Transports only encode them.
+
+    The executor runs in a task of its own, which lets held content be
+    flushed, and heartbeats sent, while it is waiting on the model or a
+    tool. At most ``_MAX_PENDING`` events queue up behind a slow client.
+    Errors from the executor are raised here. When ``cancel`` completes
+    (the client went away) the executor task is cancelled, and the frames
+    end, without a finish, once the executor has cleaned up.
+    """
+    window = (settings.ai_sse_coalesce_ms if coalesce_ms is None else coalesce_ms) / 1000
+    max_chars = settings.ai_sse_coalesce_chars if coalesce_chars is None else coalesce_chars
+    heartbeat = (
+        settings.ai_sse_heartbeat_seconds if heartbeat_seconds is None else heartbeat_seconds
+    )
+    metrics = get_metrics()
+    loop = asyncio.get_running_loop()
+    channel = _Channel(_MAX_PENDING)
+    pump = asyncio.ensure_future(_pump(events, channel))
+
+    def cancel_pump(_: asyncio.Future[Any]) -> None:
+        pump.cancel()
+
+    if cancel is not None:
+        cancel.add_done_callback(cancel_pump)
+
+    held: list[str] = []
+    held_chars = 0
+    tokens = 0
+    frames = 0
+    finish_reason = None
+    last_frame = loop.time()
+    next_content = last_frame
+
+    def flush() -> tuple[str, str]:
+        nonlocal held_chars, next_content, frames
+        frame = ("content", "".join(held))
+        held.clear()
+        held_chars = 0
+        next_content = loop.time() + window
+        frames += 1
+        return frame
+
+    try:
+        while True:
+            now = loop.time()
+            if held:
+                item = await channel.get(next_content - now, lazy=True)
+            else:
+                item = await channel.get(last_frame + heartbeat - now)
+            if item is _TIMEOUT:
+                if held:
+                    yield flush()
+                else:
+                    yield ("ping", None)
+                    metrics.incr(f"{metric_prefix}.heartbeats")
+                last_frame = loop.time()
+                continue
+            if item is _END:
+                break
+            if item is _CLOSED:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            if isinstance(item, ToolEvent):
+                if held:
+                    yield flush()
+                yield ("tool", item)
+                last_frame = loop.time()
+                continue
+
+            choices = _field(item, "choices") or []
+            if not choices:
+                continue
+            finish_reason = _field(choices[0], "finish_reason") or finish_reason
+            text = _field(_field(choices[0], "delta") or {}, "content")
+            if not text:
+                continue
+            tokens += 1
+            held.append(text)
+            held_chars += len(text)
+            if held_chars >= max_chars or loop.time() >= next_content:
+                yield flush()
+                last_frame = loop.time()
+
+        if held:
+            yield flush()
+        yield ("finish", finish_reason)
+    finally:
+        pump.cancel()
+        if cancel is not None:
+            cancel.remove_done_callback(cancel_pump)
+        metrics.incr(f"{metric_prefix}.tokens", tokens)
+        metrics.incr(f"{metric_prefix}.content_frames", frames)
+
+
+async def encode_stream(events: AsyncIterator[Any], **options: Any) -> AsyncGenerator[bytes, None]:
+    """Encode executor output as compact SSE frames; ``options`` go to :func:`coalesce`."""
+    frames = coalesce(events, **options)
+    try:
+        async for kind, data in frames:
+            if kind == "content":
+                yield content_frame(data)
+            elif kind == "tool":
+                yield event_frame("tool", asdict(data))
+            elif kind == "ping":
+                yield HEARTBEAT
+            else:
+                yield event_frame("finish", {"reason": data})
+    finally:
+        await frames.aclose()
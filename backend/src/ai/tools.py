@@ -5,12 +5,44 @@ Reference: https://inference-docs.cerebras.ai/capabilities/tool-use
 
 from __future__ import annotations
 
+import base64
+import contextvars
+import hashlib
 import json
 import re
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime
 from typing import Any, Callable
 
+from .. import tracing
 from ..db import DatabaseManager
+from ..metrics import get_metrics
 from ..settings import settings
+from .cache import DataVersions, TTLCache
+
+
+# The signed-in user whose request is running tools; set by the AI router
+_tool_caller: contextvars.ContextVar[int | None] = contextvars.ContextVar(
+    "kubo_tool_caller", default=None
+)
+
+
+def set_tool_caller(user_id: int | None) -> None:
+    """Run the current request's tools on behalf of ``user_id`` (None if anonymous)."""
+    _tool_caller.set(user_id)
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How a read-only tool's results are cached.
+
+    ``tags`` name the data the result depends on; any write that invalidates
+    one of them makes the cached result stale.
+    """
+
+    ttl: float
+    tags: tuple[str, ...] = ()
 
 
 class ToolRegistry:
@@ -19,12 +51,26 @@ class ToolRegistry:
     def __init__(self) -> None:
         self._tools: dict[str, Callable[..., Any]] = {}
         self._schemas: dict[str, dict[str, Any]] = {}
+        self._read_only: set[str] = set()
+        self._cache_policies: dict[str, CachePolicy] = {}
+        self._invalidates: dict[str, tuple[str, ...]] = {}
+        self._caller_args: dict[str, str] = {}
+        self._schema_version: str | None = None
+        shared = self._shared_versions if settings.ai_data_versions_backend == "postgres" else None
+        self.data_versions = DataVersions(shared)
+        self._cache = TTLCache(
+            maxsize=settings.ai_tool_cache_size, versions=self.data_versions, name="tool_cache"
+        )
 
     def register(
         self,
         name: str,
         function: Callable[..., Any],
         schema: dict[str, Any],
+        read_only: bool = False,
+        cache: CachePolicy | None = None,
+        invalidates: tuple[str, ...] = (),
+        caller_arg: str | None = None,
     ) -> None:
         """Register a tool with its function and schema.
         
@@ -32,9 +78,37 @@ class ToolRegistry:
             name: Function name
             function: The actual Python function to execute
             schema: OpenAI-compatible tool schema
+            read_only: True if the tool has no side effects and may run
+                concurrently with other read-only calls
+            cache: Optional caching policy (read-only tools only)
+            invalidates: Data tags this tool modifies; cached results
+                depending on them are invalidated after it runs
+            caller_arg: Argument set to the signed-in user's id on every
+                call, whatever the model passed; leave it out of ``schema``
         """
         self._tools[name] = function
         self._schemas[name] = schema
+        self._schema_version = None
+        if read_only:
+            self._read_only.add(name)
+        else:
+            self._read_only.discard(name)
+        if cache is not None and read_only:
+            self._cache_policies[name] = cache
+        else:
+            self._cache_policies.pop(name, None)
+        if invalidates:
+            self._invalidates[name] = tuple(invalidates)
+        else:
+            self._invalidates.pop(name, None)
+        if caller_arg is not None:
+            self._caller_args[name] = caller_arg
+        else:
+            self._caller_args.pop(name, None)
+
+    def is_read_only(self, name: str) -> bool:
+        """Whether the tool declared itself side-effect-free."""
+        return name in self._read_only
 
     def get_function(self, name: str) -> Callable[..., Any] | None:
         """Get the function by name."""
@@ -48,6 +122,22 @@ class ToolRegistry:
         """Get all tool schemas."""
         return list(self._schemas.values())
 
+    def schema_version(self) -> str:
+        """Short hash of all registered schemas; changes whenever a tool changes."""
+        if self._schema_version is None:
+            encoded = json.dumps(self._schemas, sort_keys=True).encode("utf-8")
+            self._schema_version = hashlib.sha256(encoded).hexdigest()[:16]
+        return self._schema_version
+
+    def acts_for_caller(self, name: str) -> bool:
+        """Whether the tool's results depend on who is signed in."""
+        return name in self._caller_args
+
+    def cache_tags(self, name: str) -> tuple[str, ...] | None:
+        """Data tags a cacheable tool depends on, or None if it isn't cacheable."""
+        policy = self._cache_policies.get(name)
+        return policy.tags if policy is not None else None
+
     def execute(self, name: str, arguments: dict[str, Any]) -> Any:
         """Execute a tool by name with the given arguments.
         
@@ -64,8 +154,49 @@ class ToolRegistry:
         function = self._tools.get(name)
         if function is None:
             raise ValueError(f"Tool '{name}' not found in registry")
+        caller_arg = self._caller_args.get(name)
+        if caller_arg is not None:
+            arguments = {**arguments, caller_arg: _tool_caller.get()}
         
-        return function(**arguments)
+        policy = self._cache_policies.get(name)
+        if policy is None:
+            try:
+                return function(**arguments)
+            finally:
+                if name in self._invalidates:
+                    self.invalidate(*self._invalidates[name])
+        
+        key = (name, json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str))
+        hit, value = self._cache.get(key)
+        tracing.annotate(**{"tool.cache_hit": hit})
+        if hit:
+            return value
+        
+        # Stamp before running so a write that lands mid-call makes this result stale
+        stamp = self.data_versions.snapshot(policy.tags)
+        result = function(**arguments)
+        failed = isinstance(result, str) and result.startswith('{"error"')
+        if stamp is not None and not failed:
+            self._cache.set(key, result, ttl=policy.ttl, stamp=stamp)
+        return result
+
+    def invalidate(self, *tags: str) -> None:
+        """Mark cached results depending on ``tags`` as stale in this worker.
+
+        Other workers see the write through the shared ``data_versions``
+        counters (``AI_DATA_VERSIONS_BACKEND=postgres``).
+        """
+        self.data_versions.bump(tags)
+        get_metrics().incr("tool_cache.invalidations")
+
+    @staticmethod
+    def _shared_versions() -> dict[str, int]:
+        with _get_db_manager().cursor() as cur:
+            cur.execute("SELECT tag, version FROM data_versions")
+            return dict(cur.fetchall())
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
 
 
 # Global tool registry
@@ -77,6 +208,11 @@ def get_tool_registry() -> ToolRegistry:
     return _tool_registry
 
 
+def invalidate_tool_cache(*tags: str) -> None:
+    """Invalidate cached tool results for ``tags`` (e.g. after REST writes)."""
+    _tool_registry.invalidate(*tags)
+
+
 # ============================================================================
 # Example Tools - Replace with your actual business logic
 # ============================================================================
@@ -125,51 +261,177 @@ def get_weather(location: str, unit: str = "celsius") -> str:
 # Kubo Booking System Tools
 # ============================================================================
 
+# Connections in the tools' pool; the executor runs at most this many tools at once
+TOOL_DB_MAX_CONNECTIONS = 5
+
 # Initialize database manager for tools
 _db_manager: DatabaseManager | None = None
+_db_manager_lock = threading.Lock()
 
 
 def _get_db_manager() -> DatabaseManager:
-    """Get or create the database manager instance for tools."""
+    """Get or create the database manager instance for tools.
+
+    Tools run in worker threads, so creation is locked.
+    """
     global _db_manager
     if _db_manager is None:
-        _db_manager = DatabaseManager()
-        _db_manager.connect()
+        with _db_manager_lock:
+            if _db_manager is None:
+                db_manager = DatabaseManager(maxconn=TOOL_DB_MAX_CONNECTIONS)
+                db_manager.connect()
+                _db_manager = db_manager
     return _db_manager
 
 
-def list_available_pods() -> str:
-    """List all available pods that can be booked.
+# Columns the list tools may project; the defaults leave out long text and audit columns
+POD_COLUMNS = (
+    "id", "name", "description", "capacity", "price_cents", "is_active", "created_at", "updated_at",
+)
+POD_DEFAULT_FIELDS = ("id", "name", "capacity", "price_cents")
+BOOKING_COLUMNS = (
+    "id", "user_id", "pod_id", "start_time", "end_time", "status", "total_price_cents",
+    "created_at", "updated_at",
+)
+BOOKING_DEFAULT_FIELDS = ("id", "pod_id", "start_time", "end_time", "status", "total_price_cents")
+
+
+def _project(
+    fields: list[str] | None, allowed: tuple[str, ...], default: tuple[str, ...]
+) -> list[str]:
+    """Validated column list for a projection; ``id`` is always included."""
+    if not fields:
+        return list(default)
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return ["id"] + [field for field in dict.fromkeys(fields) if field != "id"]
+
+
+def _page_size(limit: int | None) -> int:
+    if limit is None:
+        return settings.ai_tool_page_size
+    return max(1, min(int(limit), settings.ai_tool_page_size_max))
+
+
+def _encode_cursor(values: list[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> list[Any]:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor; pass next_cursor from a previous result") from exc
+
+
+def _cell(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _table(
+    columns: list[str],
+    rows: list[tuple[Any, ...]],
+    has_more: bool,
+    cursor_for: Callable[[tuple[Any, ...]], str],
+) -> str:
+    """Encode rows compactly as column names plus value arrays.
+
+    Rows may carry extra trailing values for ``cursor_for``; only the first
+    ``len(columns)`` are returned. The result is capped at
+    ``settings.ai_tool_result_max_chars``: rows that don't fit are dropped, the
+    cursor resumes after the last row kept and a notice says so. At least one
+    row is always kept, so the cursor always moves forward.
+    """
+    width = len(columns)
+    cells = [[_cell(value) for value in row[:width]] for row in rows]
+    table: dict[str, Any] = {"columns": columns, "rows": cells, "next_cursor": None}
+    limit = settings.ai_tool_result_max_chars
+    size = len(json.dumps(table, separators=(",", ":")))
+    kept = len(cells)
+    if size > limit:
+        # Leave room for the notice and cursor
+        while kept > 1 and size > limit - 300:
+            kept -= 1
+            size -= len(json.dumps(cells[kept], separators=(",", ":"))) + 1
+        if kept < len(cells):
+            table["rows"] = cells[:kept]
+            table["truncated"] = (
+                f"{len(cells) - kept} more rows on this page were omitted to keep the result "
+                "small. Pass next_cursor to continue, or narrow the filters or fields."
+            )
+            get_metrics().incr("tools.truncated_results")
+    if kept and (has_more or kept < len(cells)):
+        table["next_cursor"] = cursor_for(rows[kept - 1])
+    return json.dumps(table, separators=(",", ":"))
+
+
+def list_available_pods(
+    limit: int | None = None,
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+    min_capacity: int | None = None,
+    free_from: str | None = None,
+    free_until: str | None = None,
+) -> str:
+    """List active pods, one page at a time.
     
+    Args:
+        limit: Page size (capped by settings)
+        cursor: ``next_cursor`` from a previous page
+        fields: Columns to return (defaults to id, name, capacity, price_cents)
+        min_capacity: Only pods holding at least this many people
+        free_from: With ``free_until``, only pods without a booking overlapping the window
+        free_until: End of the window, ISO 8601
+        
     Returns:
-        JSON string with list of pods including name, description, capacity, and price
+        JSON table with ``columns``, ``rows`` and ``next_cursor``
     """
     try:
+        columns = _project(fields, POD_COLUMNS, POD_DEFAULT_FIELDS)
+        page_size = _page_size(limit)
+        conditions = ["is_active = TRUE"]
+        params: list[Any] = []
+        if cursor:
+            (last_id,) = _decode_cursor(cursor)
+            conditions.append("id > %s")
+            params.append(last_id)
+        if min_capacity is not None:
+            conditions.append("capacity >= %s")
+            params.append(min_capacity)
+        if free_from and free_until:
+            conditions.append(
+                """NOT EXISTS (
+                    SELECT 1 FROM bookings b
+                    WHERE b.pod_id = pods.id AND b.status <> 'cancelled'
+                      AND b.start_time < %s AND b.end_time > %s
+                )"""
+            )
+            params.extend([free_until, free_from])
+        params.append(page_size + 1)
+
         db = _get_db_manager()
         with db.cursor() as cur:
             cur.execute(
-                """
-                SELECT id, name, description, capacity, price_cents, is_active, created_at, updated_at
+                f"""
+                SELECT {', '.join(columns)}
                 FROM pods
-                ORDER BY name
-                """
+                WHERE {' AND '.join(conditions)}
+                ORDER BY id
+                LIMIT %s
+                """,
+                tuple(params),
             )
             rows = cur.fetchall()
-            
-            pods = [
-                {
-                    "id": row[0],
-                    "name": row[1],
-                    "description": row[2],
-                    "capacity": row[3],
-                    "price_cents": row[4],
-                    "is_active": row[5],
-                    "created_at": row[6].isoformat() if row[6] else None,
-                    "updated_at": row[7].isoformat() if row[7] else None,
-                }
-                for row in rows
-            ]
-            return json.dumps(pods)
+        
+        return _table(
+            columns,
+            rows[:page_size],
+            has_more=len(rows) > page_size,
+            cursor_for=lambda row: _encode_cursor([row[0]]),
+        )
     except Exception as exc:  # noqa: BLE001
         return json.dumps({"error": f"Failed to fetch pods: {str(exc)}"})
 
@@ -214,39 +476,75 @@ def get_pod_details(pod_id: int) -> str:
         return json.dumps({"error": f"Failed to fetch pod: {str(exc)}"})
 
 
-def list_user_bookings() -> str:
-    """List all bookings in the system.
+def list_user_bookings(
+    limit: int | None = None,
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+    user_id: int | None = None,
+    pod_id: int | None = None,
+    status: str | None = None,
+    start_after: str | None = None,
+    start_before: str | None = None,
+) -> str:
+    """List a user's bookings, newest first, one page at a time.
     
+    Args:
+        limit: Page size (capped by settings)
+        cursor: ``next_cursor`` from a previous page
+        fields: Columns to return (defaults leave out user and audit columns)
+        user_id: Whose bookings; the registry sets it to the signed-in user
+        pod_id: Only bookings of this pod
+        status: Only bookings with this status
+        start_after: Only bookings starting at or after this ISO 8601 time
+        start_before: Only bookings starting before this ISO 8601 time
+        
     Returns:
-        JSON string with list of bookings including pod, time slots, and status
+        JSON table with ``columns``, ``rows`` and ``next_cursor``
     """
+    if user_id is None:
+        return json.dumps({"error": "Sign in to see your bookings"})
     try:
+        columns = _project(fields, BOOKING_COLUMNS, BOOKING_DEFAULT_FIELDS)
+        page_size = _page_size(limit)
+        conditions = ["user_id = %s"]
+        params: list[Any] = [user_id]
+        if cursor:
+            last_start, last_id = _decode_cursor(cursor)
+            conditions.append("(start_time, id) < (%s, %s)")
+            params.extend([last_start, last_id])
+        for column, value in (("pod_id", pod_id), ("status", status)):
+            if value is not None:
+                conditions.append(f"{column} = %s")
+                params.append(value)
+        if start_after:
+            conditions.append("start_time >= %s")
+            params.append(start_after)
+        if start_before:
+            conditions.append("start_time < %s")
+            params.append(start_before)
+        params.append(page_size + 1)
+
         db = _get_db_manager()
         with db.cursor() as cur:
+            # start_time rides along at the end to build the keyset cursor
             cur.execute(
-                """
-                SELECT id, user_id, pod_id, start_time, end_time, status, total_price_cents, created_at, updated_at
+                f"""
+                SELECT {', '.join(columns)}, start_time
                 FROM bookings
-                ORDER BY start_time DESC
-                """
+                WHERE {' AND '.join(conditions)}
+                ORDER BY start_time DESC, id DESC
+                LIMIT %s
+                """,
+                tuple(params),
             )
             rows = cur.fetchall()
-            
-            bookings = [
-                {
-                    "id": row[0],
-                    "user_id": row[1],
-                    "pod_id": row[2],
-                    "start_time": row[3].isoformat() if row[3] else None,
-                    "end_time": row[4].isoformat() if row[4] else None,
-                    "status": row[5],
-                    "total_price_cents": row[6],
-                    "created_at": row[7].isoformat() if row[7] else None,
-                    "updated_at": row[8].isoformat() if row[8] else None,
-                }
-                for row in rows
-            ]
-            return json.dumps(bookings)
+        
+        return _table(
+            columns,
+            rows[:page_size],
+            has_more=len(rows) > page_size,
+            cursor_for=lambda row: _encode_cursor([row[-1].isoformat(), row[0]]),
+        )
     except Exception as exc:  # noqa: BLE001
         return json.dumps({"error": f"Failed to fetch bookings: {str(exc)}"})
 
@@ -355,7 +653,7 @@ def update_booking(
         booking_id: The ID of the booking to update
         start_time: New start time in ISO format (optional)
         end_time: New end time in ISO format (optional)
-        status: New status - one of: pending, confirmed, cancelled, completed (optional)
+        status: New status - one of: pending, confirmed, cancelled (optional)
         
     Returns:
         JSON string with the updated booking details
@@ -451,6 +749,8 @@ def register_default_tools() -> None:
     registry.register(
         name="calculate",
         function=calculate,
+        read_only=True,
+        cache=CachePolicy(ttl=3600),
         schema={
             "type": "function",
             "function": {
@@ -475,6 +775,7 @@ def register_default_tools() -> None:
     registry.register(
         name="get_weather",
         function=get_weather,
+        read_only=True,
         schema={
             "type": "function",
             "function": {
@@ -504,14 +805,51 @@ def register_default_tools() -> None:
     registry.register(
         name="list_available_pods",
         function=list_available_pods,
+        read_only=True,
+        # The free_from/free_until filter reads bookings
+        cache=CachePolicy(ttl=60, tags=("pods", "bookings")),
         schema={
             "type": "function",
             "function": {
                 "name": "list_available_pods",
-                "description": "List all available pods that can be booked. Shows pod names, descriptions, capacity, and pricing.",
+                "description": (
+                    "List active pods that can be booked, as a paged table of id, name, capacity "
+                    "and price. Can filter to pods free during a time window."
+                ),
                 "parameters": {
                     "type": "object",
-                    "properties": {},
+                    "properties": {
+                        "limit": {
+                            "type": "integer",
+                            "description": "Maximum rows to return (default 20)"
+                        },
+                        "cursor": {
+                            "type": "string",
+                            "description": (
+                                "next_cursor from a previous result, to fetch the next page"
+                            )
+                        },
+                        "fields": {
+                            "type": "array",
+                            "items": {"type": "string", "enum": list(POD_COLUMNS)},
+                            "description": "Columns to return; omit for a compact default set"
+                        },
+                        "min_capacity": {
+                            "type": "integer",
+                            "description": "Only pods holding at least this many people"
+                        },
+                        "free_from": {
+                            "type": "string",
+                            "description": (
+                                "Start of a time window in ISO 8601; with free_until, "
+                                "only pods with no booking in it"
+                            )
+                        },
+                        "free_until": {
+                            "type": "string",
+                            "description": "End of the time window in ISO 8601"
+                        }
+                    },
                     "required": []
                 },
                 "strict": True
@@ -522,6 +860,8 @@ def register_default_tools() -> None:
     registry.register(
         name="get_pod_details",
         function=get_pod_details,
+        read_only=True,
+        cache=CachePolicy(ttl=60, tags=("pods",)),
         schema={
             "type": "function",
             "function": {
@@ -545,14 +885,53 @@ def register_default_tools() -> None:
     registry.register(
         name="list_user_bookings",
         function=list_user_bookings,
+        read_only=True,
+        cache=CachePolicy(ttl=15, tags=("bookings",)),
+        caller_arg="user_id",
         schema={
             "type": "function",
             "function": {
                 "name": "list_user_bookings",
-                "description": "List all bookings in the system with details about pod, time slots, status, and pricing.",
+                "description": (
+                    "List the signed-in user's bookings newest first, as a paged table of pod, "
+                    "time slot, status and price. Filter by pod, status or start time."
+                ),
                 "parameters": {
                     "type": "object",
-                    "properties": {},
+                    "properties": {
+                        "limit": {
+                            "type": "integer",
+                            "description": "Maximum rows to return (default 20)"
+                        },
+                        "cursor": {
+                            "type": "string",
+                            "description": (
+                                "next_cursor from a previous result, to fetch the next page"
+                            )
+                        },
+                        "fields": {
+                            "type": "array",
+                            "items": {"type": "string", "enum": list(BOOKING_COLUMNS)},
+                            "description": "Columns to return; omit for a compact default set"
+                        },
+                        "pod_id": {
+                            "type": "integer",
+                            "description": "Only bookings of this pod"
+                        },
+                        "status": {
+                            "type": "string",
+                            "enum": ["pending", "confirmed", "cancelled"],
+                            "description": "Only bookings with this status"
+                        },
+                        "start_after": {
+                            "type": "string",
+                            "description": "Only bookings starting at or after this ISO 8601 time"
+                        },
+                        "start_before": {
+                            "type": "string",
+                            "description": "Only bookings starting before this ISO 8601 time"
+                        }
+                    },
                     "required": []
                 },
                 "strict": True
@@ -563,6 +942,8 @@ def register_default_tools() -> None:
     registry.register(
         name="get_booking_details",
         function=get_booking_details,
+        read_only=True,
+        cache=CachePolicy(ttl=15, tags=("bookings",)),
         schema={
             "type": "function",
             "function": {
@@ -586,6 +967,7 @@ def register_default_tools() -> None:
     registry.register(
         name="create_booking",
         function=create_booking,
+        invalidates=("bookings",),
         schema={
             "type": "function",
             "function": {
@@ -625,6 +1007,7 @@ def register_default_tools() -> None:
     registry.register(
         name="update_booking",
         function=update_booking,
+        invalidates=("bookings",),
         schema={
             "type": "function",
             "function": {
@@ -647,7 +1030,7 @@ def register_default_tools() -> None:
                         },
                         "status": {
                             "type": "string",
-                            "enum": ["pending", "confirmed", "cancelled", "completed"],
+                            "enum": ["pending", "confirmed", "cancelled"],
                             "description": "New booking status (optional)"
                         }
                     },
@@ -661,6 +1044,7 @@ def register_default_tools() -> None:
     registry.register(
         name="cancel_booking",
         function=cancel_booking,
+        invalidates=("bookings",),
         schema={
             "type": "function",
             "function": {
@@ -0,0 +1,72 @@
+"""Per-request LLM usage log.
+
+One ``ai_request_log`` row per chat request: who asked, which model answered,
+token usage, tool calls and wall time. Rows go through the write-behind
+queue, so logging never delays the response.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any
+
+from psycopg2.extras import execute_values
+
+from ..db import DatabaseManager
+
+
+# Write-behind kind for usage rows
+USAGE_KIND = "ai_usage"
+
+
+def usage_row(
+    *,
+    user_id: int | None,
+    endpoint: str,
+    response: dict[str, Any] | None,
+    tool_calls: int,
+    duration_seconds: float,
+) -> dict[str, Any]:
+    """A usage row for one request, stamped now."""
+    response = response if isinstance(response, dict) else {}
+    usage = response.get("usage") or {}
+    return {
+        "user_id": user_id,
+        "endpoint": endpoint,
+        "model": response.get("model"),
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+        "tool_calls": tool_calls,
+        "duration_ms": round(duration_seconds * 1000),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def write_usage_batch(db_manager: DatabaseManager, rows: list[dict[str, Any]]) -> int:
+    """Write-behind writer for ``usage_row`` rows."""
+    with db_manager.cursor() as cur:
+        execute_values(
+            cur,
+            """
+            INSERT INTO ai_request_log
+              (user_id, endpoint, model, prompt_tokens, completion_tokens, tool_calls, duration_ms,
+               created_at)
+            VALUES %s
+            """,
+            [
+                (
+                    row["user_id"],
+                    row["endpoint"],
+                    row["model"],
+                    row["prompt_tokens"],
+                    row["completion_tokens"],
+                    row["tool_calls"],
+                    row["duration_ms"],
+                    row["created_at"],
+                )
+                for row in rows
+            ],
+            template="(%s, %s, %s, %s, %s, %s, %s, %s::timestamptz)",
+            page_size=len(rows),
+        )
+    return len(rows)
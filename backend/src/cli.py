@@ -1,10 +1,16 @@
 from __future__ import annotations
 
-import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 
 import click
 
-from .db import init_models
+from .db import DatabaseManager
+from . import seeding
+
+
+_MIGRATIONS = Path(__file__).resolve().parent.parent / "sql" / "migrations.sql"
 
 
 @click.group()
@@ -14,11 +20,123 @@ def cli() -> None:  # pragma: no cover - small utility
 
 @cli.command("init-db")
 def init_db_cmd() -> None:
-    asyncio.run(init_models())
+    db_manager = DatabaseManager()
+    db_manager.connect()
+    try:
+        with db_manager.cursor() as cur:
+            cur.execute(_MIGRATIONS.read_text())
+    finally:
+        db_manager.close()
     click.echo("DB initialized.")
 
 
-if __name__ == "__main__":  # pragma: no cover
-    cli()
+def _next_id(cur, table: str) -> int:
+    cur.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+    return int(cur.fetchone()[0])
+
+
+def _sync_sequence(cur, table: str) -> None:
+    cur.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+        f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+    )
+
+
+def _load(cur, table: str, columns, lines) -> None:
+    started = time.perf_counter()
+    rows = seeding.copy_lines(cur, table, columns, lines)
+    elapsed = time.perf_counter() - started
+    rate = rows / max(elapsed, 1e-9)
+    click.echo(f"{table:>12}: {rows:>11,} rows in {elapsed:7.1f}s ({rate:,.0f} rows/s)")
 
 
+@cli.command("seed-load")
+@click.option("--users", default=100_000, show_default=True, help="Users to create.")
+@click.option("--pods", default=1_000, show_default=True, help="Pods to create.")
+@click.option("--bookings", default=1_000_000, show_default=True, help="Bookings to create.")
+@click.option("--chats", default=100_000, show_default=True, help="Chat histories to create.")
+@click.option("--seed", default=42, show_default=True, help="RNG seed; same seed, same data.")
+@click.option(
+    "--start",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default="2024-01-01",
+    show_default=True,
+    help="First booking day; also anchors generated created_at values.",
+)
+def seed_load_cmd(
+    users: int, pods: int, bookings: int, chats: int, seed: int, start: datetime
+) -> None:
+    """Bulk-load synthetic users, pods, bookings and chats via COPY.
+
+    Pass 0 to skip a table; bookings and chats then draw from the rows already
+    in the database. All users share the password ``LoadTest123``.
+    """
+    anchor = start.replace(tzinfo=timezone.utc)
+    db_manager = DatabaseManager()
+    db_manager.connect()
+    try:
+        with db_manager.cursor() as cur:
+            cur.execute("SET LOCAL synchronous_commit = off")
+
+            if users:
+                first = _next_id(cur, "users")
+                lines = seeding.generate_users(users, first_id=first, seed=seed, now=anchor)
+                _load(cur, "users", seeding.USER_COLUMNS, lines)
+                _sync_sequence(cur, "users")
+            if pods:
+                first = _next_id(cur, "pods")
+                lines = seeding.generate_pods(pods, first_id=first, seed=seed)
+                _load(cur, "pods", seeding.POD_COLUMNS, lines)
+                _sync_sequence(cur, "pods")
+
+            cur.execute("SELECT id FROM users WHERE is_active ORDER BY id")
+            user_ids = [row[0] for row in cur.fetchall()]
+            cur.execute("SELECT id, name, price_cents FROM pods WHERE is_active ORDER BY id")
+            pod_rows = cur.fetchall()
+
+            if bookings:
+                # Start after any existing booking so windows never collide with real data
+                cur.execute("SELECT MAX(end_time) FROM bookings")
+                latest = cur.fetchone()[0]
+                booking_start = max(anchor, latest + timedelta(days=1)) if latest else anchor
+                first = _next_id(cur, "bookings")
+                _load(
+                    cur,
+                    "bookings",
+                    seeding.BOOKING_COLUMNS,
+                    seeding.generate_bookings(
+                        bookings,
+                        first_id=first,
+                        seed=seed,
+                        pods=[(row[0], row[2]) for row in pod_rows],
+                        user_ids=user_ids,
+                        start=booking_start,
+                    ),
+                )
+                _sync_sequence(cur, "bookings")
+            if chats:
+                pod_names = [row[1] for row in pod_rows]
+                _load(
+                    cur,
+                    "conversations",
+                    seeding.CONVERSATION_COLUMNS,
+                    seeding.generate_conversations(
+                        chats, seed=seed, user_ids=user_ids, pod_names=pod_names, now=anchor
+                    ),
+                )
+                _load(
+                    cur,
+                    "chat_messages",
+                    seeding.CHAT_MESSAGE_COLUMNS,
+                    seeding.generate_chat_messages(
+                        chats, seed=seed, user_ids=user_ids, pod_names=pod_names, now=anchor
+                    ),
+                )
+            cur.execute("ANALYZE users, pods, bookings, conversations, chat_messages")
+    finally:
+        db_manager.close()
+    click.echo("Load data seeded.")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    cli()
@@ -1,16 +1,19 @@
 from __future__ import annotations
 
+import re
 from contextlib import contextmanager
-from typing import Generator, Optional
+from typing import Any, Generator, Optional
 import psycopg2  # type: ignore
-from psycopg2.pool import SimpleConnectionPool 
+from psycopg2.pool import ThreadedConnectionPool
+from . import tracing
 from .settings import settings
 
 
 class DatabaseManager:
     """Lightweight connection pool manager using psycopg2.
 
-    Provides a simple sync pool for direct SQL needs.
+    Provides a simple sync pool for direct SQL needs. The pool is thread-safe
+    so blocking queries can be pushed off the event loop with ``asyncio.to_thread``.
     """
 
     def __init__(self, dsn: Optional[str] = None, minconn: int = 1, maxconn: int = 5) -> None:
@@ -18,11 +21,11 @@ class DatabaseManager:
         self.dsn: str = dsn or settings.database_url
         self.minconn = minconn
         self.maxconn = maxconn
-        self._pool: Optional[SimpleConnectionPool] = None
+        self._pool: Optional[ThreadedConnectionPool] = None
 
     def connect(self) -> None:
         if self._pool is None:
-            self._pool = SimpleConnectionPool(self.minconn, self.maxconn, dsn=self.dsn)
+            self._pool = ThreadedConnectionPool(self.minconn, self.maxconn, dsn=self.dsn)
 
     def close(self) -> None:
         if self._pool is not None:
@@ -52,6 +55,8 @@ class DatabaseManager:
     def cursor(self) -> Generator:
         with self.connection() as conn:
             cur = conn.cursor()
+            if tracing.current_trace() is not None:
+                cur = _TracedCursor(cur)
             try:
                 yield cur
                 conn.commit()
@@ -62,4 +67,43 @@ class DatabaseManager:
                 cur.close()
 
 
+class _TracedCursor:
+    """Cursor proxy that records a ``db.query`` span per statement."""
 
+    def __init__(self, cursor: Any) -> None:
+        self._cursor = cursor
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, query: Any, vars: Any = None) -> None:
+        with tracing.span("db.query", **_query_attributes(query)) as span:
+            self._cursor.execute(query, vars)
+            span.set("db.rows", self._cursor.rowcount)
+
+    def executemany(self, query: Any, vars_list: Any) -> None:
+        with tracing.span("db.query", **_query_attributes(query)) as span:
+            self._cursor.executemany(query, vars_list)
+            span.set("db.rows", self._cursor.rowcount)
+
+
+def _statement(query: Any) -> str:
+    """Statement text for a span, without parameter values.
+
+    ``execute_values`` sends bytes with the values already inlined, so those
+    are cut at ``VALUES``.
+    """
+    if isinstance(query, bytes):
+        text = query.decode("utf-8", "replace")
+        head, found, _ = text.partition("VALUES")
+        text = head + "VALUES ..." if found else ""
+    else:
+        text = str(query)
+    return re.sub(r"\s+", " ", text).strip()[:500]
+
+
+def _query_attributes(query: Any) -> dict[str, Any]:
+    return {"db.system": "postgresql", "db.statement": _statement(query)}
@@ -0,0 +1,262 @@
+"""Append-only chat history.
+
+Each conversation has a stable id and its messages are rows in
+``chat_messages``, numbered by ``seq`` within the conversation. A turn appends
+only the messages it added, so writes scale with the turn rather than the
+whole conversation. Turns go through the write-behind queue and are written
+in batches, which is why new conversation ids are minted here rather than by
+Postgres. Reads page over ``(conversation_id, seq)`` instead of loading the
+conversation at once.
+"""
+
+from __future__ import annotations
+
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+from psycopg2.extras import execute_values
+
+from .db import DatabaseManager
+from .metrics import get_metrics
+from .settings import settings
+
+
+# Write-behind kind for queued turns
+HISTORY_KIND = "chat_history"
+
+
+class ConversationNotFoundError(LookupError):
+    """Raised when a conversation doesn't exist or belongs to another user."""
+
+
+@dataclass
+class HistoryPage:
+    """A slice of one conversation, oldest message first."""
+
+    conversation_id: str
+    messages: list[dict[str, Any]]
+    has_more: bool
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "conversation_id": self.conversation_id,
+            "messages": self.messages,
+            "has_more": self.has_more,
+        }
+
+
+def new_conversation_id() -> str:
+    return str(uuid.uuid4())
+
+
+def page_size(limit: int | None) -> int:
+    """Clamp a requested page size to ``CHAT_HISTORY_PAGE_SIZE_MAX``."""
+    if limit is None or limit <= 0:
+        return settings.chat_history_page_size
+    return min(limit, settings.chat_history_page_size_max)
+
+
+class HistoryStore:
+    """Reads and appends conversations in ``conversations``/``chat_messages``."""
+
+    def __init__(self, db_manager: DatabaseManager) -> None:
+        self.db_manager = db_manager
+
+    def write_batch(self, rows: list[dict[str, Any]]) -> int:
+        """Append several turns in one transaction, one multi-row insert per table.
+
+        Each row is a ``history_row``. An unknown
+        conversation id creates the conversation. Sequence numbers are reserved
+        by bumping ``message_count``, which also serialises concurrent appends to
+        the same conversation. Turns for a conversation that belongs to another
+        user are dropped.
+
+        Returns:
+            The number of messages written
+        """
+        turns: dict[str, dict[str, Any]] = {}
+        for row in rows:
+            turn = turns.setdefault(
+                row["conversation_id"], {"user_id": row["user_id"], "messages": []}
+            )
+            if turn["user_id"] == row["user_id"]:
+                turn["messages"].extend((message, row["created_at"]) for message in row["messages"])
+        if not turns:
+            return 0
+
+        with self.db_manager.cursor() as cur:
+            reserved = execute_values(
+                cur,
+                """
+                INSERT INTO conversations AS c (id, user_id, message_count)
+                VALUES %s
+                ON CONFLICT (id) DO UPDATE
+                SET message_count = c.message_count + EXCLUDED.message_count, updated_at = NOW()
+                WHERE c.user_id = EXCLUDED.user_id
+                RETURNING c.id::text, c.message_count
+                """,
+                [
+                    (conversation_id, turn["user_id"], len(turn["messages"]))
+                    for conversation_id, turn in turns.items()
+                ],
+                template="(%s::uuid, %s, %s)",
+                page_size=len(turns),
+                fetch=True,
+            )
+            values = []
+            for conversation_id, last_seq in reserved:
+                messages = turns[conversation_id]["messages"]
+                first_seq = last_seq - len(messages) + 1
+                values.extend(
+                    (conversation_id, first_seq + offset, json.dumps(message), created_at)
+                    for offset, (message, created_at) in enumerate(messages)
+                )
+            if values:
+                execute_values(
+                    cur,
+                    "INSERT INTO chat_messages (conversation_id, seq, message, created_at) "
+                    "VALUES %s",
+                    values,
+                    template="(%s::uuid, %s, %s::jsonb, %s::timestamptz)",
+                    page_size=len(values),
+                )
+        metrics = get_metrics()
+        metrics.incr("history.appends", len(reserved))
+        metrics.incr("history.messages_appended", len(values))
+        metrics.incr("history.rejected", len(turns) - len(reserved))
+        return len(values)
+
+    def read(
+        self,
+        user_id: int,
+        conversation_id: str,
+        *,
+        after_seq: int | None = None,
+        before_seq: int | None = None,
+        limit: int | None = None,
+    ) -> HistoryPage:
+        """One page of a conversation.
+
+        With ``after_seq`` the page starts right after it and ``has_more`` means
+        newer messages follow. Otherwise the page is the newest messages before
+        ``before_seq`` (or the end) and ``has_more`` means older ones exist.
+        Each message carries its ``seq`` for the next page's cursor.
+
+        Raises:
+            ConversationNotFoundError: Not one of the user's conversations
+        """
+        size = page_size(limit)
+        forward = after_seq is not None
+        with self.db_manager.cursor() as cur:
+            cur.execute(
+                "SELECT 1 FROM conversations WHERE id = %s AND user_id = %s",
+                (conversation_id, user_id),
+            )
+            if cur.fetchone() is None:
+                raise ConversationNotFoundError(f"Conversation {conversation_id} not found")
+            if forward:
+                cur.execute(
+                    """
+                    SELECT seq, message
+                    FROM chat_messages
+                    WHERE conversation_id = %s AND seq > %s
+                    ORDER BY seq
+                    LIMIT %s
+                    """,
+                    (conversation_id, after_seq, size + 1),
+                )
+            else:
+                cur.execute(
+                    """
+                    SELECT seq, message
+                    FROM chat_messages
+                    WHERE conversation_id = %s AND seq < %s
+                    ORDER BY seq DESC
+                    LIMIT %s
+                    """,
+                    (conversation_id, 2**31 - 1 if before_seq is None else before_seq, size + 1),
+                )
+            rows = cur.fetchall()
+
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if not forward:
+            rows.reverse()
+        messages = [{"seq": seq, **_decode(message)} for seq, message in rows]
+        return HistoryPage(conversation_id, messages, has_more)
+
+    def message_count(self, user_id: int, conversation_id: str) -> int | None:
+        """The last ``seq`` written to one of the user's conversations, or None if it isn't one."""
+        with self.db_manager.cursor() as cur:
+            cur.execute(
+                "SELECT message_count FROM conversations WHERE id = %s AND user_id = %s",
+                (conversation_id, user_id),
+            )
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def list_conversations(
+        self,
+        user_id: int,
+        *,
+        limit: int | None = None,
+        before: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """The user's conversations, most recently updated first.
+
+        ``before`` is the id of the last conversation on the previous page.
+        """
+        with self.db_manager.cursor() as cur:
+            cur.execute(
+                """
+                SELECT id::text, message_count, created_at, updated_at
+                FROM conversations
+                WHERE user_id = %s
+                  AND (%s::uuid IS NULL OR (updated_at, id) < (
+                    SELECT updated_at, id FROM conversations WHERE id = %s::uuid
+                  ))
+                ORDER BY updated_at DESC, id DESC
+                LIMIT %s
+                """,
+                (user_id, before, before, page_size(limit)),
+            )
+            rows = cur.fetchall()
+        return [
+            {
+                "id": conversation_id,
+                "message_count": count,
+                "created_at": created_at.isoformat(),
+                "updated_at": updated_at.isoformat(),
+            }
+            for conversation_id, count, created_at, updated_at in rows
+        ]
+
+
+def _decode(message: Any) -> dict[str, Any]:
+    # psycopg2 decodes jsonb already; be lenient with text columns
+    if isinstance(message, str):
+        try:
+            message = json.loads(message)
+        except ValueError:
+            return {}
+    return message if isinstance(message, dict) else {}
+
+
+def write_history_batch(db_manager: DatabaseManager, rows: list[dict[str, Any]]) -> int:
+    """Write-behind writer for ``history_row`` rows."""
+    return HistoryStore(db_manager).write_batch(rows)
+
+
+def history_row(
+    user_id: int, conversation_id: str, messages: list[dict[str, Any]]
+) -> dict[str, Any]:
+    """A queued turn: ``messages`` to append to ``conversation_id``, stamped now."""
+    return {
+        "conversation_id": conversation_id,
+        "user_id": user_id,
+        "messages": messages,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
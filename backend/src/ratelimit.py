@@ -0,0 +1,225 @@
+"""Per-client rate limiting for expensive endpoints.
+
+Token buckets keyed by client IP or session, with per-route policies. The
+default backend keeps buckets in process; ``RATE_LIMIT_BACKEND=postgres``
+shares them across workers through the ``rate_limit_buckets`` table.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException, Request, status
+from starlette.requests import HTTPConnection
+
+from .db import DatabaseManager
+from .metrics import get_metrics
+from .sessions import current_user_id
+from .settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """Token bucket parameters for one route."""
+
+    capacity: int
+    refill_per_second: float
+    scope: str = "ip"  # "ip" or "user" (session, falling back to IP)
+
+    @property
+    def idle_seconds(self) -> float:
+        """Time for an empty bucket to refill completely."""
+        return self.capacity / self.refill_per_second
+
+
+RATE_LIMIT_POLICIES: dict[str, RateLimitPolicy] = {
+    "auth.login": RateLimitPolicy(capacity=10, refill_per_second=10 / 60),
+    "auth.register": RateLimitPolicy(capacity=5, refill_per_second=5 / 3600),
+    "ai.chat": RateLimitPolicy(capacity=20, refill_per_second=20 / 60, scope="user"),
+}
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    allowed: bool
+    retry_after: float = 0.0
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float) -> None:
+        self.tokens = tokens
+        self.updated = updated
+
+
+class InMemoryRateLimiter:
+    """Per-worker token buckets, swept periodically so idle keys don't accumulate."""
+
+    def __init__(self, *, sweep_interval_seconds: float = 60.0, max_keys: int = 100_000) -> None:
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.max_keys = max_keys
+        self._buckets: dict[str, tuple[_Bucket, RateLimitPolicy]] = {}
+        self._last_sweep = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _sweep(self, now: float) -> None:
+        # A bucket that would have refilled to capacity is indistinguishable from a new one
+        idle = [
+            key
+            for key, (bucket, policy) in self._buckets.items()
+            if now - bucket.updated >= policy.idle_seconds
+        ]
+        for key in idle:
+            del self._buckets[key]
+        self._last_sweep = now
+        get_metrics().set_gauge("ratelimit.buckets", len(self._buckets))
+
+    def check(self, key: str, policy: RateLimitPolicy) -> RateLimitDecision:
+        now = time.monotonic()
+        since_sweep = now - self._last_sweep
+        crowded = len(self._buckets) > self.max_keys and since_sweep >= 1.0
+        if since_sweep >= self.sweep_interval_seconds or crowded:
+            self._sweep(now)
+
+        entry = self._buckets.get(key)
+        if entry is None:
+            bucket = _Bucket(float(policy.capacity), now)
+            self._buckets[key] = (bucket, policy)
+        else:
+            bucket = entry[0]
+            refill = (now - bucket.updated) * policy.refill_per_second
+            bucket.tokens = min(policy.capacity, bucket.tokens + refill)
+            bucket.updated = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return RateLimitDecision(True)
+        return RateLimitDecision(False, (1 - bucket.tokens) / policy.refill_per_second)
+
+    async def acquire(self, key: str, policy: RateLimitPolicy) -> RateLimitDecision:
+        return self.check(key, policy)
+
+
+class PostgresRateLimiter:
+    """Token buckets shared by all workers via an atomic upsert."""
+
+    def __init__(
+        self, db_manager: DatabaseManager, *, prune_interval_seconds: float = 300.0
+    ) -> None:
+        self.db_manager = db_manager
+        self.prune_interval_seconds = prune_interval_seconds
+        self._last_prune = time.monotonic()
+
+    def _check(self, key: str, policy: RateLimitPolicy, prune: bool) -> RateLimitDecision:
+        refilled = (
+            "LEAST(%(capacity)s, b.tokens"
+            " + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * %(rate)s)"
+        )
+        with self.db_manager.cursor() as cur:
+            cur.execute(
+                f"""
+                INSERT INTO rate_limit_buckets AS b (key, tokens, allowed, updated_at)
+                VALUES (%(key)s, %(capacity)s - 1, TRUE, clock_timestamp())
+                ON CONFLICT (key) DO UPDATE
+                SET tokens = {refilled} - CASE WHEN {refilled} >= 1 THEN 1 ELSE 0 END,
+                    allowed = {refilled} >= 1,
+                    updated_at = clock_timestamp()
+                RETURNING tokens, allowed
+                """,
+                {"key": key, "capacity": policy.capacity, "rate": policy.refill_per_second},
+            )
+            tokens, allowed = cur.fetchone()
+            if prune:
+                cur.execute(
+                    "DELETE FROM rate_limit_buckets"
+                    " WHERE updated_at < NOW() - %s * INTERVAL '1 second'",
+                    (max(p.idle_seconds for p in RATE_LIMIT_POLICIES.values()),),
+                )
+        if allowed:
+            return RateLimitDecision(True)
+        return RateLimitDecision(False, (1 - tokens) / policy.refill_per_second)
+
+    async def acquire(self, key: str, policy: RateLimitPolicy) -> RateLimitDecision:
+        now = time.monotonic()
+        prune = now - self._last_prune >= self.prune_interval_seconds
+        if prune:
+            self._last_prune = now
+        try:
+            return await asyncio.to_thread(self._check, key, policy, prune)
+        except Exception:  # noqa: BLE001
+            # Fail open: a limiter outage must not take the API down with it
+            get_metrics().incr("ratelimit.backend_errors")
+            logger.exception("Rate limit check failed for %s", key)
+            return RateLimitDecision(True)
+
+
+RateLimiter = InMemoryRateLimiter | PostgresRateLimiter
+
+_default_limiter = InMemoryRateLimiter()
+
+
+def build_rate_limiter(db_manager: DatabaseManager) -> RateLimiter:
+    """Create the limiter selected by ``RATE_LIMIT_BACKEND``."""
+    if settings.rate_limit_backend == "postgres":
+        return PostgresRateLimiter(db_manager)
+    return _default_limiter
+
+
+async def client_key(request: HTTPConnection, scope: str) -> str:
+    """Identity a request (or WebSocket) is limited and scheduled under.
+
+    ``"user"`` scope keys on the user of a valid session, not on the cookie:
+    a client minting a fresh cookie per request must not get a fresh bucket.
+    """
+    if scope == "user":
+        user_id = await current_user_id(request)
+        if user_id is not None:
+            return f"user:{user_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+async def check_rate_limit(connection: HTTPConnection, policy_name: str) -> RateLimitDecision:
+    """Take a token from the caller's bucket for ``RATE_LIMIT_POLICIES[policy_name]``.
+
+    Always allowed while ``RATE_LIMIT_ENABLED`` is off.
+    """
+    if not settings.rate_limit_enabled:
+        return RateLimitDecision(allowed=True)
+    policy = RATE_LIMIT_POLICIES[policy_name]
+    limiter: RateLimiter = getattr(connection.app.state, "rate_limiter", None) or _default_limiter
+    key = await client_key(connection, policy.scope)
+    decision = await limiter.acquire(f"{policy_name}:{key}", policy)
+    get_metrics().incr(f"ratelimit.{policy_name}.{'allowed' if decision.allowed else 'rejected'}")
+    return decision
+
+
+def rate_limit(policy_name: str) -> Callable[[Request], Awaitable[None]]:
+    """FastAPI dependency enforcing ``RATE_LIMIT_POLICIES[policy_name]``.
+
+    Rejected requests get a 429 with a ``Retry-After`` header.
+    """
+    # Unknown policies fail at import time
+    RATE_LIMIT_POLICIES[policy_name]
+
+    async def dependency(request: Request) -> None:
+        decision = await check_rate_limit(request, policy_name)
+        if decision.allowed:
+            return
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(max(1, math.ceil(decision.retry_after)))},
+        )
+
+    return dependency
@@ -5,17 +5,47 @@ Tool use reference: https://inference-docs.cerebras.ai/capabilities/tool-use
 
 from __future__ import annotations
 
+import asyncio
 import json
-from typing import Any, Iterable
-
-from fastapi import APIRouter, HTTPException, Request
+import logging
+import math
+import time
+from contextlib import aclosing
+from dataclasses import asdict
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Iterable, TypeVar
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, status
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError, model_validator
+from starlette.requests import HTTPConnection
 
+from ..ai.client import CircuitOpenError, DeadlineExceededError
+from ..ai.conversations import get_conversation_cache
+from ..ai import sse
 from ..ai.executor import execute_with_tools, execute_with_tools_streaming
 from ..ai.models import CEREBRAS_LATEST_MODELS
-from ..ai.tools import get_tool_registry
-
+from ..ai.tools import get_tool_registry, set_tool_caller
+from ..ai.scheduler import SchedulerOverloadedError
+from ..ai.usage import USAGE_KIND, usage_row
+from ..history import (
+    HISTORY_KIND,
+    ConversationNotFoundError,
+    HistoryStore,
+    history_row,
+    new_conversation_id,
+)
+from ..metrics import get_metrics
+from ..ratelimit import check_rate_limit, client_key, rate_limit
+from ..sessions import current_user_id
+from ..settings import settings
+from .. import tracing
+from ..write_behind import get_write_behind_queue
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
@@ -26,7 +56,22 @@ class MessageSchema(BaseModel):
 
 
 class ChatRequest(BaseModel):
-    messages: list[MessageSchema]
+    # Without conversation_id: the whole conversation so far. With it: only
+    # the new message(s); the server supplies the history.
+    messages: list[MessageSchema] = []
+    # Shorthand for one new user message
+    message: str | None = None
+    conversation_id: UUID | None = None
+    # Also return the raw completion and the full conversation
+    verbose: bool = False
+    # Also return time spent per stage (LLM calls, tools, queries)
+    timings: bool = False
+
+    @model_validator(mode="after")
+    def require_message(self) -> "ChatRequest":
+        if not self.messages and self.message is None:
+            raise ValueError("Send a message or messages")
+        return self
 
 
 @router.get("/models")
@@ -45,7 +90,7 @@ async def list_tools() -> dict[str, Any]:
     }
 
 
-@router.post("/chat/auto")
+@router.post("/chat/auto", dependencies=[Depends(rate_limit("ai.chat"))])
 async def create_chat_completion_with_tools(payload: ChatRequest, request: Request) -> dict[str, Any]:
     """Return a chat completion with AUTOMATIC tool execution.
     
@@ -57,21 +102,55 @@ async def create_chat_completion_with_tools(payload: ChatRequest, request: Reque
     
     If no tools are specified, uses all registered tools from the tool registry.
     
+    Signed-in users get a ``conversation_id`` back; later turns send it with
+    only the new message. The response holds the new answer; pass
+    ``"verbose": true`` for the raw completion and the full conversation, and
+    ``"timings": true`` for the time spent in each LLM call, tool and query.
+    
     Example request:
         POST /ai/chat/auto
         {
-            "messages": [{"role": "user", "content": "What is 25 multiplied by 4?"}]
+            "message": "What is 25 multiplied by 4?",
+            "conversation_id": "5f0c..."
         }
     
     See: https://inference-docs.cerebras.ai/capabilities/tool-use
     """
 
-    try:
-        response, conversation = execute_with_tools(messages=_to_messages(payload.messages))
-        
+    async with tracing.trace("http POST /ai/chat/auto", force=payload.timings) as trace:
+        started = time.perf_counter()
+        user_id = await current_user_id(request)
+        set_tool_caller(user_id)
+        conversation_id, history = await _load_conversation(request, payload, user_id)
+        new_messages = _new_messages(payload)
+        messages = history + new_messages
+        try:
+            response, conversation = await _cancel_on_disconnect(
+                request,
+                execute_with_tools(
+                    messages=messages,
+                    endpoint="chat.auto",
+                    client_key=await client_key(request, "user"),
+                ),
+            )
+        except HTTPException:
+            raise
+        except SchedulerOverloadedError as exc:
+            raise HTTPException(
+                status_code=503,
+                detail=str(exc),
+                headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+            ) from exc
+        except CircuitOpenError as exc:
+            raise HTTPException(status_code=503, detail=str(exc)) from exc
+        except DeadlineExceededError as exc:
+            raise HTTPException(status_code=504, detail=str(exc)) from exc
+        except Exception as exc:  # noqa: BLE001
+            raise HTTPException(status_code=502, detail=str(exc)) from exc
+
         # Convert response to dict
         response_dict = response.model_dump() if hasattr(response, 'model_dump') else response
-        
+
         # Extract the final text response
         final_message = ""
         if isinstance(response_dict, dict):
@@ -79,74 +158,123 @@ async def create_chat_completion_with_tools(payload: ChatRequest, request: Reque
             if choices:
                 message = choices[0].get("message", {})
                 final_message = message.get("content", "")
-        
-        result = {
-            "response": response_dict,
+
+        generated = _generated(messages, conversation)
+        result: dict[str, Any] = {
+            "conversation_id": conversation_id,
             "text": final_message,  # Convenience field for the final answer
-            "conversation": conversation,
-            "tool_calls_executed": len([msg for msg in conversation if msg.get("role") == "tool"])
+            "tool_calls_executed": len([msg for msg in generated if msg.get("role") == "tool"]),
         }
-        # Persist conversation for authenticated users
-        try:
-            user_id = _get_current_user_id(request)
-            if user_id is not None:
-                db_manager = request.app.state.db_manager
-                with db_manager.cursor() as cur:
-                    cur.execute(
-                        """
-                        INSERT INTO chat_history (user_id, message_history)
-                        VALUES (%s, %s)
-                        """,
-                        (user_id, json.dumps(conversation)),
-                    )
-        except Exception:
-            # Don't fail the response if history persistence fails
-            pass
-
+        if payload.verbose:
+            result["response"] = response_dict
+            result["conversation"] = conversation
+
+        await _record_turn(user_id, conversation_id, new_messages + generated)
+        tool_calls = result["tool_calls_executed"]
+        await _record_usage(user_id, "chat.auto", response_dict, tool_calls, started)
+        if trace is not None and payload.timings:
+            result["timings"] = trace.summary(detail=settings.tracing_timings_detail)
         return result
-    except Exception as exc:  # noqa: BLE001
-        raise HTTPException(status_code=502, detail=str(exc)) from exc
 
 
-@router.post("/chat/auto/stream")
-async def stream_chat_with_tools(payload: ChatRequest) -> StreamingResponse:
+@router.post("/chat/auto/stream", dependencies=[Depends(rate_limit("ai.chat"))])
+async def stream_chat_with_tools(payload: ChatRequest, request: Request) -> StreamingResponse:
     """Stream chat completion with AUTOMATIC tool execution.
     
-    This endpoint:
-    1. Executes tool calls automatically (blocking)
-    2. Streams only the final response after all tools are executed
-    3. Provides real-time token generation for the final answer
+    Every LLM turn is streamed in a single pass:
+    1. Content is forwarded as ``data:`` frames holding a JSON string;
+       tokens arriving close together share a frame
+    2. Tool calls are assembled from the stream and executed automatically
+    3. Tool progress is sent as ``event: tool`` frames
+       (``{"kind": "tool_start" | "tool_end", "tool_call_id", "name", "ok"}``)
+    4. ``event: finish`` (``{"reason"}``) ends the stream; ``event: error``
+       ends a failed one
+    
+    Signed-in users first get an ``event: conversation`` frame with the
+    ``conversation_id`` to send with their next message. Idle streams get
+    ``: ping`` comment frames. See ``src/ai/sse.py``.
+    
+    If the client disconnects, the LLM call and pending read-only tools are
+    cancelled; what was generated so far is still saved to the conversation.
+    Starlette notices the disconnect and cancels the response, so the turn is
+    saved by a task of its own (see :class:`_StreamTurn`).
     
     Example request:
         POST /ai/chat/auto/stream
         {
-            "messages": [{"role": "user", "content": "What is 25 multiplied by 4?"}]
+            "message": "What is 25 multiplied by 4?"
         }
     
-    Note: Tool execution happens before streaming starts, then streams the final response.
-    
     See: https://inference-docs.cerebras.ai/capabilities/tool-use
     """
 
-    def event_stream():
-        try:
-            for chunk in execute_with_tools_streaming(messages=_to_messages(payload.messages)):
-                # Serialize chunk to JSON
-                if hasattr(chunk, 'model_dump'):
-                    chunk_data = chunk.model_dump()
-                elif hasattr(chunk, 'dict'):
-                    chunk_data = chunk.dict()
-                else:
-                    chunk_data = chunk
-                    
-                yield f"data: {json.dumps(chunk_data)}\n\n"
-            yield "data: [DONE]\n\n"
-        except Exception as exc:  # noqa: BLE001
-            yield f"event: error\ndata: {str(exc)}\n\n"
+    user_id = await current_user_id(request)
+    # The stream runs in a task that copies this context
+    set_tool_caller(user_id)
+    conversation_id, history = await _load_conversation(request, payload, user_id)
+    new_messages = _new_messages(payload)
+
+    async def event_stream():
+        async with tracing.trace("http POST /ai/chat/auto/stream"):
+            turn = _StreamTurn(user_id, conversation_id, new_messages)
+            try:
+                if conversation_id is not None:
+                    yield sse.event_frame("conversation", {"conversation_id": conversation_id})
+                events = execute_with_tools_streaming(
+                    messages=history + new_messages,
+                    endpoint="chat.auto.stream",
+                    client_key=await client_key(request, "user"),
+                    transcript=turn.transcript,
+                )
+                # Closed here, not when garbage collected, so the executor is stopped before saving
+                async with aclosing(sse.encode_stream(turn.track(events))) as frames:
+                    async for frame in frames:
+                        yield frame
+            except Exception as exc:  # noqa: BLE001
+                turn.failed = True
+                yield sse.event_frame("error", str(exc))
+            finally:
+                await turn.save()
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket) -> None:
+    """Chat over one WebSocket, several conversations at once.
+    
+    The session cookie is checked once, when the socket opens; the socket
+    then carries any number of turns, ``AI_WS_MAX_CHATS`` of them at a time.
+    Every message is a JSON object. The client sends
+    
+        {"type": "chat", "id": "c1", "message": "Hi", "conversation_id": "5f0c..."}
+        {"type": "cancel", "id": "c1"}
+    
+    where a chat takes the fields of ``POST /ai/chat/auto/stream`` and ``id``
+    is the client's name for the turn. Replies carry that ``id``:
+    
+        {"id": "c1", "type": "conversation", "conversation_id": "5f0c..."}
+        {"id": "c1", "type": "delta", "text": "Hello, wor"}
+        {"id": "c1", "type": "tool", "kind": "tool_start", "tool_call_id": "call_1",
+         "name": "calculate", "ok": true}
+        {"id": "c1", "type": "finish", "reason": "stop"}
+        {"id": "c1", "type": "error", "detail": "Too many requests", "retry_after": 3}
+    
+    Turns run on the executor behind the HTTP endpoints, with the same
+    coalescing (see ``src/ai/sse.py``). A client that reads slowly pauses
+    its own turns. Cancelling a turn, or closing the socket, stops it like
+    a disconnected HTTP stream. ``"timings": true`` adds the turn's trace
+    summary to its finish message.
+    """
+    if not _origin_allowed(websocket):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    user_id = await current_user_id(websocket)
+    set_tool_caller(user_id)
+    await websocket.accept()
+    await _ChatSocket(websocket, user_id, await client_key(websocket, "user")).run()
+
+
 def _to_messages(entries: Iterable[MessageSchema]) -> list[dict[str, str]]:
     return [
         {
@@ -157,69 +285,449 @@ def _to_messages(entries: Iterable[MessageSchema]) -> list[dict[str, str]]:
     ]
 
 
+def _new_messages(payload: ChatRequest) -> list[dict[str, str]]:
+    messages = _to_messages(payload.messages)
+    if payload.message is not None:
+        messages.append({"role": "user", "content": payload.message})
+    return messages
+
+
+def _generated(
+    messages: list[dict[str, Any]], conversation: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """Messages the executor added after ``messages``.
+
+    The returned conversation starts with a system prompt the executor
+    prepended, unless the request brought its own or took the fast path.
+    """
+    start = len(messages) if conversation[:1] == messages[:1] else len(messages) + 1
+    return conversation[start:]
+
+
 # ---------------------------------------------------------------------------
-# Chat history helpers & routes
+# Client disconnects
+# ---------------------------------------------------------------------------
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    """Return once the client has gone away (the request body is already read).
+
+    Only for plain responses: a ``StreamingResponse`` listens for the
+    disconnect itself, and two readers of ``receive()`` would race for it.
+    """
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+# Turns being saved after their stream was cancelled
+_saving: set[asyncio.Task[None]] = set()
+
+
+class _StreamTurn:
+    """One turn of ``/ai/chat/auto/stream``, saved however its response ends.
+
+    When the client disconnects, Starlette cancels the response generator,
+    and keeps cancelling whatever it awaits. The executor runs in the pump
+    task of :func:`sse.coalesce`, outside that cancellation, so it can still
+    clean up (and let a write tool finish); :meth:`save` waits for it and
+    records the turn in a task of its own.
+    """
+
+    def __init__(
+        self,
+        user_id: int | None,
+        conversation_id: str | None,
+        new_messages: list[dict[str, Any]],
+    ) -> None:
+        self.user_id = user_id
+        self.conversation_id = conversation_id
+        self.new_messages = new_messages
+        self.transcript: list[dict[str, Any]] = []
+        self.failed = False
+        self._started = False
+        self._finished = False
+        self._closed = asyncio.get_running_loop().create_future()
+
+    async def track(self, events: AsyncGenerator[Any, None]) -> AsyncIterator[Any]:
+        """Pass the executor's events through, noting whether they ran to the end."""
+        self._started = True
+        try:
+            async with aclosing(events):
+                async for event in events:
+                    yield event
+            self._finished = True
+        finally:
+            _set_done(self._closed)
+
+    async def save(self) -> None:
+        task = asyncio.ensure_future(self._save())
+        _saving.add(task)
+        task.add_done_callback(_saving.discard)
+        # A cancelled response stops waiting here; the task carries on
+        await asyncio.shield(task)
+
+    async def _save(self) -> None:
+        if self._started:
+            # The executor has cleaned up and filled in the transcript
+            await self._closed
+        if self.failed:
+            return
+        if not self._finished:
+            get_metrics().incr("ai.cancel.requests")
+            tracing.annotate(**{"http.client_disconnected": True})
+        await _record_turn(self.user_id, self.conversation_id, self.new_messages + self.transcript)
+
+
+async def _cancel_on_disconnect(request: Request, work: Awaitable[T]) -> T:
+    """Await ``work``, cancelling it if the client disconnects first.
+
+    Nobody is left to read the answer, so the LLM call (and the tokens it
+    would be billed for) is aborted instead of finishing.
+
+    Raises:
+        HTTPException: 499 once ``work`` has been cancelled
+    """
+    task = asyncio.ensure_future(work)
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait((task, disconnected), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnected.cancel()
+        if not task.done():
+            task.cancel()
+            # Let the executor clean up, including a write tool it lets finish
+            await asyncio.wait((task,))
+    if task.cancelled():
+        get_metrics().incr("ai.cancel.requests")
+        tracing.annotate(**{"http.client_disconnected": True})
+        raise HTTPException(status_code=499, detail="Client closed request")
+    return task.result()
+
+
 # ---------------------------------------------------------------------------
+# WebSocket transport
+# ---------------------------------------------------------------------------
+
+
+def _origin_allowed(websocket: WebSocket) -> bool:
+    """Whether a browser handshake comes from one of ``CORS_ORIGINS``.
+
+    Browsers send cookies with cross-site WebSocket handshakes and CORS
+    doesn't apply to them, so the origin is checked here.
+    """
+    origin = websocket.headers.get("origin")
+    if origin is None:
+        return True
+    return origin.rstrip("/") in {str(allowed).rstrip("/") for allowed in settings.cors_origins}
 
 
-def _get_current_user_id(request: Request) -> int | None:
-    """Resolve current user id from session cookie if present and valid."""
-    cookie = request.cookies.get("kubo_session")
-    if not cookie:
-        return None
+def _set_done(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
 
-    # Lazy import to avoid circulars
-    from ..security import hash_token
 
-    token_h = hash_token(cookie)
+class _ChatSocket:
+    """The turns multiplexed over one ``/ai/ws`` connection."""
+
+    _open = 0
+
+    def __init__(self, websocket: WebSocket, user_id: int | None, client_key: str) -> None:
+        self.websocket = websocket
+        self.user_id = user_id
+        # Resolved once; every turn is scheduled and limited under it
+        self.client_key = client_key
+        # Running turns by id, each with the future that cancels it
+        self.turns: dict[str, asyncio.Future[None]] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._send_lock = asyncio.Lock()
+        self._closed = False
+
+    async def run(self) -> None:
+        metrics = get_metrics()
+        _ChatSocket._open += 1
+        metrics.set_gauge("ws.connections", _ChatSocket._open)
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                await self._handle(message.get("text") or message.get("bytes") or "")
+        finally:
+            self._closed = True
+            for cancel in self.turns.values():
+                _set_done(cancel)
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            _ChatSocket._open -= 1
+            metrics.set_gauge("ws.connections", _ChatSocket._open)
+
+    async def _handle(self, raw: str | bytes) -> None:
+        try:
+            frame = json.loads(raw)
+        except ValueError:
+            frame = None
+        if not isinstance(frame, dict):
+            await self._error(None, "Messages must be JSON objects")
+            return
+        turn_id = frame.get("id")
+        kind = frame.get("type")
+        if kind == "cancel":
+            cancel = self.turns.get(turn_id) if isinstance(turn_id, str) else None
+            if cancel is not None:
+                _set_done(cancel)
+            return
+        if kind != "chat":
+            await self._error(turn_id, f"Unknown message type {kind!r}")
+            return
+        if not isinstance(turn_id, str) or turn_id in self.turns:
+            await self._error(turn_id, "Each chat needs an id that no running chat uses")
+            return
+        if len(self.turns) >= settings.ai_ws_max_chats:
+            await self._error(turn_id, f"At most {settings.ai_ws_max_chats} chats can run at once")
+            return
+        try:
+            payload = ChatRequest.model_validate(frame)
+        except ValidationError as exc:
+            errors = exc.errors(include_url=False, include_context=False, include_input=False)
+            await self._error(turn_id, errors)
+            return
+        decision = await check_rate_limit(self.websocket, "ai.chat")
+        if not decision.allowed:
+            retry_after = max(1, math.ceil(decision.retry_after))
+            await self._error(turn_id, "Too many requests", retry_after=retry_after)
+            return
+
+        cancel = asyncio.get_running_loop().create_future()
+        self.turns[turn_id] = cancel
+        task = asyncio.create_task(self._turn(turn_id, payload, cancel))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        get_metrics().incr("ws.chats")
+
+    async def _turn(self, turn_id: str, payload: ChatRequest, cancel: asyncio.Future[None]) -> None:
+        try:
+            async with tracing.trace("ws chat", force=payload.timings) as trace:
+                try:
+                    conversation_id, history = await _load_conversation(
+                        self.websocket, payload, self.user_id
+                    )
+                except HTTPException as exc:
+                    await self._error(turn_id, exc.detail)
+                    return
+                new_messages = _new_messages(payload)
+                transcript: list[dict[str, Any]] = []
+                try:
+                    if conversation_id is not None:
+                        await self._send(
+                            {
+                                "id": turn_id,
+                                "type": "conversation",
+                                "conversation_id": conversation_id,
+                            }
+                        )
+                    async for kind, data in sse.coalesce(
+                        execute_with_tools_streaming(
+                            messages=history + new_messages,
+                            endpoint="chat.ws",
+                            client_key=self.client_key,
+                            transcript=transcript,
+                        ),
+                        cancel=cancel,
+                        metric_prefix="ws",
+                    ):
+                        if kind == "content":
+                            await self._send({"id": turn_id, "type": "delta", "text": data})
+                        elif kind == "tool":
+                            await self._send({"id": turn_id, "type": "tool", **asdict(data)})
+                        elif kind == "finish":
+                            finish: dict[str, Any] = {
+                                "id": turn_id, "type": "finish", "reason": data
+                            }
+                            if trace is not None and payload.timings:
+                                finish["timings"] = trace.summary(
+                                    detail=settings.tracing_timings_detail
+                                )
+                            await self._send(finish)
+                except SchedulerOverloadedError as exc:
+                    retry_after = max(1, math.ceil(exc.retry_after))
+                    await self._error(turn_id, str(exc), retry_after=retry_after)
+                except Exception as exc:  # noqa: BLE001
+                    await self._error(turn_id, str(exc))
+                else:
+                    if cancel.done():
+                        get_metrics().incr("ai.cancel.requests")
+                        tracing.annotate(**{"http.client_disconnected": True})
+                    await _record_turn(self.user_id, conversation_id, new_messages + transcript)
+        finally:
+            del self.turns[turn_id]
+
+    async def _send(self, frame: dict[str, Any]) -> None:
+        """Send one message; waits while the client isn't reading."""
+        if self._closed:
+            return
+        try:
+            # One writer at a time, so turns take turns at the socket
+            async with self._send_lock:
+                await self.websocket.send_text(sse.dumps(frame).decode("utf-8"))
+        except Exception:  # noqa: BLE001
+            # The client is gone: stop every turn rather than wait for receive() to notice
+            self._closed = True
+            for cancel in self.turns.values():
+                _set_done(cancel)
+
+    async def _error(self, turn_id: Any, detail: Any, *, retry_after: float | None = None) -> None:
+        frame: dict[str, Any] = {"id": turn_id, "type": "error", "detail": detail}
+        if retry_after is not None:
+            frame["retry_after"] = retry_after
+        await self._send(frame)
+
+
+# ---------------------------------------------------------------------------
+# Conversation state
+# ---------------------------------------------------------------------------
+
+
+async def _load_conversation(
+    request: HTTPConnection,
+    payload: ChatRequest,
+    user_id: int | None,
+) -> tuple[str | None, list[dict[str, Any]]]:
+    """Conversation id for this request and the history that precedes its messages.
+
+    Signed-in users without a ``conversation_id`` start a new conversation.
+    Anonymous users send the whole conversation every time.
+    """
+    if user_id is None:
+        if payload.conversation_id is not None:
+            raise HTTPException(status_code=401, detail="Sign in to continue a saved conversation")
+        return None, []
+    if payload.conversation_id is None:
+        return new_conversation_id(), []
+    conversation_id = str(payload.conversation_id)
     db_manager = request.app.state.db_manager
-    with db_manager.cursor() as cur:
-        cur.execute(
-            """
-            SELECT u.id
-            FROM sessions s
-            JOIN users u ON u.id = s.user_id
-            WHERE s.token_hash = %s AND s.revoked = FALSE AND s.expires_at > NOW()
-            """,
-            (token_h,),
+    history = await get_conversation_cache().history(db_manager, user_id, conversation_id)
+    return conversation_id, history
+
+
+async def _record_turn(
+    user_id: int | None, conversation_id: str | None, turn: list[dict[str, Any]]
+) -> None:
+    """Remember the turn's messages and queue them for the history store."""
+    if user_id is None or conversation_id is None or not turn:
+        return
+    get_conversation_cache().append(user_id, conversation_id, turn)
+    try:
+        row = history_row(user_id, conversation_id, turn)
+        await get_write_behind_queue().put(HISTORY_KIND, row)
+    except Exception:  # noqa: BLE001
+        # Don't fail the response if history persistence fails
+        logger.exception("Could not queue chat history")
+
+
+async def _record_usage(
+    user_id: int | None,
+    endpoint: str,
+    response: Any,
+    tool_calls: int,
+    started: float,
+) -> None:
+    try:
+        await get_write_behind_queue().put(
+            USAGE_KIND,
+            usage_row(
+                user_id=user_id,
+                endpoint=endpoint,
+                response=response,
+                tool_calls=tool_calls,
+                duration_seconds=time.perf_counter() - started,
+            ),
         )
-        row = cur.fetchone()
-        return int(row[0]) if row else None
+    except Exception:  # noqa: BLE001
+        logger.exception("Could not queue AI usage")
+
+
+# ---------------------------------------------------------------------------
+# Chat history helpers & routes
+# ---------------------------------------------------------------------------
 
 
 @router.get("/history")
-async def get_chat_history(request: Request) -> list[dict[str, Any]]:
-    """Return the latest saved conversation for the current user (if any)."""
-    user_id = _get_current_user_id(request)
+async def get_chat_history(
+    request: Request,
+    conversation_id: UUID | None = None,
+    before_seq: int | None = None,
+    limit: int | None = None,
+) -> list[dict[str, Any]]:
+    """Return the newest messages of a conversation (default: the latest one).
+
+    Page backwards with ``before_seq`` set to the first message's ``seq``.
+    """
+    user_id = await current_user_id(request)
     if user_id is None:
         return []
 
-    db_manager = request.app.state.db_manager
-    with db_manager.cursor() as cur:
-        cur.execute(
-            """
-            SELECT message_history
-            FROM chat_history
-            WHERE user_id = %s
-            ORDER BY created_at DESC
-            LIMIT 1
-            """,
-            (user_id,),
-        )
-        row = cur.fetchone()
-        if not row:
+    store = HistoryStore(request.app.state.db_manager)
+    if conversation_id is None:
+        latest = await asyncio.to_thread(store.list_conversations, user_id, limit=1)
+        if not latest:
             return []
-        # row[0] is already JSON (psycopg2 returns Python object for jsonb), but fallback to parse
-        history = row[0]
-        if isinstance(history, str):
-            import json as _json
-            try:
-                history = _json.loads(history)
-            except Exception:
-                history = []
-        return history if isinstance(history, list) else []
-
-
+        conversation_id = latest[0]["id"]
+    try:
+        page = await asyncio.to_thread(
+            store.read, user_id, str(conversation_id), before_seq=before_seq, limit=limit
+        )
+    except ConversationNotFoundError:
+        return []
+    return page.messages
 
 
+@router.get("/conversations")
+async def list_conversations(
+    request: Request,
+    before: UUID | None = None,
+    limit: int | None = None,
+) -> list[dict[str, Any]]:
+    """Return the current user's conversations, most recently updated first.
 
+    Page with ``before`` set to the last conversation's ``id``.
+    """
+    user_id = await current_user_id(request)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    store = HistoryStore(request.app.state.db_manager)
+    return await asyncio.to_thread(
+        store.list_conversations, user_id, before=str(before) if before else None, limit=limit
+    )
+
+
+@router.get("/conversations/{conversation_id}/messages")
+async def get_conversation_messages(
+    conversation_id: UUID,
+    request: Request,
+    after_seq: int | None = None,
+    before_seq: int | None = None,
+    limit: int | None = None,
+) -> dict[str, Any]:
+    """Return one page of a conversation, oldest message first.
+
+    ``after_seq`` pages forward from a message; otherwise the page holds the
+    newest messages before ``before_seq`` (or the end).
+    """
+    user_id = await current_user_id(request)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    store = HistoryStore(request.app.state.db_manager)
+    try:
+        page = await asyncio.to_thread(
+            store.read,
+            user_id,
+            str(conversation_id),
+            after_seq=after_seq,
+            before_seq=before_seq,
+            limit=limit,
+        )
+    except ConversationNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="Conversation not found") from exc
+    return page.to_dict()
@@ -1,18 +1,34 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from psycopg2 import errors
 
+from ..ratelimit import rate_limit
 from ..schemas import LoginIn, UserCreate, UserOut
-from ..security import generate_token, hash_password, hash_token, verify_password
+from ..security import (
+    dummy_password_hash,
+    generate_token,
+    hash_password_async,
+    hash_token,
+    password_needs_rehash,
+    verify_password_async,
+)
+from ..sessions import get_session_touch_buffer, set_session_cookie
 from ..settings import settings
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-@router.post("/register", response_model=UserOut, status_code=201)
+@router.post(
+    "/register",
+    response_model=UserOut,
+    status_code=201,
+    dependencies=[Depends(rate_limit("auth.register"))],
+)
 async def register(data: UserCreate, request: Request) -> UserOut:
     db_manager = request.app.state.db_manager
     with db_manager.cursor() as cur:
@@ -24,22 +40,27 @@ async def register(data: UserCreate, request: Request) -> UserOut:
         if row:
             raise HTTPException(status_code=400, detail="Email already registered")
 
-        hashed = hash_password(data.password)
-        cur.execute(
-            """
-            INSERT INTO users (email, full_name, hashed_password)
-            VALUES (%s, %s, %s)
-            RETURNING id, email, full_name, is_admin, is_active
-            """,
-            (data.email, data.full_name, hashed),
-        )
+    # Hash outside the cursor block so the pool connection isn't held for the KDF
+    hashed = await hash_password_async(data.password)
+    with db_manager.cursor() as cur:
+        try:
+            cur.execute(
+                """
+                INSERT INTO users (email, full_name, hashed_password)
+                VALUES (%s, %s, %s)
+                RETURNING id, email, full_name, is_admin, is_active
+                """,
+                (data.email, data.full_name, hashed),
+            )
+        except errors.UniqueViolation:
+            raise HTTPException(status_code=400, detail="Email already registered")
         u = cur.fetchone()
         return UserOut.model_validate(
             {"id": u[0], "email": u[1], "full_name": u[2], "is_admin": u[3], "is_active": u[4]}
         )
 
 
-@router.post("/login", response_model=UserOut)
+@router.post("/login", response_model=UserOut, dependencies=[Depends(rate_limit("auth.login"))])
 async def login(data: LoginIn, response: Response, request: Request) -> UserOut:
     db_manager = request.app.state.db_manager
     with db_manager.cursor() as cur:
@@ -48,20 +69,35 @@ async def login(data: LoginIn, response: Response, request: Request) -> UserOut:
             (data.email,),
         )
         row = cur.fetchone()
-        if not row:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
-        user = {
-            "id": row[0],
-            "email": row[1],
-            "full_name": row[2],
-            "hashed_password": row[3],
-            "is_admin": row[4],
-            "is_active": row[5],
-        }
+    if not row:
+        # Spend the same bcrypt time as a wrong password
+        await verify_password_async(data.password, await dummy_password_hash())
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+
+    user = {
+        "id": row[0],
+        "email": row[1],
+        "full_name": row[2],
+        "hashed_password": row[3],
+        "is_admin": row[4],
+        "is_active": row[5],
+    }
 
-        if not verify_password(data.password, user["hashed_password"]):
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if not await verify_password_async(data.password, user["hashed_password"]):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+
+    # Transparently upgrade plaintext or low-cost hashes now that we know the password
+    upgraded_hash = None
+    if password_needs_rehash(user["hashed_password"]):
+        upgraded_hash = await hash_password_async(data.password)
+
+    with db_manager.cursor() as cur:
+        if upgraded_hash is not None:
+            cur.execute(
+                "UPDATE users SET hashed_password = %s WHERE id = %s AND hashed_password = %s",
+                (upgraded_hash, user["id"], user["hashed_password"]),
+            )
 
         token = generate_token()
         token_h = hash_token(token)
@@ -80,15 +116,7 @@ async def login(data: LoginIn, response: Response, request: Request) -> UserOut:
             ),
         )
 
-    response.set_cookie(
-        key=settings.session_cookie_name,
-        value=token,
-        httponly=True,
-        secure=settings.cookie_secure,
-        samesite=settings.samesite,
-        max_age=settings.session_expire_minutes * 60,
-        path="/",
-    )
+    set_session_cookie(response, token)
     return UserOut.model_validate(
         {
             "id": user["id"],
@@ -108,12 +136,13 @@ async def logout(response: Response, request: Request) -> dict:
         db_manager = request.app.state.db_manager
         with db_manager.cursor() as cur:
             cur.execute("UPDATE sessions SET revoked = TRUE WHERE token_hash = %s", (token_h,))
+        get_session_touch_buffer().discard(token_h)
     response.delete_cookie(settings.session_cookie_name, path="/")
     return {"ok": True}
 
 
 @router.get("/me", response_model=UserOut)
-async def me(request: Request) -> UserOut:
+async def me(request: Request, response: Response) -> UserOut:
     cookie = request.cookies.get(settings.session_cookie_name)
     if not cookie:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
@@ -126,7 +155,7 @@ async def me(request: Request) -> UserOut:
             SELECT u.id, u.email, u.full_name, u.is_admin, u.is_active, s.expires_at, s.revoked
             FROM sessions s
             JOIN users u ON u.id = s.user_id
-            WHERE s.token_hash = %s
+            WHERE s.token_hash = %s AND s.revoked = FALSE
             """,
             (token_h,),
         )
@@ -138,15 +167,19 @@ async def me(request: Request) -> UserOut:
         if revoked or expires_at < datetime.now(timezone.utc):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session expired")
 
-        return UserOut.model_validate(
-            {
-                "id": row[0],
-                "email": row[1],
-                "full_name": row[2],
-                "is_admin": row[3],
-                "is_active": row[4],
-            }
-        )
+    if get_session_touch_buffer().touch(token_h, expires_at):
+        # The server-side expiry is being extended; keep the cookie alive with it
+        set_session_cookie(response, cookie)
+
+    return UserOut.model_validate(
+        {
+            "id": row[0],
+            "email": row[1],
+            "full_name": row[2],
+            "is_admin": row[3],
+            "is_active": row[4],
+        }
+    )
 
 
 @router.post("/seed", response_model=list[UserOut], status_code=201)
@@ -156,11 +189,12 @@ async def seed_users(request: Request) -> list[UserOut]:
         {"email": "guest@example.com", "full_name": "Guest User", "password": "GuestPass123", "is_admin": False},
     ]
 
+    hashes = await asyncio.gather(*(hash_password_async(sample["password"]) for sample in samples))
+
     db_manager = request.app.state.db_manager
     created: list[UserOut] = []
     with db_manager.cursor() as cur:
-        for sample in samples:
-            hashed = hash_password(sample["password"])
+        for sample, hashed in zip(samples, hashes):
             cur.execute(
                 """
                 INSERT INTO users (email, full_name, hashed_password, is_admin)
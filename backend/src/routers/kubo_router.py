@@ -6,6 +6,7 @@ from typing import Any
 from fastapi import APIRouter, HTTPException, Request, Response, status
 from psycopg2 import errors
 
+from ..ai.tools import invalidate_tool_cache
 from ..schemas import (
     BookingCreate,
     BookingOut,
@@ -15,6 +16,7 @@ from ..schemas import (
     PodOut,
     PodUpdate,
 )
+from ..sessions import current_user_id
 
 
 router = APIRouter(prefix="/kubo", tags=["kubo"])
@@ -101,6 +103,7 @@ async def create_pod(data: PodCreate, request: Request) -> PodOut:
         except errors.UniqueViolation:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Pod name already exists")
         row = cur.fetchone()
+    invalidate_tool_cache("pods")
     return _pod_from_row(row)
 
 
@@ -147,6 +150,7 @@ async def update_pod(pod_id: int, data: PodUpdate, request: Request) -> PodOut:
         row = cur.fetchone()
         if row is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pod not found")
+    invalidate_tool_cache("pods")
     return _pod_from_row(row)
 
 
@@ -158,6 +162,7 @@ async def delete_pod(pod_id: int, request: Request) -> Response:
         row = cur.fetchone()
         if row is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pod not found")
+    invalidate_tool_cache("pods", "bookings")
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -177,33 +182,9 @@ async def list_bookings(request: Request) -> list[BookingOut]:
     return [_booking_from_row(row) for row in rows]
 
 
-def _get_current_user_id(request: Request) -> int | None:
-    """Resolve current user id from session cookie if present and valid."""
-    cookie = request.cookies.get("kubo_session")
-    if not cookie:
-        return None
-
-    from ..security import hash_token
-
-    token_h = hash_token(cookie)
-    db_manager = request.app.state.db_manager
-    with db_manager.cursor() as cur:
-        cur.execute(
-            """
-            SELECT u.id
-            FROM sessions s
-            JOIN users u ON u.id = s.user_id
-            WHERE s.token_hash = %s AND s.revoked = FALSE AND s.expires_at > NOW()
-            """,
-            (token_h,),
-        )
-        row = cur.fetchone()
-        return int(row[0]) if row else None
-
-
 @router.get("/my/bookings", response_model=list[BookingOut])
 async def list_my_bookings(request: Request) -> list[BookingOut]:
-    user_id = _get_current_user_id(request)
+    user_id = await current_user_id(request)
     if user_id is None:
         return []
 
@@ -263,6 +244,7 @@ async def create_booking(data: BookingCreate, request: Request) -> BookingOut:
         except errors.UniqueViolation:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Booking already exists for this time window")
         row = cur.fetchone()
+    invalidate_tool_cache("bookings")
     return _booking_from_row(row)
 
 
@@ -306,6 +288,7 @@ async def update_booking(booking_id: int, data: BookingUpdate, request: Request)
         row = cur.fetchone()
         if row is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
+    invalidate_tool_cache("bookings")
     return _booking_from_row(row)
 
 
@@ -317,6 +300,7 @@ async def delete_booking(booking_id: int, request: Request) -> Response:
         row = cur.fetchone()
         if row is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
+    invalidate_tool_cache("bookings")
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -1,23 +1,106 @@
 from __future__ import annotations
 
+import asyncio
 import os
 
 import hashlib
 import hmac
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
+import bcrypt
 from fastapi import Depends, HTTPException, Request
 
 from .settings import settings
 
 
-def hash_password(password: str) -> str:
-    return password
+# bcrypt only looks at the first 72 bytes of a password
+_BCRYPT_MAX_BYTES = 72
+_BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_dummy_hash: Optional[str] = None
+
+
+def _get_hash_executor() -> ThreadPoolExecutor:
+    """Return the bounded pool used for KDF work.
+
+    bcrypt releases the GIL, so a small thread pool hashes in parallel while
+    the event loop keeps serving other requests.
+    """
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.password_hash_workers),
+            thread_name_prefix="kubo-pwhash",
+        )
+    return _hash_executor
+
+
+def shutdown_hash_executor() -> None:
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+
+def _password_bytes(password: str) -> bytes:
+    return password.encode("utf-8")[:_BCRYPT_MAX_BYTES]
+
+
+def _is_bcrypt_hash(stored: str) -> bool:
+    return stored.startswith(_BCRYPT_PREFIXES)
+
+
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
+    salt = bcrypt.gensalt(rounds=rounds or settings.password_hash_rounds)
+    return bcrypt.hashpw(_password_bytes(password), salt).decode("ascii")
 
 
 def verify_password(password: str, stored: str) -> bool:
-    return password == stored
+    if not stored:
+        return False
+    if _is_bcrypt_hash(stored):
+        try:
+            return bcrypt.checkpw(_password_bytes(password), stored.encode("ascii"))
+        except ValueError:
+            return False
+    # Legacy rows (seed data, pre-hashing accounts) hold the plain password
+    return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+
+
+def password_needs_rehash(stored: str) -> bool:
+    """True when ``stored`` is plaintext or hashed below the configured cost."""
+    if not _is_bcrypt_hash(stored):
+        return True
+    try:
+        rounds = int(stored.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds < settings.password_hash_rounds
+
+
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_hash_executor(), hash_password, password)
+
+
+async def verify_password_async(password: str, stored: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_hash_executor(), verify_password, password, stored)
+
+
+async def dummy_password_hash() -> str:
+    """A hash no password matches, at the configured cost.
+
+    Login verifies against it for unknown emails so they take as long as a
+    wrong password and don't reveal which accounts exist.
+    """
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await hash_password_async(generate_token())
+    return _dummy_hash
 
 
 def generate_token() -> str:
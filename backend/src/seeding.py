@@ -0,0 +1,288 @@
+"""Deterministic synthetic data for load testing.
+
+Every generator streams pre-formatted ``COPY ... FROM STDIN`` text lines, so
+millions of rows are loaded without materialising them in Python. The same
+``seed`` always produces the same data.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Iterator, Sequence
+
+from .security import hash_password
+
+
+LOAD_TEST_PASSWORD = "LoadTest123"
+
+_FIRST_NAMES = (
+    "Ava", "Ben", "Chloe", "Diego", "Emma", "Farah", "Gus", "Hana", "Ivan", "Jia",
+    "Kofi", "Lena", "Mateo", "Nia", "Omar", "Priya", "Quinn", "Rosa", "Sami", "Tara",
+)
+_LAST_NAMES = (
+    "Almeida", "Brooks", "Chen", "Dubois", "Eze", "Fischer", "Garcia", "Haddad", "Ito",
+    "Jensen", "Kumar", "Lopez", "Moreau", "Nakamura", "Okafor", "Petrov", "Rossi", "Schmidt",
+    "Tanaka", "Wong",
+)
+_POD_ADJECTIVES = (
+    "Quiet", "Sunny", "Compact", "Panoramic", "Acoustic", "Cozy", "Executive", "Studio",
+)
+_POD_NOUNS = ("Nook", "Suite", "Capsule", "Hub", "Den", "Cove", "Loft", "Lounge")
+
+# Relative demand per starting hour (UTC); bookings cluster mid-morning and mid-afternoon
+_HOUR_WEIGHTS = {
+    7: 0.2, 8: 0.5, 9: 0.9, 10: 1.0, 11: 0.8, 12: 0.4, 13: 0.6,
+    14: 0.9, 15: 1.0, 16: 0.7, 17: 0.5, 18: 0.3, 19: 0.2, 20: 0.1, 21: 0.05,
+}
+_DURATIONS = (1, 1, 1, 1, 1, 1, 2, 2, 2, 3)
+_STATUSES = ("confirmed",) * 17 + ("pending",) * 2 + ("cancelled",)
+
+_CHAT_OPENERS = (
+    "What pods do you have?",
+    "How much is {pod}?",
+    "Is {pod} free tomorrow at 10?",
+    "Book {pod} for Friday 2-4pm",
+    "Show my bookings",
+    "Cancel booking {booking}",
+    "What's the capacity of {pod}?",
+)
+
+
+def copy_escape(value: Any) -> str:
+    """Render one value for the ``COPY`` text format."""
+    if value is None:
+        return r"\N"
+    text = str(value)
+    if "\\" in text or "\t" in text or "\n" in text or "\r" in text:
+        text = (
+            text.replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+        )
+    return text
+
+
+class CopyStream:
+    """File-like adapter feeding an iterator of lines to ``cursor.copy_expert``."""
+
+    def __init__(self, lines: Iterable[str], batch_size: int = 2048) -> None:
+        self._lines = iter(lines)
+        self._batch_size = batch_size
+        self._buffer = ""
+        self.rows = 0
+
+    def _fill(self) -> bool:
+        batch: list[str] = []
+        for line in self._lines:
+            batch.append(line)
+            if len(batch) >= self._batch_size:
+                break
+        if not batch:
+            return False
+        self.rows += len(batch)
+        self._buffer += "".join(batch)
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while (size < 0 or len(self._buffer) < size) and self._fill():
+            pass
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def copy_lines(cur: Any, table: str, columns: Sequence[str], lines: Iterable[str]) -> int:
+    """Stream ``lines`` into ``table`` with ``COPY``; returns rows loaded."""
+    stream = CopyStream(lines)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", stream, size=1 << 16)
+    return stream.rows
+
+
+def _zipf_weights(n: int, exponent: float = 0.8) -> list[float]:
+    weights = [1.0 / (rank + 1) ** exponent for rank in range(n)]
+    top = weights[0] if weights else 1.0
+    return [weight / top for weight in weights]
+
+
+USER_COLUMNS = (
+    "id", "email", "full_name", "hashed_password", "is_active", "is_admin", "created_at",
+)
+
+
+def generate_users(count: int, *, first_id: int, seed: int, now: datetime) -> Iterator[str]:
+    rng = random.Random(seed)
+    # One shared hash: bcrypt'ing millions of rows would dominate the load time
+    hashed = hash_password(LOAD_TEST_PASSWORD)
+    for offset in range(count):
+        user_id = first_id + offset
+        full_name = f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+        created = now - timedelta(seconds=rng.randrange(2 * 365 * 86400))
+        yield (
+            f"{user_id}\tload{user_id}@load.kubo.test\t{full_name}\t{hashed}\tt\tf\t"
+            f"{created.isoformat()}\n"
+        )
+
+
+POD_COLUMNS = ("id", "name", "description", "capacity", "price_cents", "is_active")
+
+
+def generate_pods(count: int, *, first_id: int, seed: int) -> Iterator[str]:
+    rng = random.Random(seed + 1)
+    for offset in range(count):
+        pod_id = first_id + offset
+        name = f"{rng.choice(_POD_ADJECTIVES)} {rng.choice(_POD_NOUNS)} {pod_id}"
+        capacity = rng.choice((1, 1, 1, 2, 2, 3, 4, 6))
+        price = 5000 + capacity * 1500 + rng.randrange(0, 5000, 100)
+        furniture = rng.choice(("desk", "sofa", "whiteboard", "screen"))
+        description = f"{capacity}-person {name.split()[1].lower()} with {furniture}."
+        active = "t" if rng.random() > 0.03 else "f"
+        yield f"{pod_id}\t{name}\t{description}\t{capacity}\t{price}\t{active}\n"
+
+
+BOOKING_COLUMNS = (
+    "id", "user_id", "pod_id", "start_time", "end_time", "status", "total_price_cents",
+)
+
+
+def generate_bookings(
+    count: int,
+    *,
+    first_id: int,
+    seed: int,
+    pods: Sequence[tuple[int, int]],
+    user_ids: Sequence[int],
+    start: datetime,
+) -> Iterator[str]:
+    """Non-overlapping bookings, day by day, until ``count`` rows are produced.
+
+    ``pods`` holds ``(pod_id, price_cents)``. Demand per pod follows a Zipf
+    curve and per hour the ``_HOUR_WEIGHTS`` profile; user activity is skewed
+    so a minority of users hold most bookings.
+    """
+    if not pods or not user_ids or count <= 0:
+        return
+    rng = random.Random(seed + 2)
+    pod_order = list(pods)
+    rng.shuffle(pod_order)
+    # Busiest pod is ~70% occupied at peak, the long tail much less
+    demand = [0.05 + 0.65 * weight for weight in _zipf_weights(len(pod_order))]
+    n_users = len(user_ids)
+
+    booking_id = first_id
+    produced = 0
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while True:
+        day_prefix = day.strftime("%Y-%m-%d")
+        for (pod_id, price), pod_demand in zip(pod_order, demand):
+            hour = 7
+            while hour < 22:
+                if rng.random() < pod_demand * _HOUR_WEIGHTS[hour]:
+                    duration = min(rng.choice(_DURATIONS), 22 - hour)
+                    user_id = user_ids[int(n_users * rng.random() ** 3)]
+                    yield (
+                        f"{booking_id}\t{user_id}\t{pod_id}\t"
+                        f"{day_prefix} {hour:02d}:00:00+00\t"
+                        f"{day_prefix} {hour + duration:02d}:00:00+00\t"
+                        f"{rng.choice(_STATUSES)}\t{price * duration}\n"
+                    )
+                    booking_id += 1
+                    produced += 1
+                    if produced >= count:
+                        return
+                    hour += duration
+                else:
+                    hour += 1
+        day += timedelta(days=1)
+
+
+CONVERSATION_COLUMNS = ("id", "user_id", "message_count", "created_at", "updated_at")
+
+# What list_available_pods returns for an empty page
+_EMPTY_POD_TABLE = json.dumps(
+    {"columns": ["id", "name", "capacity", "price_cents"], "rows": [], "next_cursor": None},
+    separators=(",", ":"),
+)
+CHAT_MESSAGE_COLUMNS = ("conversation_id", "seq", "message", "created_at")
+
+
+def _chats(
+    count: int,
+    *,
+    seed: int,
+    user_ids: Sequence[int],
+    pod_names: Sequence[str],
+    now: datetime,
+) -> Iterator[tuple[uuid.UUID, int, datetime, list[dict[str, Any]]]]:
+    if not user_ids or count <= 0:
+        return
+    rng = random.Random(seed + 3)
+    pod_names = pod_names or ("Focus Hub",)
+    n_users = len(user_ids)
+    for _ in range(count):
+        conversation_id = uuid.UUID(int=rng.getrandbits(128), version=4)
+        messages: list[dict[str, Any]] = []
+        for _turn in range(rng.choice((1, 1, 2, 2, 3, 4, 6))):
+            question = rng.choice(_CHAT_OPENERS).format(
+                pod=rng.choice(pod_names), booking=rng.randrange(1, 10_000)
+            )
+            messages.append({"role": "user", "content": question})
+            if rng.random() < 0.6:
+                call_id = f"call_{rng.getrandbits(48):012x}"
+                messages.append({
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [{
+                        "id": call_id,
+                        "type": "function",
+                        "function": {"name": "list_available_pods", "arguments": "{}"},
+                    }],
+                })
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": call_id,
+                    "name": "list_available_pods",
+                    "content": _EMPTY_POD_TABLE,
+                })
+            answer = f"Here is what I found about: {question}"
+            messages.append({"role": "assistant", "content": answer})
+        created = now - timedelta(seconds=rng.randrange(90 * 86400))
+        user_id = user_ids[int(n_users * rng.random() ** 2)]
+        yield conversation_id, user_id, created, messages
+
+
+def generate_conversations(
+    count: int,
+    *,
+    seed: int,
+    user_ids: Sequence[int],
+    pod_names: Sequence[str],
+    now: datetime,
+) -> Iterator[str]:
+    for conversation_id, user_id, created, messages in _chats(
+        count, seed=seed, user_ids=user_ids, pod_names=pod_names, now=now
+    ):
+        stamp = created.isoformat()
+        yield f"{conversation_id}\t{user_id}\t{len(messages)}\t{stamp}\t{stamp}\n"
+
+
+def generate_chat_messages(
+    count: int,
+    *,
+    seed: int,
+    user_ids: Sequence[int],
+    pod_names: Sequence[str],
+    now: datetime,
+) -> Iterator[str]:
+    """Messages of the conversations ``generate_conversations`` yields for the same arguments."""
+    for conversation_id, _user_id, created, messages in _chats(
+        count, seed=seed, user_ids=user_ids, pod_names=pod_names, now=now
+    ):
+        stamp = created.isoformat()
+        for seq, message in enumerate(messages, start=1):
+            payload = copy_escape(json.dumps(message, separators=(",", ":")))
+            yield f"{conversation_id}\t{seq}\t{payload}\t{stamp}\n"
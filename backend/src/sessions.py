@@ -0,0 +1,284 @@
+"""Background maintenance for the ``sessions`` table, and session lookup."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from psycopg2.extras import execute_values
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .db import DatabaseManager
+from .metrics import get_metrics
+from .settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class SessionGarbageCollector:
+    """Deletes expired and revoked sessions in small batches.
+
+    Each batch is its own short transaction and uses ``FOR UPDATE SKIP LOCKED``
+    so several workers can collect concurrently without blocking each other or
+    the rows a login/logout is touching.
+    """
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        *,
+        batch_size: int | None = None,
+        interval_seconds: float | None = None,
+    ) -> None:
+        self.db_manager = db_manager
+        self.batch_size = batch_size or settings.session_gc_batch_size
+        self.interval_seconds = interval_seconds or settings.session_gc_interval_seconds
+
+    def _delete_batch(self) -> int:
+        with self.db_manager.cursor() as cur:
+            cur.execute(
+                """
+                DELETE FROM sessions
+                WHERE id IN (
+                    SELECT id
+                    FROM sessions
+                    WHERE revoked = TRUE OR expires_at < NOW()
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                """,
+                (self.batch_size,),
+            )
+            return cur.rowcount
+
+    async def collect_once(self) -> int:
+        """Run one GC pass, returning the number of rows reclaimed."""
+        metrics = get_metrics()
+        started = time.perf_counter()
+        reclaimed = 0
+        try:
+            while True:
+                deleted = await asyncio.to_thread(self._delete_batch)
+                reclaimed += deleted
+                if deleted < self.batch_size:
+                    break
+                # Yield between batches so the pool isn't monopolised
+                await asyncio.sleep(0)
+        finally:
+            metrics.incr("session_gc.runs")
+            metrics.incr("session_gc.rows_reclaimed", reclaimed)
+            metrics.observe("session_gc.duration_seconds", time.perf_counter() - started)
+        return reclaimed
+
+    async def run(self) -> None:
+        """Collect forever, sleeping ``interval_seconds`` between passes."""
+        while True:
+            try:
+                await self.collect_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001
+                get_metrics().incr("session_gc.errors")
+                logger.exception("Session GC pass failed")
+            await asyncio.sleep(self.interval_seconds)
+
+
+class SessionTouchBuffer:
+    """Coalesces per-request session activity into periodic batched writes.
+
+    Requests only record ``last_seen`` in memory. Every ``flush_interval_seconds``
+    the pending entries are written with a single ``UPDATE ... FROM (VALUES ...)``,
+    and ``expires_at`` is pushed forward only for sessions whose remaining
+    lifetime dropped below ``session_refresh_threshold_minutes``.
+    """
+
+    def __init__(self, *, flush_interval_seconds: float | None = None) -> None:
+        self.flush_interval_seconds = flush_interval_seconds or settings.session_touch_flush_seconds
+        self._lock = threading.Lock()
+        # token_hash -> (last_seen, new expires_at or None)
+        self._pending: dict[str, tuple[datetime, datetime | None]] = {}
+
+    @staticmethod
+    def needs_extension(expires_at: datetime, now: datetime | None = None) -> bool:
+        now = now or datetime.now(timezone.utc)
+        return expires_at - now < timedelta(minutes=settings.session_refresh_threshold_minutes)
+
+    def touch(self, token_hash: str, expires_at: datetime) -> bool:
+        """Record activity for a session; returns True if its expiry will be extended."""
+        now = datetime.now(timezone.utc)
+        new_expiry = None
+        if self.needs_extension(expires_at, now):
+            new_expiry = now + timedelta(minutes=settings.session_expire_minutes)
+        with self._lock:
+            previous = self._pending.get(token_hash)
+            if new_expiry is None and previous is not None:
+                new_expiry = previous[1]
+            self._pending[token_hash] = (now, new_expiry)
+        return new_expiry is not None
+
+    def discard(self, token_hash: str) -> None:
+        with self._lock:
+            self._pending.pop(token_hash, None)
+
+    def _drain(self) -> list[tuple[str, datetime, datetime | None]]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return [(token_hash, seen, expiry) for token_hash, (seen, expiry) in pending.items()]
+
+    @staticmethod
+    def _write(
+        db_manager: DatabaseManager, rows: list[tuple[str, datetime, datetime | None]]
+    ) -> int:
+        with db_manager.cursor() as cur:
+            execute_values(
+                cur,
+                """
+                UPDATE sessions AS s
+                SET last_seen_at = GREATEST(COALESCE(s.last_seen_at, v.last_seen), v.last_seen),
+                    expires_at = GREATEST(s.expires_at, COALESCE(v.new_expires_at, s.expires_at))
+                FROM (VALUES %s) AS v(token_hash, last_seen, new_expires_at)
+                WHERE s.token_hash = v.token_hash AND s.revoked = FALSE
+                """,
+                rows,
+                template="(%s, %s::timestamptz, %s::timestamptz)",
+                page_size=max(1, len(rows)),
+            )
+            return cur.rowcount
+
+    async def flush(self, db_manager: DatabaseManager) -> int:
+        """Write all pending touches in one statement; returns rows updated."""
+        rows = self._drain()
+        if not rows:
+            return 0
+        metrics = get_metrics()
+        started = time.perf_counter()
+        try:
+            updated = await asyncio.to_thread(self._write, db_manager, rows)
+        except Exception:
+            # Put the entries back (newer touches win) so a DB blip doesn't lose activity
+            with self._lock:
+                for token_hash, seen, expiry in rows:
+                    self._pending.setdefault(token_hash, (seen, expiry))
+            raise
+        metrics.incr("session_touch.flushes")
+        metrics.incr("session_touch.rows_written", updated)
+        metrics.incr("session_touch.extended", sum(1 for row in rows if row[2] is not None))
+        metrics.observe("session_touch.flush_seconds", time.perf_counter() - started)
+        return updated
+
+    async def run(self, db_manager: DatabaseManager) -> None:
+        """Flush forever every ``flush_interval_seconds``."""
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                await self.flush(db_manager)
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001
+                get_metrics().incr("session_touch.errors")
+                logger.exception("Session touch flush failed")
+
+
+_touch_buffer: SessionTouchBuffer | None = None
+
+
+def get_session_touch_buffer() -> SessionTouchBuffer:
+    """Get the per-worker session touch buffer."""
+    global _touch_buffer
+    if _touch_buffer is None:
+        _touch_buffer = SessionTouchBuffer()
+    return _touch_buffer
+
+
+def set_session_cookie(response: Response, token: str) -> None:
+    response.set_cookie(
+        key=settings.session_cookie_name,
+        value=token,
+        httponly=True,
+        secure=settings.cookie_secure,
+        samesite=settings.samesite,
+        max_age=settings.session_expire_minutes * 60,
+        path="/",
+    )
+
+
+def session_user_id(db_manager: DatabaseManager, cookie: str) -> tuple[int, bool] | None:
+    """Look up a session cookie and mark the session as used.
+
+    Returns the user id of a valid, unexpired session and whether its expiry
+    is being extended, or None.
+    """
+    # Lazy import to avoid circulars
+    from .security import hash_token
+
+    token_h = hash_token(cookie)
+    with db_manager.cursor() as cur:
+        cur.execute(
+            """
+            SELECT u.id, s.expires_at
+            FROM sessions s
+            JOIN users u ON u.id = s.user_id
+            WHERE s.token_hash = %s AND s.revoked = FALSE AND s.expires_at > NOW()
+            """,
+            (token_h,),
+        )
+        row = cur.fetchone()
+    if not row:
+        return None
+    extended = get_session_touch_buffer().touch(token_h, row[1])
+    return int(row[0]), extended
+
+
+async def current_user_id(connection: HTTPConnection) -> int | None:
+    """Signed-in user of a request or WebSocket, looked up once per connection.
+
+    The rate limiter and the route share the result through ``connection.state``.
+    When the lookup extends the session, :class:`SessionCookieMiddleware`
+    re-issues the cookie on the response.
+    """
+    state = connection.state
+    if not hasattr(state, "user_id"):
+        cookie = connection.cookies.get(settings.session_cookie_name)
+        found = None
+        if cookie:
+            db_manager = connection.app.state.db_manager
+            found = await asyncio.to_thread(session_user_id, db_manager, cookie)
+        state.user_id = found[0] if found else None
+        state.session_extended = bool(found and found[1])
+    return state.user_id
+
+
+class SessionCookieMiddleware:
+    """Re-issues the session cookie on responses to requests that extended the session.
+
+    The touch buffer slides the expiry on the server for any authenticated
+    request; without a fresh cookie the browser would still drop it after
+    the original ``max_age``.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            extended = scope.get("state", {}).get("session_extended")
+            if message["type"] == "http.response.start" and extended:
+                token = HTTPConnection(scope).cookies.get(settings.session_cookie_name)
+                if token:
+                    cookie = Response()
+                    set_session_cookie(cookie, token)
+                    MutableHeaders(scope=message).append("set-cookie", cookie.headers["set-cookie"])
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -24,15 +24,87 @@ class Settings(BaseSettings):
 
     secret_key: str = "change-me"
     password_scheme: str = "bcrypt"
+    password_hash_rounds: int = 12  # bcrypt work factor (log2 iterations)
+    password_hash_workers: int = 4  # threads reserved for hashing off the event loop
 
     session_cookie_name: str = "kubo_session"
-    session_expire_minutes: int = 60 * 24 * 30  # 30 days
+    session_expire_minutes: int = 60 * 24  # sliding lifetime, extended while the session is in use
+    session_refresh_threshold_minutes: int = 60 * 12  # extend once less than this remains
+    session_touch_flush_seconds: float = 5.0
+    session_gc_interval_seconds: int = 300
+    session_gc_batch_size: int = 500
     cookie_secure: bool = False
     samesite: str = "lax"  # lax | none | strict
 
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"  # memory | postgres (shared across workers)
+
+    chat_history_page_size: int = 100  # messages per /ai/history page
+    chat_history_page_size_max: int = 500
+    write_behind_flush_ms: int = 200  # history/telemetry batches are written at least this often
+    write_behind_batch_rows: int = 500  # ...or as soon as this many rows are queued
+    write_behind_max_rows: int = 10_000  # queue bound; callers wait for room once it is full
+    write_behind_put_timeout_seconds: float = 0.5  # then spill the row instead of waiting longer
+    # Rows are kept here while Postgres is down; each worker adds its pid
+    write_behind_spill_path: str | None = "write_behind.spill.jsonl"
+    tracing_enabled: bool = False  # record LLM/tool/DB spans per request and export them
+    tracing_sample_rate: float = 1.0  # share of traces exported
+    tracing_export_path: str | None = "traces.otlp.jsonl"  # OTLP/JSON, one trace per line
+    # "timings" responses include span attributes (SQL, models, tool arguments); debugging only
+    tracing_timings_detail: bool = False
+
     cors_origins: List[AnyHttpUrl] | List[str] = Field(default_factory=lambda: ["http://localhost:3000"])
 
     cerebras_api_key: str | None = None
+    # e.g. benchmarks/fake_llm_server.py; defaults to the SDK's endpoint
+    cerebras_base_url: str | None = None
+    ai_tool_timeout_seconds: float = 10.0
+    ai_tool_concurrency: int = 4  # tool threads per worker, at most the tools' 5 pool connections
+    ai_tool_cache_size: int = 1024  # cached read-only tool results per worker
+    # Where cached tool results and answers check for writes: postgres sees
+    # every worker's writes; memory only this worker's (single worker only)
+    ai_data_versions_backend: str = "postgres"
+    ai_request_budget_seconds: float = 60.0  # whole /ai/chat request, all LLM turns and tools
+    ai_llm_timeout_seconds: float = 30.0  # one LLM call including retries, when no budget is passed
+    ai_llm_attempt_timeout_seconds: float = 20.0  # one attempt
+    ai_llm_max_retries: int = 2
+    ai_llm_retry_base_seconds: float = 0.25
+    ai_llm_retry_max_seconds: float = 4.0
+    ai_llm_hedge_enabled: bool = True
+    ai_llm_hedge_percentile: float = 0.95  # hedge attempts slower than this latency percentile
+    ai_llm_hedge_min_seconds: float = 0.5
+    ai_llm_breaker_failures: int = 5  # consecutive failures that open a model's circuit
+    ai_llm_breaker_reset_seconds: float = 30.0
+    web_concurrency: int = 1  # worker processes; per-worker shares of global limits divide by this
+    ai_scheduler_enabled: bool = True
+    ai_llm_max_in_flight: int = 16  # LLM calls per worker, streams included
+    ai_llm_global_max_in_flight: int | None = None  # across all workers; split by WEB_CONCURRENCY
+    ai_scheduler_quantum_tokens: int = 4000  # deficit round robin quantum, in prompt tokens
+    ai_scheduler_batch_every: int = 4  # every Nth free slot goes to batch work if any is waiting
+    ai_model_routing_enabled: bool = True  # route turns across models; off = the client's model
+    ai_model_policy: str = "adaptive"  # adaptive, fast or quality (see src/ai/routing.py)
+    # endpoint -> policy name or model id, e.g. {"chat.auto": "quality"}
+    ai_model_routes: dict[str, str] = {}
+    ai_fast_path_enabled: bool = True  # answer simple requests without the LLM
+    ai_tool_selection_enabled: bool = True  # offer only the tools a turn needs
+    ai_tool_page_size: int = 20  # default rows per page for list tools
+    ai_tool_page_size_max: int = 100
+    ai_tool_result_max_chars: int = 4000  # larger results are truncated with a notice
+    ai_response_cache_enabled: bool = True
+    ai_response_cache_size: int = 512
+    ai_response_cache_ttl_seconds: float = 600.0
+    ai_response_cache_path: str | None = None  # SQLite file for a restart-surviving tier
+    ai_response_cache_disk_size: int = 10_000
+    ai_context_budget_tokens: int = 16_000  # prompt cap, lowered to fit the model's window
+    ai_context_recent_messages: int = 8  # always kept verbatim
+    ai_context_tool_result_tokens: int = 400  # older tool results are compacted to this size
+    ai_context_summary_tokens: int = 600
+    ai_conversation_cache_size: int = 1000  # conversations whose recent messages each worker keeps
+    ai_conversation_max_messages: int = 100  # recent messages kept (and loaded) per conversation
+    ai_sse_coalesce_ms: float = 25.0  # streamed tokens arriving this close together share a frame
+    ai_sse_coalesce_chars: int = 512  # ...up to this much text
+    ai_sse_heartbeat_seconds: float = 15.0  # comment frame on idle streams keeps proxies open
+    ai_ws_max_chats: int = 4  # chats streaming at once on one /ai/ws socket
 
     @field_validator("cors_origins", mode="before")
     @classmethod
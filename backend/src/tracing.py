@@ -0,0 +1,312 @@
+"""Per-request tracing.
+
+A trace follows one request through the tool-calling loop. It has a span for
+each LLM call (model, tokens, latency, time to first token), each tool
+execution (name, argument and result sizes, latency, cache hit) and each
+database statement, all under the request's trace id.
+
+The current trace and span live in a context variable. ``asyncio.to_thread``
+and new tasks copy it, so a query run by a tool in a worker thread is a
+child of that tool's span. Without a current trace, :func:`span` costs one
+context-variable lookup.
+
+Routers open a trace when ``TRACING_ENABLED`` is set, or when the caller asks
+for a timing summary. Finished traces are sampled by ``TRACING_SAMPLE_RATE``
+and appended to ``TRACING_EXPORT_PATH`` through the write-behind queue. Each
+trace is one line of OTLP/JSON (an ``ExportTraceServiceRequest``, the format
+of the OpenTelemetry Collector's file exporter), so the file can be loaded
+into any OTLP-compatible backend.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterator
+
+from .metrics import get_metrics
+from .settings import settings
+
+if TYPE_CHECKING:
+    from .db import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Write-behind kind for exported traces
+TRACE_KIND = "traces"
+
+# OTLP span kinds by span-name prefix; the root is SERVER, anything else INTERNAL
+_SPAN_KINDS = {"llm": 3, "db": 3}
+
+_current: contextvars.ContextVar[tuple["Trace", "Span"] | None] = contextvars.ContextVar(
+    "kubo_trace", default=None
+)
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = (
+        "trace",
+        "name",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "error",
+        "start_ns",
+        "_started",
+        "_duration_ns",
+    )
+
+    def __init__(
+        self, trace: Trace, name: str, parent_id: str | None, attributes: dict[str, Any]
+    ) -> None:
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.error: str | None = None
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter_ns()
+        self._duration_ns: int | None = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def fail(self, exc: BaseException) -> None:
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def end(self) -> None:
+        if self._duration_ns is None:
+            self._duration_ns = time.perf_counter_ns() - self._started
+
+    @property
+    def duration_ns(self) -> int:
+        """Duration so far if the span is still open."""
+        if self._duration_ns is None:
+            return time.perf_counter_ns() - self._started
+        return self._duration_ns
+
+
+class _NoopSpan:
+    """Stands in for a span when no trace is being recorded."""
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def fail(self, exc: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """Spans of one request, rooted at a span named after the request."""
+
+    def __init__(self, name: str, attributes: dict[str, Any] | None = None) -> None:
+        self.trace_id = os.urandom(16).hex()
+        self.spans: list[Span] = []
+        self.root = self.start_span(name, None, dict(attributes or {}))
+
+    def start_span(self, name: str, parent_id: str | None, attributes: dict[str, Any]) -> Span:
+        span = Span(self, name, parent_id, attributes)
+        # list.append is atomic, so spans may start in worker threads
+        self.spans.append(span)
+        return span
+
+    def summary(self, detail: bool = False) -> dict[str, Any]:
+        """Time per stage (``llm``, ``tool``, ``db``) and every span, in milliseconds.
+
+        Stage totals add up span durations, so concurrent tools and queries
+        inside tools can make them exceed the request's wall time. Span
+        attributes, such as the SQL of a query, are only included with
+        ``detail``.
+        """
+        stages: dict[str, dict[str, float]] = {}
+        spans = []
+        for span in self.spans[1:]:
+            stage = stages.setdefault(span.name.split(".", 1)[0], {"count": 0, "ms": 0.0})
+            stage["count"] += 1
+            stage["ms"] += span.duration_ns / 1e6
+            spans.append(
+                {
+                    "name": span.name,
+                    "start_ms": round((span.start_ns - self.root.start_ns) / 1e6, 2),
+                    "ms": round(span.duration_ns / 1e6, 2),
+                    **({"error": span.error} if span.error else {}),
+                    **(span.attributes if detail else {}),
+                }
+            )
+        for stage in stages.values():
+            stage["ms"] = round(stage["ms"], 2)
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round(self.root.duration_ns / 1e6, 2),
+            "stages": stages,
+            "spans": spans,
+        }
+
+    def to_otlp(self) -> dict[str, Any]:
+        """The trace as an OTLP/JSON ``ExportTraceServiceRequest``."""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otlp_attributes({"service.name": settings.app_name})
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [self._otlp_span(span) for span in self.spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def _otlp_span(self, span: Span) -> dict[str, Any]:
+        otlp: dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 2 if span.parent_id is None else _SPAN_KINDS.get(span.name.split(".", 1)[0], 1),
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.start_ns + span.duration_ns),
+            "attributes": _otlp_attributes(span.attributes),
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+        }
+        if span.parent_id is not None:
+            otlp["parentSpanId"] = span.parent_id
+        return otlp
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    encoded = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            encoded_value: dict[str, Any] = {"boolValue": value}
+        elif isinstance(value, int):
+            encoded_value = {"intValue": str(value)}
+        elif isinstance(value, float):
+            encoded_value = {"doubleValue": value}
+        else:
+            encoded_value = {"stringValue": str(value)}
+        encoded.append({"key": key, "value": encoded_value})
+    return encoded
+
+
+def current_trace() -> Trace | None:
+    current = _current.get()
+    return current[0] if current is not None else None
+
+
+@asynccontextmanager
+async def trace(
+    name: str, *, force: bool = False, **attributes: Any
+) -> AsyncIterator[Trace | None]:
+    """Record a trace for the request handled inside the block.
+
+    Yields None, and records nothing, unless ``TRACING_ENABLED`` or ``force``
+    (the caller wants the summary). On exit the trace is queued for export.
+    """
+    if not (settings.tracing_enabled or force):
+        yield None
+        return
+    current = Trace(name, attributes)
+    token = _current.set((current, current.root))
+    try:
+        yield current
+    except Exception as exc:
+        current.root.fail(exc)
+        raise
+    finally:
+        current.root.end()
+        try:
+            _current.reset(token)
+        except ValueError:
+            # A streaming body can be closed from another context
+            _current.set(None)
+        await _export(current)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | _NoopSpan]:
+    """Time the block as a child of the current span.
+
+    The span is current inside the block, so don't hold it open across a
+    ``yield`` of an async generator; use :func:`start_span` there.
+    """
+    current = _current.get()
+    if current is None:
+        yield NOOP_SPAN
+        return
+    trace_, parent = current
+    child = trace_.start_span(name, parent.span_id, attributes)
+    token = _current.set((trace_, child))
+    try:
+        yield child
+    except Exception as exc:
+        child.fail(exc)
+        raise
+    finally:
+        child.end()
+        _current.reset(token)
+
+
+def start_span(name: str, **attributes: Any) -> Span | _NoopSpan:
+    """Start a child of the current span without making it current; call ``end()``."""
+    current = _current.get()
+    if current is None:
+        return NOOP_SPAN
+    trace_, parent = current
+    return trace_.start_span(name, parent.span_id, attributes)
+
+
+def annotate(**attributes: Any) -> None:
+    """Set attributes on the current span, if any."""
+    current = _current.get()
+    if current is not None:
+        current[1].attributes.update(attributes)
+
+
+async def _export(current: Trace) -> None:
+    if not settings.tracing_enabled or not settings.tracing_export_path:
+        return
+    if random.random() >= settings.tracing_sample_rate:
+        get_metrics().incr("tracing.unsampled")
+        return
+    # Lazy import: the queue's writers use the database, which is traced
+    from .write_behind import get_write_behind_queue
+
+    try:
+        await get_write_behind_queue().put(TRACE_KIND, current.to_otlp())
+        get_metrics().incr("tracing.exported")
+    except Exception:  # noqa: BLE001
+        get_metrics().incr("tracing.export_errors")
+
+
+def write_trace_batch(db_manager: DatabaseManager, rows: list[dict[str, Any]]) -> int:
+    """Write-behind writer appending OTLP/JSON traces to ``TRACING_EXPORT_PATH``.
+
+    An unwritable file drops the batch: retrying or spilling it won't help.
+    """
+    path = Path(settings.tracing_export_path or "traces.otlp.jsonl")
+    try:
+        with path.open("a", encoding="utf-8") as file:
+            file.writelines(json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+    except OSError:
+        logger.exception("Could not write %d traces to %s", len(rows), path)
+        get_metrics().incr("tracing.export_errors", len(rows))
+        return 0
+    return len(rows)
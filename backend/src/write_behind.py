@@ -0,0 +1,367 @@
+"""Write-behind queue for non-critical inserts.
+
+Chat history and request telemetry don't need to be on disk before the
+response goes out. Requests put rows on a bounded in-process queue, and a
+task started in ``lifespan`` writes them in multi-row inserts, one batch
+every ``WRITE_BEHIND_FLUSH_MS`` or ``WRITE_BEHIND_BATCH_ROWS`` rows. A full
+queue makes callers wait up to ``WRITE_BEHIND_PUT_TIMEOUT_SECONDS``. Rows
+that still don't fit, or whose batch fails because the database is
+unreachable, are appended to a local spill file and replayed once a write
+succeeds again, so a database blip doesn't lose them. A batch the database
+rejects is split in halves until the bad rows are isolated; those go to a
+rejected file and the rest are written. Shutdown drains the queue.
+
+Each worker spills to its own file, ``WRITE_BEHIND_SPILL_PATH`` with its pid
+before the suffix, so workers never append to or replay each other's rows.
+A starting worker adopts the files of workers that are no longer running.
+
+Each kind of row has a writer, ``writer(db_manager, rows) -> rows written``,
+that inserts a whole batch in one transaction. Rows must be JSON-serialisable
+so they can be spilled.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import psycopg2  # type: ignore
+from psycopg2.pool import PoolError
+
+from .db import DatabaseManager
+from .metrics import get_metrics
+from .settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+BatchWriter = Callable[[DatabaseManager, list[Any]], int]
+
+# Wait before the next attempt after a failed batch
+_RETRY_SECONDS = 1.0
+
+
+def _is_unavailable(exc: Exception) -> bool:
+    """Whether a failed write says the database is down rather than the rows are bad."""
+    # RuntimeError: the pool isn't connected yet. OSError is not here: a file
+    # writer that can't write would spill and replay the same rows forever.
+    return isinstance(
+        exc, (psycopg2.OperationalError, psycopg2.InterfaceError, PoolError, RuntimeError)
+    )
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class WriteBehindQueue:
+    """Bounded queue of rows, flushed to Postgres in batches by a background task."""
+
+    def __init__(
+        self,
+        *,
+        max_rows: int | None = None,
+        batch_rows: int | None = None,
+        flush_ms: int | None = None,
+        put_timeout_seconds: float | None = None,
+        spill_path: str | None = None,
+    ) -> None:
+        self.max_rows = max_rows or settings.write_behind_max_rows
+        self.batch_rows = batch_rows or settings.write_behind_batch_rows
+        self.flush_seconds = (flush_ms or settings.write_behind_flush_ms) / 1000
+        self.put_timeout_seconds = (
+            settings.write_behind_put_timeout_seconds
+            if put_timeout_seconds is None
+            else put_timeout_seconds
+        )
+        path = spill_path if spill_path is not None else settings.write_behind_spill_path
+        self.spill_path = Path(path) if path else None
+        self._queue: asyncio.Queue[tuple[str, Any]] = asyncio.Queue(self.max_rows)
+        self._writers: dict[str, BatchWriter] = {}
+        self._spill_lock = threading.Lock()
+        self._db_manager: DatabaseManager | None = None
+        self._task: asyncio.Task[None] | None = None
+        # Rows taken off the queue by the flusher, and its current write;
+        # stop() finishes both
+        self._gathering: list[tuple[str, Any]] = []
+        self._flushing: asyncio.Future[bool] | None = None
+
+    def register(self, kind: str, writer: BatchWriter) -> None:
+        self._writers[kind] = writer
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def put(self, kind: str, row: Any) -> None:
+        """Queue one row, waiting for room if the queue is full.
+
+        Never raises for a full queue: after ``put_timeout_seconds`` the row
+        goes to the spill file instead.
+        """
+        if kind not in self._writers:
+            raise KeyError(f"No writer registered for {kind!r}")
+        metrics = get_metrics()
+        try:
+            self._queue.put_nowait((kind, row))
+        except asyncio.QueueFull:
+            metrics.incr("write_behind.backpressure_waits")
+            try:
+                await asyncio.wait_for(self._queue.put((kind, row)), self.put_timeout_seconds)
+            except TimeoutError:
+                await self._spill([(kind, row)])
+                return
+        metrics.incr("write_behind.enqueued")
+        metrics.set_gauge("write_behind.queue_depth", self._queue.qsize())
+
+    def start(self, db_manager: DatabaseManager) -> None:
+        """Start flushing to ``db_manager``; call from ``lifespan``."""
+        self._db_manager = db_manager
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write (or spill) everything still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._flushing is not None:
+            await asyncio.gather(self._flushing, return_exceptions=True)
+            self._flushing = None
+        gathered, self._gathering = self._gathering, []
+        await self.flush(gathered)
+        while not self._queue.empty():
+            await self.flush(self._take(self.batch_rows))
+
+    async def run(self) -> None:
+        """Replay spilled rows, then flush batches forever."""
+        await self._replay(adopt=True)
+        while True:
+            batch = await self._next_batch()
+            # Shielded so stop() can wait for the write instead of abandoning it
+            self._flushing = asyncio.ensure_future(self.flush(batch))
+            ok = await asyncio.shield(self._flushing)
+            self._flushing = None
+            if not ok:
+                await asyncio.sleep(_RETRY_SECONDS)
+            elif self._has_spill():
+                await self._replay()
+
+    async def _next_batch(self) -> list[tuple[str, Any]]:
+        """Wait for a row, then gather more until the batch is full or the interval ends."""
+        batch = self._gathering
+        batch.append(await self._queue.get())
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except TimeoutError:
+                break
+        batch.extend(self._take(self.batch_rows - len(batch)))
+        self._gathering = []
+        return batch
+
+    def _take(self, limit: int) -> list[tuple[str, Any]]:
+        taken = []
+        while len(taken) < limit:
+            try:
+                taken.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return taken
+
+    async def flush(self, batch: list[tuple[str, Any]]) -> bool:
+        """Write one batch, one multi-row insert per kind.
+
+        Returns False if the database was unreachable; those rows are spilled.
+        """
+        if not batch:
+            return True
+        get_metrics().set_gauge("write_behind.queue_depth", self._queue.qsize())
+        by_kind: dict[str, list[Any]] = {}
+        for kind, row in batch:
+            by_kind.setdefault(kind, []).append(row)
+
+        ok = True
+        for kind, rows in by_kind.items():
+            if not await self._write(kind, rows):
+                ok = False
+        return ok
+
+    async def _write(self, kind: str, rows: list[Any]) -> bool:
+        """Insert rows of one kind, splitting the batch if the database rejects it."""
+        metrics = get_metrics()
+        started = time.perf_counter()
+        try:
+            if self._db_manager is None:
+                raise RuntimeError("Write-behind queue is not started")
+            written = await asyncio.to_thread(self._writers[kind], self._db_manager, rows)
+        except Exception as exc:
+            metrics.incr("write_behind.errors")
+            if _is_unavailable(exc):
+                logger.exception("Write-behind flush of %d %s rows failed", len(rows), kind)
+                await self._spill([(kind, row) for row in rows])
+                return False
+            if len(rows) == 1:
+                logger.exception("Database rejected a %s row; moving it aside", kind)
+                await self._reject(kind, rows[0])
+                return True
+            # One bad row fails the whole insert; find it without holding back the rest
+            logger.warning(
+                "Write-behind flush of %d %s rows was rejected (%s); splitting it",
+                len(rows), kind, exc,
+            )
+            middle = len(rows) // 2
+            if not await self._write(kind, rows[:middle]):
+                await self._spill([(kind, row) for row in rows[middle:]])
+                return False
+            return await self._write(kind, rows[middle:])
+        metrics.incr("write_behind.batches")
+        metrics.incr(f"write_behind.written.{kind}", written)
+        metrics.observe("write_behind.flush_seconds", time.perf_counter() - started)
+        return True
+
+    # -- Spill file --------------------------------------------------------
+
+    def _own_path(self, tag: str) -> Path:
+        """This worker's file next to ``spill_path``: ``<stem>.<tag><suffix>``."""
+        base = self.spill_path
+        assert base is not None
+        return base.with_name(f"{base.stem}.{tag}{base.suffix}")
+
+    def _spill_file(self) -> Path:
+        # Looked up per call so a forked worker doesn't share its parent's file
+        return self._own_path(str(os.getpid()))
+
+    def _has_spill(self) -> bool:
+        return self.spill_path is not None and self._spill_file().exists()
+
+    async def _spill(self, rows: list[tuple[str, Any]]) -> None:
+        if not rows:
+            return
+        metrics = get_metrics()
+        if self.spill_path is None:
+            metrics.incr("write_behind.dropped", len(rows))
+            return
+        lines = "".join(
+            json.dumps({"kind": kind, "row": row}, separators=(",", ":")) + "\n"
+            for kind, row in rows
+        )
+        try:
+            await asyncio.to_thread(self._append_spill, lines)
+        except OSError:
+            metrics.incr("write_behind.dropped", len(rows))
+            logger.exception("Could not spill %d write-behind rows", len(rows))
+            return
+        metrics.incr("write_behind.spilled", len(rows))
+
+    async def _reject(self, kind: str, row: Any) -> None:
+        """Keep a row the database refused out of the spill file, for someone to inspect."""
+        metrics = get_metrics()
+        metrics.incr("write_behind.rejected")
+        if self.spill_path is None:
+            metrics.incr("write_behind.dropped")
+            return
+        line = json.dumps({"kind": kind, "row": row}, separators=(",", ":")) + "\n"
+        try:
+            await asyncio.to_thread(self._append, self._own_path(f"rejected.{os.getpid()}"), line)
+        except OSError:
+            metrics.incr("write_behind.dropped")
+            logger.exception("Could not keep a rejected %s row", kind)
+
+    def _append_spill(self, lines: str) -> None:
+        self._append(self._spill_file(), lines)
+
+    def _append(self, path: Path, lines: str) -> None:
+        with self._spill_lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as handle:
+                handle.write(lines)
+                handle.flush()
+                os.fsync(handle.fileno())
+
+    def _orphans(self) -> list[Path]:
+        """Spill files left by workers that are no longer running."""
+        base = self.spill_path
+        assert base is not None
+        prefix = base.stem + "."
+        orphans = []
+        for path in base.parent.glob(prefix + "*"):
+            if path == base:
+                # The shared file of older versions
+                orphans.append(path)
+                continue
+            pid = path.name[len(prefix):].split(".", 1)[0]
+            if pid.isdigit() and int(pid) != os.getpid() and not _is_running(int(pid)):
+                orphans.append(path)
+        return orphans
+
+    def _claim_spill(self, adopt: bool = False) -> list[tuple[str, Any]]:
+        """Take every spilled row, removing the files; later spills start a new one.
+
+        With ``adopt``, also takes the files of workers that are gone. Renaming
+        is atomic, so if two workers reach for the same file only one gets it.
+        """
+        own = self._spill_file()
+        claimed = own.with_name(own.name + ".replaying")
+        # A replay of ours (or of a dead worker with our pid) cut short by a crash
+        paths = [claimed, own, *self._orphans()] if adopt else [own]
+        rows = []
+        for path in paths:
+            with self._spill_lock:
+                try:
+                    os.replace(path, claimed)
+                except FileNotFoundError:
+                    continue
+            with claimed.open(encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-append
+                        continue
+                    if entry.get("kind") in self._writers:
+                        rows.append((entry["kind"], entry["row"]))
+            claimed.unlink()
+        return rows
+
+    async def _replay(self, adopt: bool = False) -> None:
+        """Write spilled rows back in batches; failures go back to the spill file."""
+        if self._db_manager is None or self.spill_path is None or not (adopt or self._has_spill()):
+            return
+        rows = await asyncio.to_thread(self._claim_spill, adopt)
+        if rows:
+            get_metrics().incr("write_behind.replayed", len(rows))
+            logger.info("Replaying %d spilled write-behind rows", len(rows))
+        for start in range(0, len(rows), self.batch_rows):
+            if not await self.flush(rows[start:start + self.batch_rows]):
+                # Still down; keep the rest for the next replay
+                await self._spill(rows[start + self.batch_rows:])
+                return
+
+
+_write_behind: WriteBehindQueue | None = None
+
+
+def get_write_behind_queue() -> WriteBehindQueue:
+    """Get the per-worker write-behind queue."""
+    global _write_behind
+    if _write_behind is None:
+        _write_behind = WriteBehindQueue()
+    return _write_behind
@@ -0,0 +1,115 @@
+"""A client leaving /ai/chat/auto/stream mid-answer still gets its turn saved."""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import json
+from typing import Any
+
+from starlette.requests import Request
+
+from src.ai.executor import ToolExecutor
+from src.metrics import get_metrics
+
+# The package exports the module's router under the module's name
+ai_router = importlib.import_module("src.routers.ai_router")
+
+
+class _SlowExecutor(ToolExecutor):
+    """Streams a long answer a word at a time, without a model."""
+
+    async def _complete(
+        self, route: Any, conversation: Any, tools: Any, deadline: float, *, stream: bool = False
+    ) -> Any:
+        async def chunks():
+            for i in range(1000):
+                yield {"choices": [{"delta": {"content": f"word{i} "}}]}
+                await asyncio.sleep(0.01)
+
+        return chunks()
+
+
+def _fake_streaming(**kwargs: Any):
+    executor = _SlowExecutor(client=object())  # type: ignore[arg-type]
+    executor.response_cache = None
+    executor.fast_path = None
+    return executor.execute_with_tools_streaming(**kwargs)
+
+
+async def _stream_then_disconnect(monkeypatch: Any) -> list[list[dict[str, Any]]]:
+    saved: list[list[dict[str, Any]]] = []
+
+    async def current_user_id(request: Any) -> int:
+        return 7
+
+    async def load_conversation(request: Any, payload: Any, user_id: Any) -> tuple[str, list[Any]]:
+        return "conv-1", []
+
+    async def client_key(request: Any, scope: str) -> str:
+        return "user:7"
+
+    async def record_turn(user_id: Any, conversation_id: Any, turn: list[dict[str, Any]]) -> None:
+        saved.append(turn)
+
+    monkeypatch.setattr(ai_router, "current_user_id", current_user_id)
+    monkeypatch.setattr(ai_router, "_load_conversation", load_conversation)
+    monkeypatch.setattr(ai_router, "client_key", client_key)
+    monkeypatch.setattr(ai_router, "_record_turn", record_turn)
+    monkeypatch.setattr(ai_router, "execute_with_tools_streaming", _fake_streaming)
+
+    gone = asyncio.Event()
+    body = json.dumps({"message": "Tell me a long story"}).encode()
+    requested = False
+
+    async def receive() -> dict[str, Any]:
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await gone.wait()
+        return {"type": "http.disconnect"}
+
+    content_frames = 0
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal content_frames
+        if message["type"] == "http.response.body" and message["body"].startswith(b"data:"):
+            content_frames += 1
+            if content_frames == 3:
+                gone.set()
+
+    scope = {
+        "type": "http",
+        # Like uvicorn: Starlette listens for the disconnect and cancels the response
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "method": "POST",
+        "path": "/ai/chat/auto/stream",
+        "headers": [(b"content-type", b"application/json")],
+        "query_string": b"",
+    }
+    request = Request(scope, receive)
+    payload = ai_router.ChatRequest.model_validate_json(await request.body())
+    response = await ai_router.stream_chat_with_tools(payload, request)
+    await asyncio.wait_for(response(scope, receive, send), 5)
+
+    for _ in range(100):
+        if saved:
+            break
+        await asyncio.sleep(0.01)
+    return saved
+
+
+def test_disconnect_mid_stream_saves_the_turn(monkeypatch: Any) -> None:
+    cancelled = get_metrics().counter("ai.cancel.requests")
+
+    saved = asyncio.run(_stream_then_disconnect(monkeypatch))
+
+    assert len(saved) == 1
+    user, assistant = saved[0]
+    assert user == {"role": "user", "content": "Tell me a long story"}
+    assert assistant["role"] == "assistant"
+    assert assistant["content"].startswith("word0 word1 ")
+    assert "word999" not in assistant["content"]
+    assert get_metrics().counter("ai.cancel.requests") == cancelled + 1
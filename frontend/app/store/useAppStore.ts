@@ -44,6 +44,7 @@ interface AppState {
   chatMessages: ChatMessage[];
   chatInput: string;
   isChatSending: boolean;
+  conversationId: string | null;
 
   setAuthMode: (mode: AuthMode) => void;
   setEmail: (value: string) => void;
@@ -88,6 +89,7 @@ export const useAppStore = create<AppState>((set, get) => ({
   chatMessages: [],
   chatInput: "",
   isChatSending: false,
+  conversationId: null,
 
   setAuthMode: (mode) => set({ authMode: mode }),
   setEmail: (value) => set({ email: value }),
@@ -127,7 +129,7 @@ export const useAppStore = create<AppState>((set, get) => ({
     try {
       await apiFetch("/auth/logout", { method: "POST" });
     } finally {
-      set({ user: null, pods: [], bookingDrafts: {}, chatMessages: [], bookings: [] });
+      set({ user: null, pods: [], bookingDrafts: {}, chatMessages: [], conversationId: null, bookings: [] });
       if (typeof window !== 'undefined') {
         window.location.href = '/auth';
       }
@@ -211,9 +213,13 @@ export const useAppStore = create<AppState>((set, get) => ({
     const { user } = get();
     if (!user) return;
     try {
-      // Fetch from backend AI router history endpoint
-      const history = await apiFetch<ChatMessage[]>("/ai/history", { method: "GET" });
-      set({ chatMessages: history });
+      // Continue the most recent conversation, newest page of messages
+      const [latest] = await apiFetch<{ id: string }[]>("/ai/conversations?limit=1", { method: "GET" });
+      if (!latest) return;
+      const page = await apiFetch<{ messages: ChatMessage[] }>(`/ai/conversations/${latest.id}/messages`, {
+        method: "GET",
+      });
+      set({ chatMessages: page.messages, conversationId: latest.id });
     } catch (err) {
       console.warn("Chat history not available", err);
     }
@@ -234,22 +240,27 @@ export const useAppStore = create<AppState>((set, get) => ({
     set((state) => ({ chatMessages: [...state.chatMessages, outgoing], chatInput: "", isChatSending: true }));
 
     try {
-      // Send full conversation to backend AI auto endpoint
-      const messages = get().chatMessages
-        .map((m) => ({ role: m.role === "assistant" ? "assistant" : m.role === "tool" ? "tool" : "user", content: m.content }))
-        .filter((m) => m.role === "assistant" || m.role === "user");
-      messages.push({ role: "user", content: trimmed });
-
-      const completion = await apiFetch<{ text?: string; conversation?: { role: string; content: string }[] }>(
+      // A saved conversation only needs the new message; otherwise send what we have
+      const { conversationId } = get();
+      const body = conversationId
+        ? { conversation_id: conversationId, message: trimmed }
+        : {
+            messages: get().chatMessages
+              .filter((m) => m.role === "assistant" || m.role === "user")
+              .map((m) => ({ role: m.role, content: m.content })),
+          };
+
+      const completion = await apiFetch<{ text?: string; conversation_id?: string | null }>(
         "/ai/chat/auto",
         {
           method: "POST",
-          body: JSON.stringify({ messages }),
+          body: JSON.stringify(body),
         }
       );
 
       const aiText = completion.text ?? "";
       set((state) => ({
+        conversationId: completion.conversation_id ?? state.conversationId,
         chatMessages: [
           ...state.chatMessages,
           {
@@ -277,6 +288,6 @@ export const useAppStore = create<AppState>((set, get) => ({
   },
 
   clearChatMessages: () => {
-    set({ chatMessages: [], chatInput: "" });
+    set({ chatMessages: [], chatInput: "", conversationId: null });
   },
 }));